@@ -21,6 +21,15 @@ import bpy
 import os
 import json
 import time
+import bisect
+import heapq
+import uuid
+import queue
+import shutil
+import hashlib
+import tempfile
+import threading
+import subprocess
 import gpu
 if bpy.app.version < (3, 0, 0):
     import bgl
@@ -52,16 +61,40 @@ SUFFIX_own = "own"
 OS_Selected_Object_Sets = {}
 OS_Selected_Object_Collection = {}
 SEPARATOR = "{|SEPARATOR|}"
+SKIN_IDS_PROP = "mos_ids"
+SKIN_IDS_KEYS = ('meshes', 'materials')
+FRAMES_NODE_GROUP = "Onion Skin Frames"
+FRAMES_GROUP_INPUTS = (
+    ('NodeSocketFloat', 'Before'),
+    ('NodeSocketFloat', 'After'),
+    ('NodeSocketFloat', 'Fade Before'),
+    ('NodeSocketFloat', 'Fade After'),
+    ('NodeSocketBool', 'Use Colors'),
+)
 CREATING = False
 RENDERING = False
 Active_Object = None
-GPU_FRAMES = {}
-GPU_MARKERS = {}
+KEYS_INDEX = {}
+KEYS_FILTER_LIMIT = 16
+GC_INTERVAL = 10.0
+PARALLEL_TIMEOUT = 120.0
+GPU_TOPOLOGY = {}
+GPU_MERGED = {}
+GPU_FEATURES = {}
+GPU_POINTS = {}
+BAKE_STATS = {'hits': 0, 'misses': 0}
+CULL_STATS = {'drawn': 0, 'frustum': 0, 'size': 0, 'skipped': 0, 'lod': 0, 'triangles': 0}
+GPU_PRIMITIVE_ITEMS = [
+    ('FACES', 'Faces', "Filled triangles"),
+    ('EDGES', 'Edges', "Open borders and edges sharper than the edge angle"),
+    ('POINTS', 'Points', "Every n-th vertex")]
 DRAW_TOGGLE = False
 if bpy.app.version < (4, 0, 0):
     SHADER = gpu.shader.from_builtin('3D_UNIFORM_COLOR')
 else:
     SHADER = gpu.shader.from_builtin('UNIFORM_COLOR')
+SKIN_SHADER = None
+LAYER_SHADER = None
 Draw_Handler = None
 Draw_Timer = None
 
@@ -186,7 +219,12 @@ def set_base_material_colors(skin_prefix):
         set_material_color(m, mat_color)
 
 
+def update_draw_plan(self, context):
+    Draw_Plan.invalidate()
+
+
 def update_color_bf(self, context):
+    Draw_Plan.invalidate()
     tree = get_empty_objs_tree()
     if not tree:
         set_base_material_colors('before')
@@ -197,6 +235,7 @@ def update_color_bf(self, context):
 
 
 def update_color_af(self, context):
+    Draw_Plan.invalidate()
     tree = get_empty_objs_tree()
     if not tree:
         set_base_material_colors('after')
@@ -207,6 +246,7 @@ def update_color_af(self, context):
 
 
 def update_color_m(self, context):
+    Draw_Plan.invalidate()
     tree = get_empty_objs_tree(False, 'MARKER')
     if not tree:
         set_base_material_colors('marker')
@@ -243,20 +283,21 @@ def update_color_alpha(self, context):
 
 
 def update_fade_alpha(self, context):
+    Draw_Plan.invalidate()
     tree = get_empty_objs_tree()
     if not tree:
         return None
     if self.fade_to_alpha is False:
         for s in tree.children:
             try:
+                slots = max(len(get_merged_pieces(s)), 1)
                 if self.onionsk_colors:
                     if s.name.split('_')[0] == 'before':
-                        s.data.materials[0] = bpy.data.materials[MAT_PREFIX + SUFFIX_before]
+                        set_skin_materials(s, [bpy.data.materials[MAT_PREFIX + SUFFIX_before]] * slots)
                     if s.name.split('_')[0] == 'after':
-                        s.data.materials[0] = bpy.data.materials[MAT_PREFIX + SUFFIX_after]
+                        set_skin_materials(s, [bpy.data.materials[MAT_PREFIX + SUFFIX_after]] * slots)
                 else:
-                    s.data.materials[0] = bpy.data.materials[
-                        MAT_PREFIX + list_to_str(s.name.split('_')[1:-1], '_') + '_' + SUFFIX_own]
+                    set_skin_materials(s, get_skin_own_materials(s))
             except KeyError:
                 pass
     if self.color_alpha is False and self.fade_to_alpha is True:
@@ -270,15 +311,18 @@ def update_fade_alpha(self, context):
 def update_os_prop_toggle(self, context, prop):
     treeM = get_empty_objs_tree(False, 'MARKER')
     treeOS = get_empty_objs_tree(False)
+    frames_skin = get_frames_skin(checkout_parent(context.active_object))
     markers = []
     oskins = []
-    if not treeOS and not treeM:
+    if not treeOS and not treeM and not frames_skin:
         return None
     if treeM:
         markers = [s for s in treeM.children]
     if treeOS:
         oskins = [s for s in treeOS.children]
     skins = markers + oskins
+    if frames_skin:
+        skins.append(frames_skin)
     for s in skins:
         if prop == 'wire':
             if self.onionsk_wire:
@@ -312,11 +356,13 @@ def update_os_prop_toggle_selectable(self, context):
 
 
 def update_view_range(self, context):
+    Draw_Plan.invalidate()
     if not handler_check(bpy.app.handlers.frame_change_post, "m_os_post_frames_handler"):
         bpy.app.handlers.frame_change_post.append(m_os_post_frames_handler)
     if self.view_range:
         view_range_frames(context.scene)
         return None
+    update_frames_skin(context.scene)
     tree = get_empty_objs_tree()
     if not tree:
         return None
@@ -340,6 +386,7 @@ def update_view_range(self, context):
 
 
 def update_view_range_frame_type(self, context):
+    Draw_Plan.invalidate()
     if not self.os_draw_mode == 'MESH':
         return None
     view_range_frames(context.scene)
@@ -403,11 +450,10 @@ def update_tmarker(self, context):
         remove_time_markers()
         return None
     if sc.os_draw_mode == 'GPU':
-        objp = checkout_parent(context.active_object)
-        if not GPU_FRAMES.get(objp.name):
+        record = GPU_FRAMES.get(checkout_parent(context.active_object))
+        if not record:
             return None
-        frame_nums = list(set([int(float(f.split('|@|')[-1]))
-                               for f in GPU_FRAMES[objp.name]]))
+        frame_nums = list(set(int(f) for f in record.index))
     else:
         tree = get_empty_objs_tree(False)
         if not tree:
@@ -420,6 +466,7 @@ def update_tmarker(self, context):
 
 
 def update_os_draw_technic(self, context):
+    Draw_Plan.invalidate()
     sc = context.scene.onion_skins_scene_props
     if sc.onionsk_tmarker:
         remove_time_markers()
@@ -448,6 +495,7 @@ def get_empty_objs_tree(active_obj=False, skin_type='ONION'):
 
 
 def hide_before_frames(self, context):
+    Draw_Plan.invalidate()
     sc = bpy.context.scene.onion_skins_scene_props
     tree = get_empty_objs_tree()
     if tree:
@@ -461,11 +509,13 @@ def hide_before_frames(self, context):
         if sc.hide_os_all:
             hide_all_os_frames(switch=True, value=False)
     check_all_frames_flag()
+    update_frames_skin(context.scene)
     if sc.view_range:
         view_range_frames(context.scene)
 
 
 def hide_after_frames(self, context):
+    Draw_Plan.invalidate()
     sc = bpy.context.scene.onion_skins_scene_props
     tree = get_empty_objs_tree()
     if tree:
@@ -479,11 +529,13 @@ def hide_after_frames(self, context):
         if sc.hide_os_all:
             hide_all_os_frames(switch=True, value=False)
     check_all_frames_flag()
+    update_frames_skin(context.scene)
     if sc.view_range:
         view_range_frames(context.scene)
 
 
 def hide_marker_frames(self, context):
+    Draw_Plan.invalidate()
     sc = bpy.context.scene.onion_skins_scene_props
     tree = get_empty_objs_tree(False, 'MARKER')
     if tree:
@@ -563,6 +615,8 @@ def apply_pref_settings():
     for pr in prefs.__annotations__:
         if pr == 'category' or pr == 'display_progress':
             continue
+        if not hasattr(sc, pr):
+            continue
         exec("sc." + pr + " = prefs." + pr)
 
 
@@ -581,8 +635,14 @@ def check_handlers():
         bpy.app.handlers.load_post.append(m_os_on_file_load)
     if not handler_check(bpy.app.handlers.depsgraph_update_post, "m_os_post_dpgraph_update"):
         bpy.app.handlers.depsgraph_update_post.append(m_os_post_dpgraph_update)
+    if not handler_check(bpy.app.handlers.undo_post, "m_os_post_undo"):
+        bpy.app.handlers.undo_post.append(m_os_post_undo)
+    if not handler_check(bpy.app.handlers.redo_post, "m_os_post_undo"):
+        bpy.app.handlers.redo_post.append(m_os_post_undo)
     if not handler_check(bpy.app.handlers.save_pre, "m_os_pre_save"):
         bpy.app.handlers.save_pre.append(m_os_pre_save)
+    if not handler_check(bpy.app.handlers.save_post, "m_os_post_save"):
+        bpy.app.handlers.save_post.append(m_os_post_save)
     if not handler_check(bpy.app.handlers.frame_change_post, "m_os_post_frames_handler"):
         bpy.app.handlers.frame_change_post.append(m_os_post_frames_handler)
     if not handler_check(bpy.app.handlers.render_pre, "m_os_pre_render_handler"):
@@ -629,10 +689,15 @@ def OS_Initialization():
     prefs = bpy.context.preferences.addons[__name__].preferences
     sc = bpy.context.scene.onion_skins_scene_props
     remove_handlers(bpy.context)
-    global GPU_FRAMES
-    global GPU_MARKERS
     GPU_FRAMES.clear()
     GPU_MARKERS.clear()
+    KEYS_INDEX.clear()
+    GPU_TOPOLOGY.clear()
+    GPU_MERGED.clear()
+    GPU_FEATURES.clear()
+    GPU_POINTS.clear()
+    GPU_CACHE.clear()
+    DISK_CACHE.load()
 
     check_handlers()
 
@@ -687,6 +752,7 @@ class OS_PT_UI_Panel(Panel):
         onionsk = obj.is_onionsk
         actions = actions_check(obj)
         mp = obj.animation_visualization.motion_path
+        pin_icon = 'PINNED' if checkout_parent(obj).onionsk_pinned else 'UNPINNED'
         if context.mode == 'POSE':
             mp = obj.pose.animation_visualization.motion_path
 
@@ -713,12 +779,17 @@ class OS_PT_UI_Panel(Panel):
             if (sc.onionsk_Markers_count > 0 and obj.is_os_marker) and\
                     sc.os_draw_mode == 'GPU':
                 row.prop(sc, 'draw_gpu_toggle', text='', icon='RENDER_ANIMATION')
+                row.operator('mos_op.pin_skins', text='', icon=pin_icon)
         else:
             row.operator('mos_op.make_skins', text='Update ', icon='ONIONSKIN_ON')
             if sc.os_draw_mode == 'GPU':
+                row.operator('mos_op.make_skins', text='', icon='FILE_REFRESH').force = True
                 row.prop(sc, 'draw_gpu_toggle', text='', icon='RENDER_ANIMATION')
+                row.operator('mos_op.pin_skins', text='', icon=pin_icon)
+                row.operator('mos_op.promote_to_mesh', text='', icon='MESH_DATA')
             else:
                 row.prop(params, 'display_progress', text='', icon='TEMP')
+                row.operator('mos_op.demote_to_gpu', text='', icon='SHADING_RENDERED')
             if Skins:
                 row.operator('mos_op.remove_skins', text='', icon='X')
         row = layout.row(align=True)
@@ -828,12 +899,23 @@ class OS_PT_Options_Panel(Panel):
             row = box.row()
             row.prop(sc, "onionsk_colors", text="Colors")
             row.prop(sc, "onionsk_wire", text="Wireframe")
+            row = box.row()
+            row.prop(sc, "merge_pieces")
+            row.prop(sc, "single_skin_object")
         elif sc.os_draw_mode == 'GPU':
             row.prop(sc, "gpu_flat_colors")
             row.prop(sc, "gpu_colors_in_front")
             row = box.row()
             row.prop(sc, "gpu_mask_oskins")
             row.prop(sc, "gpu_mask_markers")
+            row = box.row(align=True)
+            row.prop(sc, "gpu_primitive_before")
+            row.prop(sc, "gpu_primitive_after")
+            row.prop(sc, "gpu_primitive_markers")
+            row = box.row(align=True)
+            row.prop(sc, "gpu_edge_angle")
+            row.prop(sc, "gpu_point_stride")
+            row.prop(sc, "gpu_point_size")
         row = box.row()
         row.prop(sc, "onionsk_tmarker", text="Time Marker")
         row.prop(sc, "onionsk_mpath", text="Motion Path")
@@ -1068,6 +1150,7 @@ class OS_PT_FilterKeys_Panel(Panel):
         layout = self.layout
         col = layout.column()
         col.prop(sc, 'filter_active_bone', icon='BONE_DATA')
+        col.prop(sc, 'filter_selected_bones', icon='GROUP_BONE')
         col = layout.column(align=True)
         col.label(text='Keyframe Type:')
         col.prop(sc, 'key_type_keyframe', icon='KEYTYPE_KEYFRAME_VEC')
@@ -1230,19 +1313,22 @@ def dublicate_own_material(obj_name):
         mat.shadow_method = 'NONE'
         mat.show_transparent_back = False
         mat.use_nodes = True
+        register_piece_material(obj_name, mat)
     return mat
 
 
 def apply_color_to_skin(obj, at_frame, current_frame, skin_type='ONION'):
 
     obj.data.materials.clear()
-    if skin_type == 'ONION':
-        if (at_frame < current_frame):
-            obj.data.materials.append(bpy.data.materials[MAT_PREFIX + SUFFIX_before])
-        else:
-            obj.data.materials.append(bpy.data.materials[MAT_PREFIX + SUFFIX_after])
-    if skin_type == 'MARKER':
-        obj.data.materials.append(bpy.data.materials[MAT_PREFIX + SUFFIX_marker])
+    pieces = get_merged_pieces(obj)
+    for i in range(max(len(pieces), 1)):
+        if skin_type == 'ONION':
+            if (at_frame < current_frame):
+                obj.data.materials.append(bpy.data.materials[MAT_PREFIX + SUFFIX_before])
+            else:
+                obj.data.materials.append(bpy.data.materials[MAT_PREFIX + SUFFIX_after])
+        if skin_type == 'MARKER':
+            obj.data.materials.append(bpy.data.materials[MAT_PREFIX + SUFFIX_marker])
 
     if skin_type == 'ONION':
         if (at_frame < current_frame):
@@ -1252,7 +1338,10 @@ def apply_color_to_skin(obj, at_frame, current_frame, skin_type='ONION'):
     if skin_type == 'MARKER':
         obj.color = bpy.data.materials[MAT_PREFIX + SUFFIX_marker].diffuse_color
 
-    if skin_type == 'OWN':
+    if skin_type == 'OWN' and pieces:
+        for n in pieces:
+            obj.data.materials.append(dublicate_own_material(n))
+    elif skin_type == 'OWN':
         try:
             obj.data.materials[0] = \
                 bpy.data.materials[MAT_PREFIX + list_to_str(obj.name.split('_')[1:-1], '_') + '_' + SUFFIX_own]
@@ -1341,12 +1430,12 @@ def update_base_material(skin_prefix, tree, alpha):
     if sc.onionsk_colors:
         return None
     for sk in tree.children:
-        try:
-            m = bpy.data.materials[
-                MAT_PREFIX + list_to_str(sk.name.split('_')[1:-1], '_') + '_' + SUFFIX_own]
-        except KeyError:
-            continue
-        set_material_alpha(m, alpha)
+        for n in get_merged_pieces(sk) or [list_to_str(sk.name.split('_')[1:-1], '_')]:
+            try:
+                m = bpy.data.materials[MAT_PREFIX + n + '_' + SUFFIX_own]
+            except KeyError:
+                continue
+            set_material_alpha(m, alpha)
 
 
 def set_skins_material(skin_names_list, skin_prefix, frame_number):
@@ -1371,6 +1460,7 @@ def set_skins_material(skin_names_list, skin_prefix, frame_number):
                 mat.name = MAT_PREFIX + n + '_' + str(frame_number)
                 mat.diffuse_color[3] = sc.color_alpha_value
                 format_os_material(mat, mat.diffuse_color)
+                register_piece_material(n, mat)
     else:
         try:
             mat = bpy.data.materials[MAT_PREFIX + str(frame_number)]
@@ -1382,6 +1472,8 @@ def set_skins_material(skin_names_list, skin_prefix, frame_number):
             bpy.data.materials.new(MAT_PREFIX + str(frame_number))
             mat = bpy.data.materials[MAT_PREFIX + str(frame_number)]
             format_os_material(mat, mat_color)
+            if skin_names_list:
+                register_piece_material(skin_names_list[0], mat)
     return mat
 
 
@@ -1408,6 +1500,18 @@ def get_fade_os_material(skin):
     return mat
 
 
+def get_fade_os_materials(skin):
+    # Faded material of every slot, merged skins fade the copy of each piece
+    sc = bpy.context.scene.onion_skins_scene_props
+    pieces = get_merged_pieces(skin)
+    if not pieces:
+        return [get_fade_os_material(skin)]
+    if sc.onionsk_colors:
+        return [get_fade_os_material(skin)] * len(pieces)
+    frame = skin.name.split('_')[-1]
+    return [bpy.data.materials[MAT_PREFIX + n + '_' + frame] for n in pieces]
+
+
 def get_fade_os_alpha(mat_color, alpha_step, multiply):
     sc = bpy.context.scene.onion_skins_scene_props
     params = bpy.context.window_manager.onionSkinsParams
@@ -1436,8 +1540,13 @@ def fade_onion_colors(sk_names, skin_prefix, mat_color, count, view_range=False)
     frame_numbers = [int(float(f.split('_')[-1])) for f in sk_names]
     frame_numbers = list(set(frame_numbers))
     frame_numbers.sort()
+    piece_names = set()
+    for n in sk_names:
+        piece_names.update(get_merged_pieces(get_fade_skin_object(n, view_range)))
     for fn in frame_numbers:
         mat = set_skins_material(sort_sk_names, skin_prefix, fn)
+        if piece_names and not sc.onionsk_colors:
+            set_skins_material(list(piece_names), skin_prefix, fn)
         alpha_step = get_fade_os_alpha_step(sort_sk_names, mat_color, count)
     for sk_name in sort_sk_names:  # bare name (Cube)
         if skin_prefix == 'before':
@@ -1447,24 +1556,20 @@ def fade_onion_colors(sk_names, skin_prefix, mat_color, count, view_range=False)
         sk_frame_names = [skin_prefix + '_' + sk_name + '_' + str(fn) for fn in frame_numbers]
         for n in sk_frame_names:  # skinprefix_name_framenumber# (before_Cube_10)
             s = get_fade_skin_object(n, view_range)
-            mat = get_fade_os_material(s)
-            if s.data.materials:
-                s.data.materials[0] = mat
-            else:
-                s.data.materials.append(mat)
+            mats = get_fade_os_materials(s)
+            set_skin_materials(s, mats)
             if multiply == 0:
                 if skin_prefix == 'after':
                     multiply = multiply + 1
                 continue
             alpha = get_fade_os_alpha(mat_color, alpha_step, multiply)
-            mat.diffuse_color[3] = alpha
-            mat.node_tree.nodes["Principled BSDF"].inputs.get('Alpha').default_value = alpha
             s.color[3] = s.color[3] - (alpha_step * multiply)
             if s.color[3] < sc.fade_to_value:
                 alpha = sc.fade_to_value
                 if sc.color_alpha_value < sc.fade_to_value:
                     alpha = sc.color_alpha_value
                 s.color[3] = alpha
+            for mat in mats:
                 mat.diffuse_color[3] = alpha
                 mat.node_tree.nodes["Principled BSDF"].inputs.get('Alpha').default_value = alpha
             if skin_prefix == 'before':
@@ -1490,13 +1595,14 @@ def update_colors_by_type(skin_type, obj, skin_prefix, fade=False):
             if sc.onionsk_colors is True:
                 s.color = mat_color
             else:
-                own_color = get_own_mat_color(list_to_str(s.name.split('_')[1:-1], '_'))
+                pieces = get_merged_pieces(s) or [list_to_str(s.name.split('_')[1:-1], '_')]
+                own_color = get_own_mat_color(pieces[0])
                 if own_color:
                     s.color = own_color
                 s.color[3] = set_alpha
-                mat = s.data.materials[0]
-                if mat:
-                    set_material_alpha(mat, set_alpha)
+                for mat in s.data.materials:
+                    if mat:
+                        set_material_alpha(mat, set_alpha)
             count = count + 1
     if skin_type == 'MARKER':
         return None
@@ -1520,6 +1626,7 @@ def set_onion_colors(onion_color_type, fade=False):
         update_colors_by_type('ONION', objp, 'after', fade)
     if onion_color_type == 'MARKER':
         update_colors_by_type('MARKER', objp, 'marker', fade=False)
+    update_frames_skin(bpy.context.scene, objp)
 
 
 def apply_decimate_modif(obj, iterations):
@@ -1539,9 +1646,106 @@ def rename_os_mesh(obj, OSkin, at_frame, current_frame, skin_type='ONION'):
     if skin_type == 'MARKER':
         OSkin.name = 'marker_' + obj.name + '_' + str(int(at_frame))
         OSkin.data.name = 'mosm_' + obj.name + '_' + str(int(at_frame))
+    register_skin_ids(OSkin.parent, meshes=[OSkin.data])
+
+
+POSE_DRIVEN_MODIFIERS = {
+    'ARMATURE', 'HOOK', 'SUBSURF', 'MULTIRES', 'MIRROR', 'SOLIDIFY', 'BEVEL',
+    'TRIANGULATE', 'EDGE_SPLIT', 'WEIGHTED_NORMAL', 'CORRECTIVE_SMOOTH',
+    'SMOOTH', 'LAPLACIANSMOOTH',
+}
 
 
-def make_duplicate_mesh(obj, parent_empty):
+def get_pose_fingerprint(objp, depsgraph):
+    if objp.type != 'ARMATURE':
+        return b''
+    evaluated = objp.evaluated_get(depsgraph)
+    bones = evaluated.pose.bones
+    matrices = np.empty(len(bones) * 16, 'f')
+    bones.foreach_get("matrix", matrices)
+    matrix = np.array(evaluated.matrix_world, 'f')
+    return np.round(matrices, 5).tobytes() + np.round(matrix, 5).tobytes()
+
+
+def get_deform_targets_fingerprint(obj, depsgraph):
+    # Pose and matrix of the Armature and Hook modifier objects of the piece,
+    # they don't have to be the parent of the piece
+    data = []
+    for m in obj.modifiers:
+        if not m.show_viewport or m.type not in {'ARMATURE', 'HOOK'}:
+            continue
+        target = m.object
+        if target is None:
+            continue
+        data.append(target.name)
+        if target.type == 'ARMATURE':
+            data.append(get_pose_fingerprint(target, depsgraph))
+        else:
+            matrix = np.array(target.evaluated_get(depsgraph).matrix_world, 'f')
+            data.append(np.round(matrix, 5).tobytes())
+    return tuple(data)
+
+
+TRANSFORM_PATHS = {
+    'location', 'rotation_euler', 'rotation_quaternion', 'rotation_axis_angle',
+    'scale', 'delta_location', 'delta_rotation_euler',
+    'delta_rotation_quaternion', 'delta_scale',
+}
+
+
+def is_transform_animation(anim):
+    if anim.drivers:
+        return False
+    if not anim.action:
+        return True
+    for fcurve in anim.action.fcurves:
+        if fcurve.data_path not in TRANSFORM_PATHS:
+            return False
+    return True
+
+
+def get_piece_fingerprint(obj, depsgraph, pose_fingerprint):
+    # Cheap fingerprint of the evaluated piece, None if the piece may deform
+    # in ways that the pose and the object matrix don't describe
+    if obj.animation_data and not is_transform_animation(obj.animation_data):
+        return None
+    for m in obj.modifiers:
+        if m.show_viewport and m.type not in POSE_DRIVEN_MODIFIERS:
+            return None
+    matrix = np.array(obj.evaluated_get(depsgraph).matrix_world, 'f')
+    data = [
+        obj.name, obj.data.name, pose_fingerprint, np.round(matrix, 5).tobytes(),
+        get_deform_targets_fingerprint(obj, depsgraph)]
+    shape_keys = obj.data.shape_keys
+    if shape_keys:
+        if shape_keys.animation_data and shape_keys.animation_data.drivers:
+            return None
+        values = np.empty(len(shape_keys.key_blocks), 'f')
+        shape_keys.key_blocks.foreach_get("value", values)
+        data.append(np.round(values, 5).tobytes())
+    return hash(tuple(data))
+
+
+def make_mesh_from_arrays(vertices, indices, smooth=None, uvs=None):
+    mesh = bpy.data.meshes.new("object_name")
+    mesh.vertices.add(len(vertices))
+    mesh.vertices.foreach_set("co", np.ravel(vertices))
+    mesh.loops.add(indices.size)
+    mesh.loops.foreach_set("vertex_index", np.ravel(indices))
+    mesh.polygons.add(len(indices))
+    mesh.polygons.foreach_set("loop_start", np.arange(0, indices.size, 3, dtype='i'))
+    if bpy.app.version < (4, 0, 0):
+        mesh.polygons.foreach_set("loop_total", np.full(len(indices), 3, 'i'))
+    if smooth is not None:
+        mesh.polygons.foreach_set("use_smooth", smooth)
+    if uvs is not None:
+        mesh.uv_layers.new(name="UVMap").data.foreach_set("uv", np.ravel(uvs))
+    mesh.update(calc_edges=True)
+    return mesh
+
+
+def make_duplicate_mesh(obj, parent_empty, pose_cache=None, pose_fingerprint=b'',
+                        new_mesh=None):
     sc = bpy.context.scene.onion_skins_scene_props
     if obj.type != "MESH":
         return False
@@ -1549,8 +1753,25 @@ def make_duplicate_mesh(obj, parent_empty):
     depsgraph = bpy.context.evaluated_depsgraph_get()
     tmp_obj_pose = obj.evaluated_get(depsgraph)
 
-    newMesh = bpy.data.meshes.new_from_object(tmp_obj_pose)
-    newMesh.transform(obj.matrix_world)
+    key = None
+    if pose_cache is not None:
+        key = get_piece_fingerprint(obj, depsgraph, pose_fingerprint)
+    if new_mesh is not None:
+        # Already evaluated by a parallel bake worker
+        newMesh = new_mesh
+    elif key is not None and pose_cache.get(key):
+        # Hold pose: copy the already created mesh instead of evaluating it
+        newMesh = pose_cache[key].copy()
+    else:
+        newMesh = bpy.data.meshes.new_from_object(tmp_obj_pose)
+        newMesh.transform(obj.matrix_world)
+        if key is not None:
+            pose_cache[key] = newMesh
+    return link_skin_object(newMesh, parent_empty)
+
+
+def link_skin_object(newMesh, parent_empty):
+    sc = bpy.context.scene.onion_skins_scene_props
     OSkin = bpy.data.objects.new("object_name", newMesh)
     bpy.data.collections[OS_collection_name].objects.link(OSkin)
     # Make skin a child of the EMPTY
@@ -1572,9 +1793,10 @@ def make_duplicate_mesh(obj, parent_empty):
     return OSkin
 
 
-def make_skin_mesh_piece(obj, parent_empty, current_frame, at_frame, skin_type='ONION'):
+def make_skin_mesh_piece(obj, parent_empty, current_frame, at_frame, skin_type='ONION',
+                        pose_cache=None, pose_fingerprint=b'', new_mesh=None):
     sc = bpy.context.scene.onion_skins_scene_props
-    Skins = make_duplicate_mesh(obj, parent_empty)
+    Skins = make_duplicate_mesh(obj, parent_empty, pose_cache, pose_fingerprint, new_mesh)
     if not Skins:
         return False
     rename_os_mesh(obj, Skins, at_frame, current_frame, skin_type)
@@ -1591,13 +1813,329 @@ def make_skin_mesh_piece(obj, parent_empty, current_frame, at_frame, skin_type='
     return True
 
 
-def make_onionSkin_frame(self, obj, parent_empty, current_frame, at_frame, skin_type='ONION'):
-    Skins_count = 0
+def get_merged_pieces(skin):
+    # Source pieces of a skin that joins all pieces of its frame,
+    # the skin has a material slot for each of them in this order
+    names = skin.get('mos_pieces')
+    if not names:
+        return []
+    return names.split(SEPARATOR)
+
+
+def get_piece_mesh_arrays(obj, depsgraph):
+    # World space polygons of the evaluated piece as arrays
+    tmp_obj_pose = obj.evaluated_get(depsgraph)
+    mesh = tmp_obj_pose.to_mesh()
+    vertices = np.empty((len(mesh.vertices), 3), 'f')
+    mesh.vertices.foreach_get("co", np.reshape(vertices, len(mesh.vertices) * 3))
+    matrix = np.array(obj.matrix_world, 'f')
+    vertices = vertices @ matrix[:3, :3].T + matrix[:3, 3]
+    loop_starts = np.empty(len(mesh.polygons), 'i')
+    loop_totals = np.empty(len(mesh.polygons), 'i')
+    smooth = np.empty(len(mesh.polygons), bool)
+    mesh.polygons.foreach_get("loop_start", loop_starts)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+    mesh.polygons.foreach_get("use_smooth", smooth)
+    loops = np.empty(len(mesh.loops), 'i')
+    mesh.loops.foreach_get("vertex_index", loops)
+    uvs = None
+    if mesh.uv_layers.active:
+        uvs = np.empty(len(mesh.loops) * 2, 'f')
+        mesh.uv_layers.active.data.foreach_get("uv", uvs)
+    tmp_obj_pose.to_mesh_clear()
+    return (vertices, loop_starts, loop_totals, loops, smooth, uvs)
+
+
+def get_triangle_mesh_arrays(vertices, indices, smooth=None, uvs=None):
+    # Arrays of a piece evaluated by a parallel bake worker or read back
+    # from the GPU arrays, these have no smooth flags nor UVs
+    count = len(indices)
+    if smooth is None:
+        smooth = np.zeros(count, bool)
+    if uvs is not None:
+        uvs = np.ravel(uvs)
+    return (vertices, np.arange(0, count * 3, 3, dtype='i'), np.full(count, 3, 'i'),
+            np.ravel(indices).astype('i'), smooth, uvs)
+
+
+def make_merged_mesh(pieces, slots=None):
+    # One mesh with the polygons of all pieces, each piece uses its own material slot
+    if slots is None:
+        slots = range(len(pieces))
+    vertex_offsets = np.cumsum([0] + [len(p[0]) for p in pieces])
+    loop_offsets = np.cumsum([0] + [len(p[3]) for p in pieces])
+    vertices = np.concatenate([p[0] for p in pieces])
+    loops = np.concatenate([p[3] + vertex_offsets[i] for i, p in enumerate(pieces)])
+    loop_starts = np.concatenate([p[1] + loop_offsets[i] for i, p in enumerate(pieces)])
+    loop_totals = np.concatenate([p[2] for p in pieces])
+    smooth = np.concatenate([p[4] for p in pieces])
+    materials = np.concatenate(
+        [np.full(len(p[1]), slot, 'i') for slot, p in zip(slots, pieces)])
+    mesh = bpy.data.meshes.new("object_name")
+    mesh.vertices.add(len(vertices))
+    mesh.vertices.foreach_set("co", np.ravel(vertices))
+    mesh.loops.add(len(loops))
+    mesh.loops.foreach_set("vertex_index", loops)
+    mesh.polygons.add(len(loop_starts))
+    mesh.polygons.foreach_set("loop_start", loop_starts)
+    if bpy.app.version < (4, 0, 0):
+        mesh.polygons.foreach_set("loop_total", loop_totals)
+    mesh.polygons.foreach_set("material_index", materials)
+    mesh.polygons.foreach_set("use_smooth", smooth)
+    if any(p[5] is not None for p in pieces):
+        uvs = np.concatenate([
+            p[5] if p[5] is not None else np.zeros(len(p[3]) * 2, 'f') for p in pieces])
+        mesh.uv_layers.new(name="UVMap").data.foreach_set("uv", uvs)
+    mesh.update(calc_edges=True)
+    return mesh
+
+
+def get_skin_own_materials(skin):
+    pieces = get_merged_pieces(skin) or [list_to_str(skin.name.split('_')[1:-1], '_')]
+    return [bpy.data.materials[MAT_PREFIX + n + '_' + SUFFIX_own] for n in pieces]
+
+
+def set_skin_materials(skin, materials):
+    for i, mat in enumerate(materials):
+        if i < len(skin.data.materials):
+            skin.data.materials[i] = mat
+        else:
+            skin.data.materials.append(mat)
+
+
+def get_frame_piece_arrays(obj, pose_cache=None):
+    # Arrays and names of the pieces of the current frame
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    pose_fingerprint = b''
+    if pose_cache is not None:
+        pose_fingerprint = get_pose_fingerprint(obj, depsgraph)
+    pieces = []
+    names = []
+    for ob in get_skin_pieces(obj):
+        dublicate_own_material(ob.name)
+        key = None
+        if pose_cache is not None:
+            key = get_piece_fingerprint(ob, depsgraph, pose_fingerprint)
+        if key is not None and key in pose_cache:
+            arrays = pose_cache[key]
+        else:
+            arrays = get_piece_mesh_arrays(ob, depsgraph)
+            if key is not None:
+                pose_cache[key] = arrays
+        pieces.append(arrays)
+        names.append(ob.name)
+    return pieces, names
+
+
+def make_merged_skin(obj, parent_empty, current_frame, at_frame, skin_type, pieces, names):
+    sc = bpy.context.scene.onion_skins_scene_props
+    if not pieces:
+        return 0
+    Skins = link_skin_object(make_merged_mesh(pieces), parent_empty)
+    Skins['mos_pieces'] = SEPARATOR.join(names)
+    rename_os_mesh(obj, Skins, at_frame, current_frame, skin_type)
+    # Apply Colors
+    if sc.onionsk_colors:
+        if skin_type == 'MARKER':
+            apply_color_to_skin(Skins, current_frame, current_frame, skin_type)
+        else:
+            apply_color_to_skin(Skins, at_frame, current_frame)
+    else:
+        apply_color_to_skin(Skins, at_frame, current_frame, 'OWN')
+    Skins.select_set(False)
+    return 1
+
+
+def use_frames_skin():
+    sc = bpy.context.scene.onion_skins_scene_props
+    if sc.os_draw_mode != 'MESH' or not sc.single_skin_object:
+        return False
+    if bpy.app.version < (3, 2, 0):
+        print("Onion Skin: Single Object needs Blender 3.2 or newer, one object per skin is used")
+        return False
+    return True
+
+
+def get_frames_skin(objp):
+    if objp is None:
+        return None
+    return bpy.data.objects.get("onionsk_F_" + objp.name)
+
+
+def add_fade_nodes(mat):
+    # Mix the surface to transparent by the fade attribute of a frames skin,
+    # other skins have no such attribute and look the same as before
+    if not mat.use_nodes or mat.node_tree.nodes.get('mos_fade'):
+        return None
+    nodes = mat.node_tree.nodes
+    links = mat.node_tree.links
+    output = next((
+        n for n in nodes if n.type == 'OUTPUT_MATERIAL' and n.is_active_output), None)
+    if output is None or not output.inputs['Surface'].is_linked:
+        return None
+    surface = output.inputs['Surface'].links[0].from_socket
+    attribute = nodes.new('ShaderNodeAttribute')
+    attribute.attribute_name = 'fade'
+    transparent = nodes.new('ShaderNodeBsdfTransparent')
+    mix = nodes.new('ShaderNodeMixShader')
+    mix.name = 'mos_fade'
+    links.new(attribute.outputs['Fac'], mix.inputs[0])
+    links.new(surface, mix.inputs[1])
+    links.new(transparent.outputs[0], mix.inputs[2])
+    links.new(mix.outputs[0], output.inputs['Surface'])
+
+
+def new_group_socket(group, in_out, socket_type, name):
+    if hasattr(group, 'interface'):
+        return group.interface.new_socket(name=name, in_out=in_out, socket_type=socket_type)
+    if in_out == 'INPUT':
+        return group.inputs.new(socket_type, name)
+    return group.outputs.new(socket_type, name)
+
+
+def get_group_input_ids(group):
+    if hasattr(group, 'interface'):
+        return {
+            item.name: item.identifier for item in group.interface.items_tree
+            if item.item_type == 'SOCKET' and item.in_out == 'INPUT'}
+    return {socket.name: socket.identifier for socket in group.inputs}
+
+
+def get_node_socket(sockets, name, socket_type='VALUE'):
+    # Older nodes have a socket of each data type under the same name
+    for socket in sockets:
+        if socket.name == name and socket.enabled and socket.type == socket_type:
+            return socket
+    return sockets[name]
+
+
+def get_frames_node_group():
+    # Keep the frames inside the view window around the scene frame, store
+    # their fade and give them the before and after colors
+    group = bpy.data.node_groups.get(FRAMES_NODE_GROUP)
+    if group is not None:
+        return group
+    group = bpy.data.node_groups.new(FRAMES_NODE_GROUP, 'GeometryNodeTree')
+    new_group_socket(group, 'INPUT', 'NodeSocketGeometry', 'Geometry')
+    for socket_type, name in FRAMES_GROUP_INPUTS:
+        new_group_socket(group, 'INPUT', socket_type, name)
+    new_group_socket(group, 'OUTPUT', 'NodeSocketGeometry', 'Geometry')
+    nodes = group.nodes
+    links = group.links
+    group_in = nodes.new('NodeGroupInput')
+    group_out = nodes.new('NodeGroupOutput')
+
+    def math(operation, *values, clamp=False):
+        node = nodes.new('ShaderNodeMath')
+        node.operation = operation
+        node.use_clamp = clamp
+        for socket, value in zip(node.inputs, values):
+            if isinstance(value, (int, float)):
+                socket.default_value = value
+            else:
+                links.new(value, socket)
+        return node.outputs[0]
+
+    attribute = nodes.new('GeometryNodeInputNamedAttribute')
+    attribute.data_type = 'FLOAT'
+    attribute.inputs['Name'].default_value = 'frame'
+    time = nodes.new('GeometryNodeInputSceneTime')
+    diff = math('SUBTRACT', get_node_socket(attribute.outputs, 'Attribute'), time.outputs['Frame'])
+    distance = math('ABSOLUTE', diff)
+    before = math('LESS_THAN', diff, 0.0)
+    after = math('GREATER_THAN', diff, 0.0)
+    keep_before = math('MULTIPLY', before, math(
+        'SUBTRACT', 1.0, math('GREATER_THAN', distance, group_in.outputs['Before'])))
+    keep_after = math('MULTIPLY', after, math(
+        'SUBTRACT', 1.0, math('GREATER_THAN', distance, group_in.outputs['After'])))
+    delete = nodes.new('GeometryNodeDeleteGeometry')
+    delete.domain = 'POINT'
+    links.new(group_in.outputs['Geometry'], delete.inputs['Geometry'])
+    links.new(math('LESS_THAN', math('MAXIMUM', keep_before, keep_after), 0.5),
+              delete.inputs['Selection'])
+    fade_step = math(
+        'MULTIPLY_ADD', before,
+        math('SUBTRACT', group_in.outputs['Fade Before'], group_in.outputs['Fade After']),
+        group_in.outputs['Fade After'])
+    store = nodes.new('GeometryNodeStoreNamedAttribute')
+    store.data_type = 'FLOAT'
+    store.domain = 'POINT'
+    store.inputs['Name'].default_value = 'fade'
+    links.new(delete.outputs['Geometry'], store.inputs['Geometry'])
+    links.new(math('MULTIPLY', fade_step, math('SUBTRACT', distance, 1.0), clamp=True),
+              get_node_socket(store.inputs, 'Value'))
+    geometry = store.outputs['Geometry']
+    for name, side in (('before', before), ('after', after)):
+        material = nodes.new('GeometryNodeSetMaterial')
+        material.name = name
+        links.new(geometry, material.inputs['Geometry'])
+        links.new(math('MULTIPLY', side, group_in.outputs['Use Colors']),
+                  material.inputs['Selection'])
+        geometry = material.outputs['Geometry']
+    links.new(geometry, group_out.inputs['Geometry'])
+    return group
+
+
+class Frames_Skin(object):
+    # All baked frames of an object joined into one mesh with a frame
+    # attribute, a Geometry Nodes modifier shows the frames of the view range
+    def __init__(self, objp):
+        self.objp = objp
+        self.pieces = []
+        self.slots = []
+        self.frames = []
+        self.names = []
+
+    def add(self, frame, pieces, names):
+        for arrays, name in zip(pieces, names):
+            if name not in self.names:
+                self.names.append(name)
+            self.pieces.append(arrays)
+            self.slots.append(self.names.index(name))
+            self.frames.append(int(frame))
+        return 1 if pieces else 0
+
+    def build(self):
+        sc = bpy.context.scene.onion_skins_scene_props
+        if not self.pieces:
+            return None
+        mesh = make_merged_mesh(self.pieces, self.slots)
+        frames = np.concatenate([
+            np.full(len(p[0]), frame, 'i') for p, frame in zip(self.pieces, self.frames)])
+        mesh.attributes.new('frame', 'INT', 'POINT').data.foreach_set('value', frames)
+        mesh.attributes.new('fade', 'FLOAT', 'POINT')
+        mesh.name = 'mosf_' + self.objp.name
+        skin = get_frames_skin(self.objp)
+        if skin is None:
+            skin = link_skin_object(mesh, None)
+            skin.name = "onionsk_F_" + self.objp.name
+        else:
+            old_mesh = skin.data
+            skin.data = mesh
+            if old_mesh.users == 0:
+                bpy.data.meshes.remove(old_mesh)
+        skin['mos_frames'] = sorted(set(self.frames))
+        skin['mos_pieces'] = SEPARATOR.join(self.names)
+        register_skin_ids(get_skins_empty(self.objp), meshes=[mesh])
+        for n in self.names:
+            mat = dublicate_own_material(n)
+            add_fade_nodes(mat)
+            mesh.materials.append(mat)
+        for suffix in (SUFFIX_before, SUFFIX_after):
+            add_fade_nodes(bpy.data.materials[MAT_PREFIX + suffix])
+        modifier = skin.modifiers.get('mos_frames')
+        if modifier is None:
+            modifier = skin.modifiers.new('mos_frames', 'NODES')
+        modifier.node_group = get_frames_node_group()
+        skin.select_set(False)
+        update_frames_skin(bpy.context.scene, self.objp)
+        self.pieces = []
+
+
+def get_skin_pieces(obj):
+    pieces = []
     if obj.type == "MESH":
-        dublicate_own_material(obj.name)
-        make = make_skin_mesh_piece(obj, parent_empty, current_frame, at_frame, skin_type)
-        if make:
-            Skins_count = Skins_count + 1
+        pieces.append(obj)
     childrens = bpy.context.window_manager.os_childrens_collection
     for i in childrens:
         if not i.flag:
@@ -1610,16 +2148,800 @@ def make_onionSkin_frame(self, obj, parent_empty, current_frame, at_frame, skin_
                 print("OS: Object '" + i.name + "' does not exist in the current view layer ( Skiped )")
                 continue
         if ob.type == "MESH":
-            dublicate_own_material(ob.name)
-            make = make_skin_mesh_piece(ob, parent_empty, current_frame, at_frame, skin_type)
-            if make:
-                Skins_count = Skins_count + 1
+            pieces.append(ob)
+    return pieces
+
+
+def make_onionSkin_frame(self, obj, parent_empty, current_frame, at_frame, skin_type='ONION',
+                         pose_cache=None):
+    sc = bpy.context.scene.onion_skins_scene_props
+    if sc.merge_pieces:
+        pieces, names = get_frame_piece_arrays(obj, pose_cache)
+        return make_merged_skin(
+            obj, parent_empty, current_frame, at_frame, skin_type, pieces, names)
+    Skins_count = 0
+    pose_fingerprint = b''
+    if pose_cache is not None:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        pose_fingerprint = get_pose_fingerprint(obj, depsgraph)
+    for ob in get_skin_pieces(obj):
+        dublicate_own_material(ob.name)
+        make = make_skin_mesh_piece(
+            ob, parent_empty, current_frame, at_frame, skin_type,
+            pose_cache, pose_fingerprint)
+        if make:
+            Skins_count = Skins_count + 1
     return Skins_count
 
 
-def bake_gpu_mesh_piece(obj, curframe, at_frame, skin_type=''):
+def get_item_frame(item):
+    # Frame number of a disk cache item as it was baked (int or float)
+    value = item.rsplit('|@|', 1)[-1]
+    if '.' in value:
+        return float(value)
+    return int(value)
+
+
+def get_session_uid(ob):
+    # Id of the datablock for this session, it survives renaming and
+    # tells apart objects with the same name from different libraries
+    uid = getattr(ob, 'session_uid', None)
+    if uid is None:
+        return ob.as_pointer()
+    return uid
+
+
+class Frame_Piece(object):
+    # One baked child piece of a frame and everything drawn from it
+    __slots__ = (
+        'uid', 'name', 'frame', 'batch', 'nbytes', 'bounds', 'lods',
+        'piece', 'primitives', 'arrays', 'fingerprint', 'triangles')
+
+    def __init__(self, ob, frame):
+        self.uid = get_session_uid(ob)
+        self.name = ob.name
+        self.frame = frame
+        self.batch = None
+        self.nbytes = 0
+        self.bounds = None
+        self.lods = None
+        self.piece = None
+        self.primitives = None
+        self.arrays = None
+        self.fingerprint = None
+        self.triangles = 0
+
+    @property
+    def item(self):
+        # Key of the piece in the disk cache manifest
+        return self.name + '|@|' + str(self.frame)
+
+    def share(self, other):
+        # Hold pose: draw the same GPU data as an already baked piece
+        self.batch = other.batch
+        self.bounds = other.bounds
+        self.lods = other.lods
+        self.piece = other.piece
+        self.primitives = other.primitives
+        self.arrays = other.arrays
+        self.triangles = other.triangles
+        # The buffers are already counted by the piece that owns them
+        self.nbytes = 0
+
+
+class Object_Frames(object):
+    # Baked frames of one object: the pieces of every frame keyed by their
+    # session_uid, with a sorted index of the frames for range queries
+    __slots__ = ('uid', 'name', 'frames', 'index')
+
+    def __init__(self, objp):
+        self.uid = get_session_uid(objp)
+        self.name = objp.name
+        self.frames = {}
+        self.index = []
+
+    def __len__(self):
+        return sum(len(pieces) for pieces in self.frames.values())
+
+    def __bool__(self):
+        return bool(self.frames)
+
+    def add(self, entry):
+        frame = float(entry.frame)
+        pieces = self.frames.get(frame)
+        if pieces is None:
+            bisect.insort(self.index, frame)
+            pieces = self.frames[frame] = {}
+        pieces[entry.uid] = entry
+
+    def get(self, uid, frame):
+        pieces = self.frames.get(float(frame))
+        if pieces is None:
+            return None
+        return pieces.get(uid)
+
+    def pop(self, entry):
+        frame = float(entry.frame)
+        pieces = self.frames.get(frame)
+        if pieces is not None and pieces.get(entry.uid) is entry:
+            pieces.pop(entry.uid)
+            if not pieces:
+                self.pop_frame(frame)
+
+    def pop_frame(self, frame):
+        frame = float(frame)
+        pieces = self.frames.pop(frame, None)
+        if pieces is None:
+            return {}
+        del self.index[bisect.bisect_left(self.index, frame)]
+        return pieces
+
+    def clear(self):
+        self.frames.clear()
+        del self.index[:]
+
+    def entries(self):
+        return [entry for frame in self.index for entry in self.frames[frame].values()]
+
+    def frame_range(self, low, high):
+        # Frames between low and high, both included
+        return self.index[
+            bisect.bisect_left(self.index, low):bisect.bisect_right(self.index, high)]
+
+
+class Frame_Cache(object):
+    # Baked GPU frames of the objects keyed by their session_uid
+
+    def __init__(self):
+        self.objects = {}
+
+    def get(self, objp):
+        if objp is None:
+            return None
+        return self.objects.get(get_session_uid(objp))
+
+    def setdefault(self, objp):
+        uid = get_session_uid(objp)
+        record = self.objects.get(uid)
+        if record is None:
+            record = self.objects[uid] = Object_Frames(objp)
+        record.name = objp.name
+        return record
+
+    def pop(self, objp):
+        return self.objects.pop(get_session_uid(objp), None)
+
+    def clear(self):
+        self.objects.clear()
+
+    def values(self):
+        return list(self.objects.values())
+
+    def collect_garbage(self, alive):
+        # Drop the records and pieces whose objects were freed
+        removed = [uid for uid in self.objects if uid not in alive]
+        for uid in removed:
+            self.objects.pop(uid)
+        for record in self.objects.values():
+            for frame, pieces in list(record.frames.items()):
+                for uid in [uid for uid in pieces if uid not in alive]:
+                    pieces.pop(uid)
+                if not pieces:
+                    record.pop_frame(frame)
+        return removed
+
+
+GPU_FRAMES = Frame_Cache()
+GPU_MARKERS = Frame_Cache()
+
+
+class GPU_Cache_Manager(object):
+    # Byte accounting and eviction of the baked GPU frames
+
+    def __init__(self):
+        self.used = {}
+        self.evicted = {}
+        self.rebake = {}
+        self.total = 0
+
+    def clear(self, objp=None):
+        if objp is None:
+            self.used.clear()
+            self.evicted.clear()
+            self.rebake.clear()
+            self.total = 0
+            return None
+        uid = get_session_uid(objp)
+        self.forget(uid)
+        self.sync()
+
+    def forget(self, uid):
+        self.evicted.pop(uid, None)
+        self.rebake.pop(uid, None)
+        for key in [key for key in self.used if key[0] == uid]:
+            self.used.pop(key)
+
+    def add(self, record, entry):
+        old = record.get(entry.uid, entry.frame)
+        self.total += entry.nbytes - (old.nbytes if old is not None else 0)
+        record.add(entry)
+        frame = float(entry.frame)
+        self.used[(record.uid, frame)] = time.time()
+        evicted = self.evicted.get(record.uid)
+        if evicted:
+            evicted.pop(frame, None)
+
+    def touch(self, uid, frame):
+        self.used[(uid, float(frame))] = time.time()
+
+    def sync(self):
+        # Sum the sizes of the pieces that are still in GPU_FRAMES
+        self.total = sum(
+            entry.nbytes for record in GPU_FRAMES.values() for entry in record.entries())
+
+    def collect_garbage(self):
+        # Free the cache of objects that don't exist anymore
+        alive = set(get_session_uid(ob) for ob in bpy.data.objects)
+        removed = GPU_FRAMES.collect_garbage(alive)
+        GPU_MARKERS.collect_garbage(alive)
+        for uid in removed:
+            GPU_MERGED.pop(uid, None)
+            self.forget(uid)
+        for uid in [uid for uid in GPU_TOPOLOGY if uid not in alive]:
+            GPU_TOPOLOGY.pop(uid)
+            GPU_FEATURES.pop(uid, None)
+        self.sync()
+
+    def get_budget(self):
+        prefs = bpy.context.preferences.addons[__name__].preferences
+        return prefs.gpu_cache_budget * 1024 * 1024
+
+    def enforce(self, active=None, curframe=0, protect=()):
+        budget = self.get_budget()
+        if not budget:
+            return 0
+        self.sync()
+        if self.total <= budget:
+            return 0
+        prefs = bpy.context.preferences.addons[__name__].preferences
+        active_uid = get_session_uid(active) if active is not None else None
+        protect = set((active_uid, float(f)) for f in protect)
+        for ob in get_pinned_objects(bpy.context):
+            # Pinned objects are only baked while they are active, keep
+            # the frames they draw
+            uid = get_session_uid(ob)
+            if uid != active_uid:
+                protect.update((uid, float(f)) for f in self.get_window_frames(ob, curframe))
+        records = {}
+        groups = {}
+        for record in GPU_FRAMES.values():
+            records[record.uid] = record
+            for frame, pieces in record.frames.items():
+                if (record.uid, frame) in protect:
+                    continue
+                groups[(record.uid, frame)] = sum(entry.nbytes for entry in pieces.values())
+
+        def eviction_order(key):
+            uid, frame = key
+            used = self.used.get(key, 0)
+            if prefs.gpu_cache_eviction == 'LRU':
+                return (used,)
+            if uid != active_uid:
+                return (0, used)
+            return (1, -abs(frame - curframe))
+
+        evicted_count = 0
+        for key in sorted(groups, key=eviction_order):
+            if self.total <= budget:
+                break
+            uid, frame = key
+            pieces = records[uid].pop_frame(frame)
+            for entry in pieces.values():
+                self.evicted.setdefault(uid, {})[frame] = entry.frame
+            self.used.pop(key, None)
+            self.total -= groups[key]
+            evicted_count += 1
+        if evicted_count:
+            Draw_Plan.invalidate()
+        return evicted_count
+
+    def request_rebake(self, objp, frames):
+        uid = get_session_uid(objp)
+        evicted = self.evicted.get(uid)
+        if not evicted:
+            return None
+        wanted = [evicted[f] for f in (float(f) for f in frames) if f in evicted]
+        if not wanted:
+            return None
+        self.rebake[uid] = wanted
+        if not bpy.app.timers.is_registered(rebake_evicted_frames):
+            bpy.app.timers.register(rebake_evicted_frames, first_interval=0.1)
+
+    def get_window_frames(self, objp, curframe):
+        # Frames of the object (cached and evicted) that the view range shows
+        sc = bpy.context.scene.onion_skins_scene_props
+        frames = set(self.evicted.get(get_session_uid(objp), {}))
+        record = GPU_FRAMES.get(objp)
+        if record:
+            frames.update(record.index)
+        frames = sorted(frames)
+        if not sc.view_range:
+            return frames
+        if sc.onionsk_method == 'KEYFRAME' and sc.view_range_frame_type == 'KEYFRAME':
+            before = bisect.bisect_left(frames, curframe)
+            after = bisect.bisect_right(frames, curframe)
+            return frames[max(before - sc.view_before, 0):before] +\
+                frames[after:after + sc.view_after]
+        return frames[
+            bisect.bisect_left(frames, curframe - sc.view_before):
+            bisect.bisect_right(frames, curframe + sc.view_after)]
+
+
+GPU_CACHE = GPU_Cache_Manager()
+
+
+def get_disk_cache_directory():
+    filepath = bpy.data.filepath
+    if not filepath:
+        return os.path.join(bpy.app.tempdir, 'mesh_onion_skins_cache')
+    return os.path.splitext(filepath)[0] + '_onion_skins_cache'
+
+
+class Disk_Cache(object):
+    # Sidecar cache of the baked GPU frames next to the .blend file.
+    # Arrays are saved as .npy files by a background thread and
+    # memory-mapped back when the object is drawn after the file is opened.
+    manifest_name = 'manifest.json'
+
+    def __init__(self):
+        self.directory = None
+        self.manifest = {}
+        self.pending = set()
+        self.index_files = {}
+        # Arrays queued for the writer thread by file name
+        self.writing = {}
+        self.queue = queue.Queue()
+        self.thread = None
+
+    def is_enabled(self):
+        prefs = bpy.context.preferences.addons[__name__].preferences
+        return prefs.disk_cache
+
+    def put(self, *job):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self.writer, daemon=True)
+            self.thread.start()
+        if job[0] == 'ARRAY':
+            self.writing[job[2]] = job[3]
+        self.queue.put(job)
+
+    def writer(self):
+        while True:
+            job = self.queue.get()
+            try:
+                if job[0] == 'ARRAY':
+                    self.write_array(*job[1:])
+                elif job[0] == 'MANIFEST':
+                    self.write_manifest(*job[1:])
+                elif job[0] == 'COPY':
+                    self.copy_files(*job[1:])
+            except OSError as error:
+                print("Onion Skin: Disk cache write failed: " + str(error))
+            finally:
+                if job[0] == 'ARRAY':
+                    self.writing.pop(job[2], None)
+                self.queue.task_done()
+
+    def write_array(self, directory, name, array):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, name)
+        with open(path + '.tmp', 'wb') as f:
+            np.save(f, array)
+        os.replace(path + '.tmp', path)
+
+    def write_manifest(self, directory, text, referenced):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, self.manifest_name)
+        with open(path + '.tmp', 'w') as f:
+            f.write(text)
+        os.replace(path + '.tmp', path)
+        for name in os.listdir(directory):
+            if name.endswith('.npy') and name not in referenced:
+                os.remove(os.path.join(directory, name))
+
+    def copy_files(self, source, directory, names):
+        os.makedirs(directory, exist_ok=True)
+        for name in names:
+            path = os.path.join(source, name)
+            if os.path.isfile(path):
+                shutil.copy2(path, os.path.join(directory, name))
+
+    def flush(self):
+        if self.thread is not None and self.thread.is_alive():
+            self.queue.join()
+
+    def load_array(self, name, mmap_mode=None):
+        # Arrays that the writer thread didn't save yet are read from memory,
+        # an array leaves writing only once its file is in place
+        array = self.writing.get(name)
+        if array is not None:
+            return array
+        path = os.path.join(self.directory, name)
+        if not os.path.isfile(path) and self.queue.unfinished_tasks:
+            # Still copied along after the file was saved under another name
+            self.flush()
+        return np.load(path, mmap_mode=mmap_mode)
+
+    def get_referenced_files(self):
+        referenced = set(self.index_files.values())
+        for entries in self.manifest.values():
+            for entry in entries.values():
+                referenced.add(entry['vertices'])
+                referenced.add(entry['indices'])
+        return referenced
+
+    def check_directory(self):
+        # The file was saved under another name, take the cache along
+        directory = get_disk_cache_directory()
+        if self.directory == directory:
+            return None
+        if self.directory is not None and self.manifest:
+            self.put('COPY', self.directory, directory, list(self.get_referenced_files()))
+        self.directory = directory
+        if self.manifest:
+            self.save_manifest()
+
+    def load(self):
+        self.flush()
+        self.directory = get_disk_cache_directory()
+        self.manifest = {}
+        self.pending = set()
+        self.index_files = {}
+        path = os.path.join(self.directory, self.manifest_name)
+        if not bpy.data.filepath or not self.is_enabled() or not os.path.isfile(path):
+            return None
+        try:
+            with open(path) as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError) as error:
+            print("Onion Skin: Disk cache can't be read: " + str(error))
+            self.manifest = {}
+        self.pending = set(self.manifest)
+
+    def save_manifest(self):
+        self.put(
+            'MANIFEST', self.directory, json.dumps(self.manifest),
+            self.get_referenced_files())
+
+    def write(self, objp_name, obj, item, skin_type, vertices, indices):
+        if not self.is_enabled():
+            return None
+        self.check_directory()
+        topology = (obj.name, hash(indices.tobytes()))
+        indices_file = self.index_files.get(topology)
+        if indices_file is None:
+            indices_file = uuid.uuid4().hex + '.npy'
+            self.index_files[topology] = indices_file
+            self.put('ARRAY', self.directory, indices_file, indices)
+        vertices_file = uuid.uuid4().hex + '.npy'
+        self.put('ARRAY', self.directory, vertices_file, vertices)
+        files = (vertices_file, indices_file)
+        self.link(objp_name, item, skin_type, files)
+        return files
+
+    def link(self, objp_name, item, skin_type, files):
+        if not files or not self.is_enabled():
+            return None
+        self.manifest.setdefault(objp_name, {})[item] = {
+            'type': skin_type or 'ONION',
+            'vertices': files[0],
+            'indices': files[1],
+            'fingerprint': None,
+        }
+
+    def commit(self, objp):
+        # Sync the entries of the object with its baked frames and save
+        entries = self.manifest.get(objp.name)
+        if entries is None or not self.is_enabled():
+            return None
+        baked = {}
+        for record in (GPU_FRAMES.get(objp), GPU_MARKERS.get(objp)):
+            if record:
+                baked.update((entry.item, entry) for entry in record.entries())
+        evicted = GPU_CACHE.evicted.get(get_session_uid(objp), {})
+        current = {}
+        for item in list(entries):
+            if item in baked:
+                fingerprint = baked[item].fingerprint
+                if fingerprint is None:
+                    # Baked now without the memo, it matches the current data
+                    fingerprint = get_piece_bake_fingerprint(objp, baked[item].name, current)
+                entries[item]['fingerprint'] = fingerprint
+            elif entries[item]['type'] == 'MARKER' or\
+                    float(get_item_frame(item)) not in evicted:
+                entries.pop(item)
+        if not entries:
+            self.manifest.pop(objp.name)
+        self.check_directory()
+        self.save_manifest()
+
+    def read(self, objp_name, item):
+        # Arrays of a cached piece, None when the cache doesn't have them
+        entry = self.manifest.get(objp_name, {}).get(item)
+        if entry is None or not self.is_enabled():
+            return None
+        try:
+            vertices = self.load_array(entry['vertices'], 'r')
+            indices = np.asarray(self.load_array(entry['indices']))
+        except (OSError, ValueError) as error:
+            print("Onion Skin: Disk cache entry is missing: " + str(error))
+            return None
+        return (vertices, indices)
+
+    def remove(self, objp_name):
+        entries = self.manifest.pop(objp_name, None)
+        self.pending.discard(objp_name)
+        if not entries:
+            return None
+        pieces = set(item.rsplit('|@|', 1)[0] for item in entries)
+        for topology in [t for t in self.index_files if t[0] in pieces]:
+            self.index_files.pop(topology)
+        self.save_manifest()
+
+    def restore(self, objp, frames=None):
+        # Bring back the cached frames of the object without evaluating it
+        if frames is None:
+            if objp.name not in self.pending:
+                return 0
+            self.pending.discard(objp.name)
+        entries = self.manifest.get(objp.name, {})
+        loaded_indices = {}
+        current = {}
+        stale = []
+        count = 0
+        for item, entry in entries.items():
+            frame = get_item_frame(item)
+            if frames is not None and float(frame) not in frames:
+                continue
+            if entry['type'] == 'MARKER':
+                record = GPU_MARKERS.setdefault(objp)
+            else:
+                record = GPU_FRAMES.setdefault(objp)
+            obj = bpy.data.objects.get(item.rsplit('|@|', 1)[0])
+            if obj is None or record.get(get_session_uid(obj), frame) is not None:
+                continue
+            if entry['fingerprint'] != get_piece_bake_fingerprint(objp, obj.name, current):
+                # Written for data that changed after, e.g. the file was
+                # closed without saving
+                stale.append(item)
+                continue
+            try:
+                vertices = self.load_array(entry['vertices'], 'r')
+                indices = loaded_indices.get(entry['indices'])
+                if indices is None:
+                    indices = self.load_array(entry['indices'], 'r')
+                    loaded_indices[entry['indices']] = indices
+            except (OSError, ValueError) as error:
+                print("Onion Skin: Disk cache entry is missing: " + str(error))
+                continue
+            indices = np.ascontiguousarray(indices)
+            self.index_files[(obj.name, hash(indices.tobytes()))] = entry['indices']
+            piece = Frame_Piece(obj, frame)
+            piece.bounds = get_piece_bounds(vertices)
+            piece.nbytes = vertices.nbytes
+            piece.triangles = len(indices)
+            piece.fingerprint = entry['fingerprint']
+            if entry['type'] == 'MARKER':
+                piece.batch, piece.piece = make_piece_batch(piece.uid, vertices, indices)
+                record.add(piece)
+            else:
+                if use_lod_draw():
+                    piece.lods = make_lod_batches(vertices, indices)
+                if use_merged_draw():
+                    shared, nbytes = get_topology_indices(piece.uid, indices)
+                    piece.arrays = (vertices, shared)
+                    piece.nbytes += nbytes
+                else:
+                    piece.batch, piece.piece = make_piece_batch(piece.uid, vertices, indices)
+                GPU_CACHE.add(record, piece)
+            count += 1
+        if stale:
+            print("Onion Skin: Dropped " + str(len(stale)) + " outdated disk cache frames of " + objp.name)
+            for item in stale:
+                entries.pop(item)
+            if not entries:
+                self.manifest.pop(objp.name)
+            self.save_manifest()
+        if count:
+            Draw_Plan.invalidate()
+        if count and frames is None:
+            curframe = bpy.context.scene.frame_current
+            GPU_CACHE.enforce(objp, curframe, GPU_CACHE.get_window_frames(objp, curframe))
+        return count
+
+
+DISK_CACHE = Disk_Cache()
+
+
+def rebake_evicted_frames():
+    # Bake again the evicted frames that came back into the view
+    context = bpy.context
+    if context.screen and context.screen.is_animation_playing:
+        return 0.5
+    obj = context.active_object
+    objp = checkout_parent(obj)
+    if not objp or get_session_uid(objp) not in GPU_CACHE.rebake:
+        # The frames of other objects wait until they are active again
+        return None
+    frames = GPU_CACHE.rebake.pop(get_session_uid(objp))
+    if not GPU_FRAMES.get(objp):
+        return None
+    global CREATING
+    CREATING = True
+    scene = context.scene
+    curframe = scene.frame_current
+    DISK_CACHE.restore(objp, set(float(f) for f in frames))
+    evicted = GPU_CACHE.evicted.get(get_session_uid(objp), {})
+    try:
+        for frame in [f for f in frames if float(f) in evicted]:
+            scene.frame_set(int(frame))
+            make_gpu_frame(objp, curframe, frame)
+    finally:
+        scene.frame_set(curframe)
+        CREATING = False
+    GPU_CACHE.enforce(objp, curframe, GPU_CACHE.get_window_frames(objp, curframe))
+    DISK_CACHE.commit(objp)
+    for area in context.screen.areas:
+        if area.type == 'VIEW_3D':
+            area.tag_redraw()
+    return None
+
+
+def store_gpu_entry(entry, skin_type=''):
+    objp = checkout_parent(bpy.context.active_object)
+    if skin_type == 'MARKER':
+        GPU_MARKERS.setdefault(objp).add(entry)
+    else:
+        GPU_CACHE.add(GPU_FRAMES.setdefault(objp), entry)
+    Draw_Plan.invalidate()
+
+
+def get_topology(uid, indices, topology=None):
+    # One [index buffer, index array] per piece topology, shared by all the
+    # baked frames and filled by the first frame that needs either
+    if topology is None:
+        topology = hash(np.ascontiguousarray(indices).tobytes())
+    if uid not in GPU_TOPOLOGY:
+        GPU_TOPOLOGY[uid] = {}
+    shared = GPU_TOPOLOGY[uid].get(topology)
+    if shared is None:
+        shared = GPU_TOPOLOGY[uid][topology] = [None, None]
+    return shared
+
+
+def get_topology_index_buffer(uid, indices, topology=None):
+    shared = get_topology(uid, indices, topology)
+    if shared[0] is None:
+        shared[0] = gpu.types.GPUIndexBuf(type='TRIS', seq=indices)
+    return shared[0]
+
+
+def get_topology_indices(uid, indices, topology=None):
+    # Shared index array and the bytes it adds to the cache, only the frame
+    # that stores it first counts it
+    shared = get_topology(uid, indices, topology)
+    if shared[1] is not None:
+        return shared[1], 0
+    shared[1] = np.ascontiguousarray(indices, 'i')
+    return shared[1], shared[1].nbytes
+
+
+def make_gpu_vbo(vertices):
+    vbo_format = gpu.types.GPUVertFormat()
+    vbo_format.attr_add(id="pos", comp_type='F32', len=3, fetch_mode='FLOAT')
+    vbo = gpu.types.GPUVertBuf(len=len(vertices), format=vbo_format)
+    vbo.attr_fill(id="pos", data=vertices)
+    return vbo
+
+
+def make_gpu_batch(vertices, ibo):
+    return gpu.types.GPUBatch(type='TRIS', buf=make_gpu_vbo(vertices), elem=ibo)
+
+
+def make_piece_batch(uid, vertices, indices):
+    # Triangles batch of a baked piece, with its vertex buffer and topology
+    # to draw the same piece as edges or points
+    topology = hash(indices.tobytes())
+    ibo = get_topology_index_buffer(uid, indices, topology)
+    features = GPU_FEATURES.setdefault(uid, {})
+    if topology not in features:
+        # [arrays, (edges, angles), index buffers], the edges are found from
+        # the arrays of this frame when the topology is first drawn as edges
+        features[topology] = [(vertices, indices), None, {}]
+    vbo = make_gpu_vbo(vertices)
+    batch = gpu.types.GPUBatch(type='TRIS', buf=vbo, elem=ibo)
+    return (batch, (vbo, len(vertices), uid, topology))
+
+
+def get_feature_edges(vertices, indices):
+    # Unique edges of the triangles and the angle between their faces,
+    # open borders and non-manifold edges get the largest angle
+    tris = np.asarray(indices, np.int64).reshape(-1, 3)
+    vertices = np.asarray(vertices, 'f')
+    if not len(tris):
+        return (np.empty((0, 2), 'i'), np.empty(0, 'f'))
+    normals = np.cross(vertices[tris[:, 1]] - vertices[tris[:, 0]],
+                       vertices[tris[:, 2]] - vertices[tris[:, 0]])
+    normals /= np.maximum(np.linalg.norm(normals, axis=1), 1e-12)[:, None]
+    edges = np.concatenate([tris[:, [0, 1]], tris[:, [1, 2]], tris[:, [2, 0]]])
+    faces = np.tile(np.arange(len(tris)), 3)
+    edges.sort(axis=1)
+    order = np.lexsort((edges[:, 1], edges[:, 0]))
+    edges = edges[order]
+    faces = faces[order]
+    start = np.ones(len(edges), bool)
+    start[1:] = (edges[1:] != edges[:-1]).any(axis=1)
+    first = np.flatnonzero(start)
+    counts = np.diff(np.append(first, len(edges)))
+    angles = np.full(len(first), np.pi, 'f')
+    shared = counts == 2
+    dots = (normals[faces[first[shared]]] * normals[faces[first[shared] + 1]]).sum(axis=1)
+    angles[shared] = np.arccos(np.clip(dots, -1.0, 1.0))
+    return (np.ascontiguousarray(edges[first], 'i'), angles)
+
+
+def get_primitive_batch(entry, primitive):
+    # Edges or points batch sharing the vertex buffer of a baked piece
+    sc = bpy.context.scene.onion_skins_scene_props
+    vbo, count, uid, topology = entry.piece
+    if primitive == 'EDGES':
+        option = round(sc.gpu_edge_angle, 4)
+    else:
+        option = sc.gpu_point_stride
+    if entry.primitives is None:
+        entry.primitives = {}
+    batches = entry.primitives
+    if (primitive, option) not in batches:
+        batch = None
+        if primitive == 'EDGES':
+            feature = GPU_FEATURES[uid][topology]
+            if feature[1] is None:
+                feature[1] = get_feature_edges(*feature[0])
+                feature[0] = None
+            (edges, angles), ibos = feature[1], feature[2]
+            if option not in ibos:
+                selected = edges[angles >= option - 1e-4]
+                ibos[option] = None
+                if len(selected):
+                    ibos[option] = gpu.types.GPUIndexBuf(type='LINES', seq=selected)
+            if ibos[option] is not None:
+                batch = gpu.types.GPUBatch(type='LINES', buf=vbo, elem=ibos[option])
+        else:
+            if (count, option) not in GPU_POINTS:
+                GPU_POINTS[(count, option)] = gpu.types.GPUIndexBuf(
+                    type='POINTS', seq=np.arange(0, count, option, dtype='i'))
+            batch = gpu.types.GPUBatch(
+                type='POINTS', buf=vbo, elem=GPU_POINTS[(count, option)])
+        batches[(primitive, option)] = batch
+    return batches[(primitive, option)]
+
+
+def bake_gpu_mesh_piece(obj, curframe, at_frame, skin_type='',
+                        pose_cache=None, pose_fingerprint=b''):
     global SHADER
     depsgraph = bpy.context.evaluated_depsgraph_get()
+    key = None
+    if pose_cache is not None:
+        key = get_piece_fingerprint(obj, depsgraph, pose_fingerprint)
+    objp = checkout_parent(bpy.context.active_object)
+    if key is not None and key in pose_cache:
+        # Hold pose: the piece looks the same as in an already baked frame
+        baked, files = pose_cache[key]
+        entry = Frame_Piece(obj, at_frame)
+        entry.share(baked)
+        store_gpu_entry(entry, skin_type)
+        DISK_CACHE.link(objp.name, entry.item, skin_type, files)
+        return True
     tmp_obj_pose = obj.evaluated_get(depsgraph)
     mesh = tmp_obj_pose.to_mesh()
     mesh.update()
@@ -1635,39 +2957,613 @@ def bake_gpu_mesh_piece(obj, curframe, at_frame, skin_type=''):
         "co", np.reshape(vertices, len(mesh.vertices) * 3))
     mesh.loop_triangles.foreach_get(
         "vertices", np.reshape(indices, len(mesh.loop_triangles) * 3))
-    batch = batch_for_shader(SHADER, 'TRIS', {"pos": vertices}, indices=indices)
+    tmp_obj_pose.to_mesh_clear()
+    cached = store_gpu_arrays(obj, at_frame, vertices, indices, skin_type)
+    if key is not None:
+        pose_cache[key] = cached
+    return True
+
+
+def get_entry_arrays(objp, entry):
+    # Vertices and indices of a baked piece, kept for the merged batch or
+    # read back from the disk cache
+    if entry.arrays is not None:
+        return entry.arrays
+    return DISK_CACHE.read(objp.name, entry.item)
+
+
+def store_gpu_arrays(obj, at_frame, vertices, indices, skin_type=''):
     objp = checkout_parent(bpy.context.active_object)
-    if skin_type == 'MARKER':
-        global GPU_MARKERS
-        GPU_MARKERS[objp.name][obj.name + '|@|' + str(at_frame)] = batch
+    entry = Frame_Piece(obj, at_frame)
+    entry.nbytes = vertices.nbytes
+    if skin_type != 'MARKER' and use_merged_draw():
+        # Drawn from the merged batch of the object, keep the arrays to build it
+        shared, nbytes = get_topology_indices(entry.uid, indices)
+        entry.arrays = (vertices, shared)
+        entry.nbytes += nbytes
     else:
-        global GPU_FRAMES
-        GPU_FRAMES[objp.name][obj.name + '|@|' + str(at_frame)] = batch
-    return True
+        entry.batch, entry.piece = make_piece_batch(entry.uid, vertices, indices)
+    entry.bounds = get_piece_bounds(vertices)
+    entry.triangles = len(indices)
+    if skin_type != 'MARKER' and use_lod_draw():
+        entry.lods = make_lod_batches(vertices, indices)
+        entry.nbytes += sum(lod[2] for lod in entry.lods[1])
+    store_gpu_entry(entry, skin_type)
+    files = DISK_CACHE.write(objp.name, obj, entry.item, skin_type, vertices, indices)
+    return (entry, files)
+
+
+def get_piece_bounds(vertices):
+    # World space bounding box of a baked piece as (min, max)
+    if not len(vertices):
+        return None
+    vertices = np.asarray(vertices)
+    return (vertices.min(axis=0), vertices.max(axis=0))
+
 
+def get_bounds_corners(bounds):
+    lo, hi = bounds
+    return np.array([
+        (x, y, z, 1.0) for x in (lo[0], hi[0]) for y in (lo[1], hi[1]) for z in (lo[2], hi[2])
+    ], 'f')
 
-def make_gpu_frame(obj, curframe, at_frame, skin_type=''):
+
+def get_culled_mask(context, corners):
+    # Test the bounding box corners (N, 8, 4) against the view frustum and
+    # the pixel size threshold, return the culled boxes of both tests
+    prefs = bpy.context.preferences.addons[__name__].preferences
+    matrix = np.array(context.region_data.perspective_matrix, 'f')
+    clip = corners @ matrix.T
+    w = clip[..., 3:4]
+    xyz = clip[..., :3]
+    off_screen = ((xyz < -w).all(axis=1) | (xyz > w).all(axis=1)).any(axis=1)
+    if not prefs.gpu_frustum_culling:
+        off_screen[:] = False
+    too_small = np.zeros(len(corners), bool)
+    if prefs.gpu_cull_screen_size > 0:
+        # Boxes crossing the view plane are never too small
+        in_front = (w[..., 0] > 0).all(axis=1)
+        ndc = xyz[..., :2] / np.where(w > 0, w, 1.0)
+        extent = (ndc.max(axis=1) - ndc.min(axis=1)) * 0.5
+        size = np.maximum(extent[:, 0] * context.region.width,
+                          extent[:, 1] * context.region.height)
+        too_small = in_front & (size < prefs.gpu_cull_screen_size) & ~off_screen
+    return off_screen, too_small
+
+
+def get_screen_sizes(context, corners):
+    # Projected size in pixels of the bounding boxes, boxes crossing
+    # the view plane are treated as infinitely large
+    matrix = np.array(context.region_data.perspective_matrix, 'f')
+    clip = corners @ matrix.T
+    w = clip[..., 3:4]
+    ndc = clip[..., :2] / np.where(w > 0, w, 1.0)
+    extent = (ndc.max(axis=1) - ndc.min(axis=1)) * 0.5
+    size = np.maximum(extent[:, 0] * context.region.width,
+                      extent[:, 1] * context.region.height)
+    return np.where((w[..., 0] > 0).all(axis=1), size, np.inf)
+
+
+def use_lod_draw():
+    prefs = bpy.context.preferences.addons[__name__].preferences
+    return prefs.gpu_lod != 'NONE' and not bpy.app.background
+
+
+def make_lod_arrays(vertices, indices, resolution):
+    # Vertex clustering: the vertices in the same cell of a grid sized from
+    # the bounding box are merged into their average position
+    vertices = np.asarray(vertices, 'f')
+    indices = np.asarray(indices)
+    if not len(vertices) or not len(indices):
+        return None
+    lo = vertices.min(axis=0)
+    cell = float((vertices.max(axis=0) - lo).max()) / resolution
+    if cell <= 0:
+        return None
+    cells = np.floor((vertices - lo) / cell).astype(np.int64)
+    dims = cells.max(axis=0) + 1
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    keys, inverse = np.unique(keys, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    counts = np.bincount(inverse, minlength=len(keys))
+    lod_vertices = np.empty((len(keys), 3), 'f')
+    for axis in range(3):
+        lod_vertices[:, axis] = np.bincount(
+            inverse, vertices[:, axis], minlength=len(keys)) / counts
+    tris = inverse[indices]
+    tris = tris[(tris[:, 0] != tris[:, 1]) & (tris[:, 1] != tris[:, 2]) &
+                (tris[:, 0] != tris[:, 2])]
+    if not len(tris):
+        return None
+    # Triangles collapsed onto the same cells are kept once, in their winding
+    unique, first = np.unique(np.sort(tris, axis=1), axis=0, return_index=True)
+    tris = tris[np.sort(first)]
+    return (lod_vertices, np.ascontiguousarray(tris, 'i'))
+
+
+def make_lod_batches(vertices, indices):
+    # (full triangle count, [(batch, triangles, bytes), ...]) from fine to coarse
+    prefs = bpy.context.preferences.addons[__name__].preferences
+    lods = []
+    triangles = len(indices)
+    for resolution in (prefs.gpu_lod_resolution, max(prefs.gpu_lod_resolution // 4, 2)):
+        arrays = make_lod_arrays(vertices, indices, resolution)
+        if arrays is None or len(arrays[1]) >= triangles:
+            break
+        lod_vertices, lod_indices = arrays
+        ibo = gpu.types.GPUIndexBuf(type='TRIS', seq=lod_indices)
+        lods.append((make_gpu_batch(lod_vertices, ibo), len(lod_indices), lod_vertices.nbytes))
+        triangles = len(lod_indices)
+    return (len(indices), lods)
+
+
+def make_gpu_frame(obj, curframe, at_frame, skin_type='', pose_cache=None):
     Skins_count = 0
-    if obj.type == "MESH":
-        bake = bake_gpu_mesh_piece(obj, curframe, at_frame, skin_type)
+    pose_fingerprint = b''
+    if pose_cache is not None:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        pose_fingerprint = get_pose_fingerprint(obj, depsgraph)
+    for ob in get_skin_pieces(obj):
+        bake = bake_gpu_mesh_piece(
+            ob, curframe, at_frame, skin_type, pose_cache, pose_fingerprint)
         if bake:
             Skins_count = Skins_count + 1
-    childrens = bpy.context.window_manager.os_childrens_collection
-    for i in childrens:
-        if not i.flag:
+    return Skins_count
+
+
+PARALLEL_WORKER_SCRIPT = """
+import os
+import sys
+import json
+import bpy
+import numpy as np
+
+with open(sys.argv[sys.argv.index('--') + 1]) as f:
+    args = json.load(f)
+scene = bpy.context.scene
+pieces = [bpy.data.objects[name] for name in args['pieces']]
+for index, frame in args['frames']:
+    scene.frame_set(int(frame))
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    for i, obj in enumerate(pieces):
+        tmp_obj_pose = obj.evaluated_get(depsgraph)
+        mesh = tmp_obj_pose.to_mesh()
+        mesh.transform(obj.matrix_world)
+        mesh.calc_loop_triangles()
+        vertices = np.empty((len(mesh.vertices), 3), 'f')
+        indices = np.empty((len(mesh.loop_triangles), 3), 'i')
+        mesh.vertices.foreach_get('co', np.reshape(vertices, len(mesh.vertices) * 3))
+        mesh.loop_triangles.foreach_get(
+            'vertices', np.reshape(indices, len(mesh.loop_triangles) * 3))
+        smooth = np.empty(len(mesh.loop_triangles), bool)
+        mesh.loop_triangles.foreach_get('use_smooth', smooth)
+        uvs = None
+        if mesh.uv_layers.active:
+            # UVs of the three corners of each triangle
+            loops = np.empty(len(mesh.loop_triangles) * 3, 'i')
+            mesh.loop_triangles.foreach_get('loops', loops)
+            loop_uvs = np.empty(len(mesh.loops) * 2, 'f')
+            mesh.uv_layers.active.data.foreach_get('uv', loop_uvs)
+            uvs = np.reshape(loop_uvs, (len(mesh.loops), 2))[loops]
+        tmp_obj_pose.to_mesh_clear()
+        name = os.path.join(args['output'], str(index) + '_' + str(i))
+        np.save(name + '_v.npy', vertices)
+        np.save(name + '_i.npy', indices)
+        np.save(name + '_s.npy', smooth)
+        if uvs is not None:
+            np.save(name + '_uv.npy', uvs)
+    open(os.path.join(args['output'], str(index) + '.done'), 'w').close()
+"""
+
+
+class Parallel_Bake(object):
+    # Evaluate the frames in background Blender processes working on
+    # a saved copy of the file, the arrays are read back from .npy files.
+    # The frames that aren't done before the deadline are baked serially.
+
+    def __init__(self, frames, pieces, workers):
+        self.frames = list(frames)
+        self.frame_index = {frame: i for i, frame in enumerate(self.frames)}
+        self.pieces = [ob.name for ob in pieces]
+        self.workers = min(workers, len(self.frames))
+        self.directory = tempfile.mkdtemp(prefix='onion_bake_', dir=bpy.app.tempdir or None)
+        self.processes = []
+        self.failed = set()
+        self.deadline = None
+
+    def start(self):
+        blend = os.path.join(self.directory, 'scene.blend')
+        bpy.ops.wm.save_as_mainfile(filepath=blend, copy=True, check_existing=False)
+        script = os.path.join(self.directory, 'worker.py')
+        with open(script, 'w') as f:
+            f.write(PARALLEL_WORKER_SCRIPT)
+        if bpy.context.preferences.filepaths.use_scripts_auto_execute:
+            autoexec = '-y'
+        else:
+            autoexec = '-Y'
+        threads = str(max((os.cpu_count() or 1) // self.workers, 1))
+        for n, chunk in enumerate(np.array_split(np.arange(len(self.frames)), self.workers)):
+            args_path = os.path.join(self.directory, 'worker_' + str(n) + '.json')
+            with open(args_path, 'w') as f:
+                json.dump({
+                    'frames': [[int(i), self.frames[i]] for i in chunk],
+                    'pieces': self.pieces,
+                    'output': self.directory,
+                }, f)
+            with open(os.path.join(self.directory, 'worker_' + str(n) + '.log'), 'w') as log:
+                process = subprocess.Popen(
+                    [bpy.app.binary_path, '-b', autoexec, '-t', threads, blend,
+                     '--python', script, '--', args_path],
+                    stdout=log, stderr=subprocess.STDOUT)
+            self.processes.append((process, set(chunk.tolist()), n))
+        self.deadline = time.time() + PARALLEL_TIMEOUT
+
+    def get_process(self, index):
+        for process, chunk, n in self.processes:
+            if index in chunk:
+                return process, n
+
+    def is_done(self, index):
+        return os.path.isfile(os.path.join(self.directory, str(index) + '.done'))
+
+    def is_ready(self, frame):
+        # Done, failed or past the deadline: load won't wait for the frame
+        index = self.frame_index.get(frame)
+        if index is None or not self.processes or self.is_done(index):
+            return True
+        process, n = self.get_process(index)
+        if process.poll() is not None:
+            return True
+        if time.time() > self.deadline:
+            print("Onion Skin: Background bake timed out, baking the remaining frames here")
+            self.stop()
+            return True
+        return False
+
+    def load(self, frame):
+        # None when the frame has to be baked serially
+        index = self.frame_index.get(frame)
+        if index is None:
+            return None
+        while not self.is_ready(frame):
+            time.sleep(0.01)
+        if not self.is_done(index):
+            if self.processes:
+                process, n = self.get_process(index)
+                if n not in self.failed:
+                    self.failed.add(n)
+                    print("Onion Skin: Background bake failed, see " +
+                          os.path.join(self.directory, 'worker_' + str(n) + '.log'))
+            return None
+        # Every finished frame gives the workers more time
+        self.deadline = time.time() + PARALLEL_TIMEOUT
+        arrays = []
+        for i, name in enumerate(self.pieces):
+            path = os.path.join(self.directory, str(index) + '_' + str(i))
+            uvs = None
+            if os.path.isfile(path + '_uv.npy'):
+                uvs = np.load(path + '_uv.npy')
+            arrays.append((
+                bpy.data.objects[name], np.load(path + '_v.npy'), np.load(path + '_i.npy'),
+                np.load(path + '_s.npy'), uvs))
+        return arrays
+
+    def stop(self):
+        for process, chunk, n in self.processes:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+        self.processes = []
+
+    def close(self):
+        self.stop()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def get_id_objects(value):
+    # Objects of an Object or Collection pointer
+    if isinstance(value, bpy.types.Object):
+        return [value]
+    if isinstance(value, bpy.types.Collection):
+        return list(value.all_objects)
+    return []
+
+
+def get_struct_objects(struct):
+    objects = []
+    for prop in struct.bl_rna.properties:
+        if prop.type != 'POINTER' or prop.identifier == 'rna_type':
+            continue
+        objects += get_id_objects(getattr(struct, prop.identifier))
+    return objects
+
+
+def get_node_tree_objects(node_tree, visited):
+    # Objects and collections set on the sockets of the nodes,
+    # nested node groups included
+    if node_tree is None or node_tree.name_full in visited:
+        return []
+    visited.add(node_tree.name_full)
+    objects = []
+    for node in node_tree.nodes:
+        for socket in node.inputs:
+            objects += get_id_objects(getattr(socket, 'default_value', None))
+        if node.type == 'GROUP':
+            objects += get_node_tree_objects(node.node_tree, visited)
+    return objects
+
+
+def get_modifier_objects(modifier):
+    objects = get_struct_objects(modifier)
+    if modifier.type == 'NODES':
+        # Geometry Nodes inputs are stored as ID properties of the modifier
+        for key in modifier.keys():
+            objects += get_id_objects(modifier[key])
+        objects += get_node_tree_objects(modifier.node_group, set())
+    return objects
+
+
+def get_constraints_objects(constraints):
+    objects = []
+    for c in constraints:
+        objects += get_struct_objects(c)
+        if hasattr(c, 'targets'):
+            objects += [t.target for t in c.targets if t.target]
+    return objects
+
+
+def get_drivers_objects(id_data):
+    anim = getattr(id_data, 'animation_data', None)
+    if not anim:
+        return []
+    objects = []
+    for d in anim.drivers:
+        for v in d.driver.variables:
+            for t in v.targets:
+                objects += get_id_objects(t.id)
+    return objects
+
+
+def get_evaluation_dependencies(objects):
+    # Objects needed to evaluate the given objects: parents, modifier and
+    # constraint targets, Geometry Nodes inputs, driver variables and the
+    # objects of instanced collections and particles
+    needed = {}
+    stack = list(objects)
+    while stack:
+        ob = stack.pop()
+        if ob is None or ob.name_full in needed:
             continue
+        needed[ob.name_full] = ob
+        if ob.parent:
+            stack.append(ob.parent)
+        for m in ob.modifiers:
+            stack += get_modifier_objects(m)
+        if ob.instance_type == 'COLLECTION':
+            stack += get_id_objects(ob.instance_collection)
+        for ps in getattr(ob, 'particle_systems', []):
+            stack += get_struct_objects(ps.settings)
+        stack += get_constraints_objects(ob.constraints)
+        if ob.pose:
+            for pb in ob.pose.bones:
+                stack += get_constraints_objects(pb.constraints)
+        stack += get_drivers_objects(ob)
+        if ob.data:
+            stack += get_drivers_objects(ob.data)
+            shape_keys = getattr(ob.data, 'shape_keys', None)
+            if shape_keys:
+                stack += get_drivers_objects(shape_keys)
+    return needed
+
+
+class Quiet_Evaluation(object):
+    # Evaluate only the onion skin objects while baking: exclude the view
+    # layer collections that don't contain them and suspend the frame
+    # change handler of the add-on. Everything is restored afterwards,
+    # the selection and hidden state of the objects too as excluding a
+    # collection resets them.
+
+    def __init__(self, objects):
+        self.needed = set(get_evaluation_dependencies(objects))
+        self.view_layer = None
+        self.excluded = []
+        self.states = {}
+        self.handlers = []
+
+    def is_needed(self, collection):
+        for ob in collection.all_objects:
+            if ob.name_full in self.needed:
+                return True
+        return False
+
+    def exclude_collections(self, layer_collection):
+        for lc in layer_collection.children:
+            if lc.exclude or lc.collection.name == OS_collection_name:
+                continue
+            if self.is_needed(lc.collection):
+                self.exclude_collections(lc)
+                continue
+            for ob in lc.collection.all_objects:
+                if ob.name_full not in self.states:
+                    self.states[ob.name_full] = (
+                        ob, ob.select_get(view_layer=self.view_layer),
+                        ob.hide_get(view_layer=self.view_layer))
+            lc.exclude = True
+            self.excluded.append(lc)
+
+    def suspend(self, context):
+        handlers = bpy.app.handlers.frame_change_post
+        if m_os_post_frames_handler in handlers:
+            handlers.remove(m_os_post_frames_handler)
+            self.handlers.append(m_os_post_frames_handler)
+        self.view_layer = context.view_layer
         try:
-            ob = bpy.context.view_layer.objects[i.name]
-        except KeyError:
-            ob = bpy.data.objects[i.name]
-            if not ob.library:
-                print("OS: Object '" + i.name + "' does not exists in the current view layer ( Skiped )")
+            self.exclude_collections(self.view_layer.layer_collection)
+        except Exception:
+            self.restore()
+            raise
+
+    def restore(self):
+        try:
+            for lc in reversed(self.excluded):
+                try:
+                    lc.exclude = False
+                except ReferenceError:
+                    pass
+            for ob, select, hide in self.states.values():
+                try:
+                    ob.hide_set(hide, view_layer=self.view_layer)
+                    ob.select_set(select, view_layer=self.view_layer)
+                except (ReferenceError, RuntimeError):
+                    pass
+        finally:
+            self.excluded = []
+            self.states = {}
+            handlers = bpy.app.handlers.frame_change_post
+            for func in self.handlers:
+                if func not in handlers:
+                    handlers.append(func)
+            self.handlers = []
+
+
+def get_action_fingerprint(action):
+    if not action:
+        return None
+    data = []
+    for fcurve in action.fcurves:
+        keys = fcurve.keyframe_points
+        count = len(keys)
+        co = np.empty(count * 6, 'f')
+        keys.foreach_get("co", co[:count * 2])
+        keys.foreach_get("handle_left", co[count * 2:count * 4])
+        keys.foreach_get("handle_right", co[count * 4:])
+        interpolation = get_keys_enum_values(keys, "interpolation")
+        data.append(co.tobytes())
+        data.append(interpolation.tobytes())
+        data.append(str((fcurve.mute, len(fcurve.modifiers))).encode())
+    return hashlib.md5(b''.join(data)).hexdigest()
+
+
+def get_anim_fingerprint(id_data):
+    anim = getattr(id_data, 'animation_data', None)
+    if not anim:
+        return None
+    return get_action_fingerprint(anim.action)
+
+
+def get_modifiers_fingerprint(modifiers):
+    fingerprint = []
+    for m in modifiers:
+        for prop in m.bl_rna.properties:
+            if prop.identifier == 'rna_type' or prop.type == 'COLLECTION':
                 continue
-        if ob.type == "MESH":
-            bake = bake_gpu_mesh_piece(ob, curframe, at_frame, skin_type)
-            if bake:
-                Skins_count = Skins_count + 1
-    return Skins_count
+            value = getattr(m, prop.identifier)
+            if prop.type == 'POINTER':
+                value = getattr(value, 'name', None)
+            elif getattr(prop, 'is_array', False):
+                value = tuple(value)
+            fingerprint.append((getattr(m, 'name', m.type), prop.identifier, value))
+    return tuple(fingerprint)
+
+
+def get_drivers_fingerprint(id_data, targets):
+    # Drivers of the data-block, their target objects are added to targets
+    anim = getattr(id_data, 'animation_data', None)
+    if not anim:
+        return None
+    fingerprint = []
+    for fcurve in anim.drivers:
+        driver = fcurve.driver
+        variables = []
+        for var in driver.variables:
+            for t in var.targets:
+                if isinstance(t.id, bpy.types.Object):
+                    targets.add(t.id)
+                variables.append((
+                    var.name, var.type, getattr(t.id, 'name', None), t.data_path,
+                    t.bone_target, t.transform_type, t.transform_space))
+        fingerprint.append((
+            fcurve.data_path, fcurve.array_index, driver.type, driver.expression,
+            tuple(variables)))
+    return tuple(fingerprint)
+
+
+def get_constraints_fingerprint(ob, targets):
+    # Constraints of an object or a pose bone, their target objects are
+    # added to targets
+    targets.update(get_constraints_objects(ob.constraints))
+    return get_modifiers_fingerprint(ob.constraints)
+
+
+def get_pose_constraints_fingerprint(ob, targets):
+    # Constraints of the pose bones: IK, Child Of, Copy Transforms...
+    if not getattr(ob, 'pose', None):
+        return None
+    return tuple(
+        (pb.name, get_constraints_fingerprint(pb, targets))
+        for pb in ob.pose.bones if len(pb.constraints))
+
+
+def get_mesh_fingerprint(mesh):
+    # Checksum of the vertex positions and the shape key values, changed by
+    # edits that don't touch the vertex count
+    co = np.empty(len(mesh.vertices) * 3, 'f')
+    mesh.vertices.foreach_get("co", co)
+    data = [co.tobytes()]
+    shape_keys = mesh.shape_keys
+    if shape_keys:
+        values = np.empty(len(shape_keys.key_blocks), 'f')
+        shape_keys.key_blocks.foreach_get("value", values)
+        data.append(values.tobytes())
+    return hashlib.md5(b''.join(data)).hexdigest()
+
+
+def get_target_fingerprint(ob):
+    # Target objects of constraints and drivers, their own animation or the
+    # transform they are left at
+    anim = get_anim_fingerprint(ob)
+    matrix = None
+    if anim is None:
+        matrix = tuple(tuple(np.round(row, 5)) for row in ob.matrix_basis)
+    return (ob.name, anim, matrix, getattr(ob.parent, 'name', None))
+
+
+def get_bake_fingerprint(objp, obj):
+    shape_keys = getattr(obj.data, 'shape_keys', None)
+    targets = set()
+    fingerprint = (
+        get_anim_fingerprint(objp),
+        get_anim_fingerprint(obj) if obj != objp else None,
+        get_anim_fingerprint(shape_keys) if shape_keys else None,
+        get_modifiers_fingerprint(obj.modifiers),
+        obj.data.name,
+        len(obj.data.vertices),
+        get_mesh_fingerprint(obj.data),
+        getattr(obj.parent, 'name', None),
+        get_constraints_fingerprint(objp, targets),
+        get_constraints_fingerprint(obj, targets) if obj != objp else None,
+        get_pose_constraints_fingerprint(objp, targets),
+        get_drivers_fingerprint(objp, targets),
+        get_drivers_fingerprint(obj, targets) if obj != objp else None,
+        get_drivers_fingerprint(shape_keys, targets) if shape_keys else None,
+    )
+    for m in obj.modifiers:
+        if isinstance(getattr(m, 'object', None), bpy.types.Object):
+            targets.add(m.object)
+    targets.discard(objp)
+    targets.discard(obj)
+    fingerprint += tuple(sorted(get_target_fingerprint(ob) for ob in targets))
+    # Stable between sessions, so it can be kept in the disk cache
+    return hashlib.md5(repr(fingerprint).encode()).hexdigest()
+
+
+def get_piece_bake_fingerprint(objp, name, current):
+    # get_bake_fingerprint of a piece by name, current caches the pieces
+    # already computed in this pass
+    if name not in current:
+        obj = bpy.data.objects.get(name)
+        current[name] = get_bake_fingerprint(objp, obj) if obj is not None else None
+    return current[name]
 
 
 def remove_time_markers():
@@ -1693,43 +3589,84 @@ def remove_motion_paths(context, mode, only_selected=True):
             bpy.ops.object.paths_clear(only_selected=only_selected)
 
 
-def remove_materials(objp, obj_tree, skin_type='ONION'):
-    onion_mats = [
-        mat for mat in bpy.data.materials
-        if text_lookup(MAT_PREFIX, mat.name)
-    ]
-    for om in onion_mats:
-        #  Remove '_own' materials
-        if text_lookup(SUFFIX_own, om.name):
-            if text_lookup(objp.name, om.name):
-                if om.users == 0:
-                    bpy.data.materials.remove(om, do_unlink=True)
-                    continue
-            childrens = childrens_lookup(objp)
-            for ob_owner in childrens:
-                if text_lookup(ob_owner.name, om.name):
-                    if om.users == 0:
-                        bpy.data.materials.remove(om, do_unlink=True)
-                        break
-        #  Remove every onion_skins materials except...
-        elif not text_lookup(SUFFIX_before, om.name) and\
-                not text_lookup(SUFFIX_after, om.name) and\
-                not text_lookup(SUFFIX_marker, om.name) and\
-                not text_lookup(SUFFIX_own, om.name):
-            if om.users == 0:
-                bpy.data.materials.remove(om, do_unlink=True)
+def get_skins_empty(objp):
+    # Empty that keeps the registry of the skins data of the object, the
+    # markers one when the object has only markers
+    if objp is None:
+        return None
+    return bpy.data.objects.get("onionsk_" + objp.name) or\
+        bpy.data.objects.get("onionsk_M_" + objp.name)
 
 
-def remove_mesh_data(obj_tree):
-    params = bpy.context.window_manager.onionSkinsParams
-    ch = 0
-    for x in obj_tree.children:
-        mesh = x.data
-        bpy.data.objects.remove(x, do_unlink=True)
-        if bpy.data.meshes[mesh.name].users == 0:
-            bpy.data.meshes.remove(mesh)
-        ch = ch + 1
-    return ch
+def register_skin_ids(empty, meshes=(), materials=()):
+    # Names of the meshes and materials made for the skins of the empty, its
+    # children are the skin objects
+    if not empty:
+        return None
+    if SKIN_IDS_PROP not in empty:
+        empty[SKIN_IDS_PROP] = {key: {} for key in SKIN_IDS_KEYS}
+    registry = empty[SKIN_IDS_PROP]
+    for key, ids in zip(SKIN_IDS_KEYS, (meshes, materials)):
+        if key not in registry:
+            registry[key] = {}
+        for id in ids:
+            registry[key][id.name] = 1
+
+
+def register_piece_material(obj_name, mat):
+    ob = bpy.data.objects.get(obj_name)
+    if ob is not None:
+        register_skin_ids(get_skins_empty(checkout_parent(ob)), materials=[mat])
+
+
+def get_registered_ids(empty):
+    registry = empty.get(SKIN_IDS_PROP) if empty else None
+    if not registry:
+        return [], []
+    found = []
+    for key, collection in zip(SKIN_IDS_KEYS, (bpy.data.meshes, bpy.data.materials)):
+        names = registry[key].keys() if key in registry else []
+        found.append([
+            id for id in (collection.get(n) for n in names) if id is not None])
+    return found
+
+
+def is_base_material(mat):
+    return mat.name in (
+        MAT_PREFIX + SUFFIX_before, MAT_PREFIX + SUFFIX_after, MAT_PREFIX + SUFFIX_marker)
+
+
+def remove_skin_ids(objects, empty=None, keep_empty=None):
+    # Remove the skin objects with their meshes and materials in one batch,
+    # with the empty also the data it registered. Data that something else
+    # still uses stays, registered materials move to keep_empty
+    objects = set(objects)
+    meshes, materials = get_registered_ids(empty)
+    if empty:
+        objects.add(empty)
+    mesh_refs = {}
+    for ob in objects:
+        if ob.type == 'MESH':
+            mesh_refs[ob.data] = mesh_refs.get(ob.data, 0) + 1
+    meshes = [
+        mesh for mesh in set(meshes).union(mesh_refs)
+        if mesh.users == mesh_refs.get(mesh, 0) and not mesh.use_fake_user]
+    mat_refs = {}
+    for mesh in meshes:
+        for mat in mesh.materials:
+            if mat is not None:
+                mat_refs[mat] = mat_refs.get(mat, 0) + 1
+    remove_mats = []
+    keep_mats = []
+    for mat in set(materials).union(mat_refs):
+        if is_base_material(mat):
+            continue
+        if mat.users == mat_refs.get(mat, 0) and not mat.use_fake_user:
+            remove_mats.append(mat)
+        elif mat in materials:
+            keep_mats.append(mat)
+    bpy.data.batch_remove(list(objects) + meshes + remove_mats)
+    register_skin_ids(keep_empty, materials=keep_mats)
 
 
 def remove_skins(obj, skin_type='ONION'):
@@ -1754,10 +3691,18 @@ def remove_skins(obj, skin_type='ONION'):
     except KeyError:
         pass
 
+    skins = []
     if tree:
-        ch = remove_mesh_data(tree)
-        remove_materials(objp, tree, skin_type)
-        bpy.data.objects.remove(tree, do_unlink=True)
+        ch = len(tree.children)
+        skins = list(tree.children)
+    if skin_type == 'ONION':
+        frames_skin = get_frames_skin(objp)
+        if frames_skin is not None:
+            skins.append(frames_skin)
+    if skins or tree:
+        keep_empty = get_empty_objs_tree(
+            objp, 'MARKER' if skin_type == 'ONION' else 'ONION')
+        remove_skin_ids(skins, tree, keep_empty)
 
     if skin_type == 'ONION':
         objp.onionsk_Skins_count = 0
@@ -1772,40 +3717,413 @@ def remove_skins(obj, skin_type='ONION'):
         objp.is_os_marker = 0
 
 
-def run_filter_keyframes(key):
-    skip = False
+def get_key_type_values():
+    items = bpy.types.Keyframe.bl_rna.properties['type'].enum_items
+    return {item.identifier: item.value for item in items}
+
+
+def get_filter_key_types():
     sc = bpy.context.scene.onion_skins_scene_props
-    if sc.key_type_keyframe is False:
-        if key.type == 'KEYFRAME':
-            skip = True
-    if sc.key_type_breakdown is False:
-        if key.type == 'BREAKDOWN':
-            skip = True
-    if sc.key_type_movinghold is False:
-        if key.type == 'MOVING_HOLD':
-            skip = True
-    if sc.key_type_extreme is False:
-        if key.type == 'EXTREME':
-            skip = True
-    if sc.key_type_jitter is False:
-        if key.type == 'JITTER':
-            skip = True
-
-    return skip
-
-
-def run_filter_active_bone(obj, fcurve):
-    if obj.type == 'MESH':
-        return False
-    active_bone = obj.data.bones.active
+    key_types = (
+        ('KEYFRAME', sc.key_type_keyframe),
+        ('BREAKDOWN', sc.key_type_breakdown),
+        ('MOVING_HOLD', sc.key_type_movinghold),
+        ('EXTREME', sc.key_type_extreme),
+        ('JITTER', sc.key_type_jitter),
+    )
+    values = get_key_type_values()
+    return [values[key_type] for key_type, use in key_types if not use]
+
+
+def get_keys_enum_values(keys, attr):
+    values = np.empty(len(keys), 'i')
     try:
-        if fcurve.data_path.split('"')[1] != active_bone.name:
-            skip = True
+        keys.foreach_get(attr, values)
+    except (TypeError, RuntimeError):
+        items = bpy.types.Keyframe.bl_rna.properties[attr].enum_items
+        enum_values = {item.identifier: item.value for item in items}
+        values = np.array([enum_values[getattr(key, attr)] for key in keys], 'i')
+    return values
+
+
+def get_fcurve_key_types(keys):
+    return get_keys_enum_values(keys, "type")
+
+
+def get_fcurve_bone_name(fcurve):
+    data_path = fcurve.data_path
+    if not data_path.startswith('pose.bones["'):
+        return None
+    group = fcurve.group
+    if group and data_path.startswith('pose.bones["' + group.name + '"]'):
+        return group.name
+    try:
+        return data_path.split('"')[1]
+    except IndexError:
+        return None
+
+
+class Action_Keys(object):
+
+    def __init__(self, frames, values):
+        self.full_keys = np.stack((frames, values), axis=-1)
+        self.frames = np.unique(frames).tolist()
+        self.curframe = None
+        self.before = 0
+        self.after = 0
+
+    def split(self, curframe):
+        if curframe != self.curframe:
+            self.before = bisect.bisect_left(self.frames, curframe)
+            self.after = bisect.bisect_right(self.frames, curframe)
+            self.curframe = curframe
+        return self.frames[:self.before], self.frames[self.after:]
+
+
+class Action_Keys_Index(object):
+
+    def __init__(self):
+        self.fingerprint = None
+        self.layout = None
+        self.fcurves = []
+        self.channels = []
+        self.fcurve_bones = {}
+        self.bone_fcurves = {}
+        self.filtered = {}
+
+    def check_fingerprint(self, action, full=True):
+        # The key counts and the frame range are cheap to compare, the keys
+        # are hashed again only when they differ or with full, e.g. after
+        # an action was edited
+        layout = (
+            tuple(len(fcurve.keyframe_points) for fcurve in action.fcurves),
+            tuple(action.frame_range))
+        if not full and self.fingerprint is not None and layout == self.layout:
+            return True
+        self.layout = layout
+        co_list = []
+        types_list = []
+        channels = []
+        for fcurve in action.fcurves:
+            keys = fcurve.keyframe_points
+            co = np.empty(len(keys) * 2, 'f')
+            keys.foreach_get("co", co)
+            co_list.append(co)
+            types_list.append(get_fcurve_key_types(keys))
+            channels.append((fcurve.data_path, fcurve.array_index))
+        counts = tuple(len(co) for co in co_list)
+        checksum = 0
+        if co_list:
+            checksum = hash((
+                np.concatenate(co_list).tobytes(),
+                np.concatenate(types_list).tobytes()))
+        fingerprint = (len(co_list), counts, checksum, hash(tuple(channels)))
+        if fingerprint == self.fingerprint:
+            return True
+        self.fingerprint = fingerprint
+        self.rebuild(action, co_list, types_list, channels)
+        return False
+
+    def rebuild(self, action, co_list, types_list, channels):
+        self.fcurves = []
+        for co, types in zip(co_list, types_list):
+            co = np.reshape(co, (-1, 2))
+            self.fcurves.append((co[:, 0], co[:, 1], types))
+        # Renamed, removed or added channels move the fcurve indices
+        if channels != self.channels or not self.bone_fcurves:
+            self.update_bones(action, channels)
+            self.channels = channels
+        self.filtered.clear()
+
+    def update_bones(self, action, channels):
+        # Resolve bone names only for fcurves that were added since the
+        # last update and drop the removed ones
+        fcurve_bones = {}
+        for fcurve, channel in zip(action.fcurves, channels):
+            if channel in self.fcurve_bones:
+                fcurve_bones[channel] = self.fcurve_bones[channel]
+            else:
+                fcurve_bones[channel] = get_fcurve_bone_name(fcurve)
+        self.fcurve_bones = fcurve_bones
+        self.bone_fcurves = {}
+        for i, channel in enumerate(channels):
+            bone_name = fcurve_bones[channel]
+            if bone_name is None:
+                continue
+            if bone_name in self.bone_fcurves:
+                self.bone_fcurves[bone_name].append(i)
+            else:
+                self.bone_fcurves[bone_name] = [i]
+
+    def get_fcurve_indices(self, bone_names=None):
+        if bone_names is None:
+            return range(len(self.fcurves))
+        indices = []
+        for bone_name in bone_names:
+            indices += self.bone_fcurves.get(bone_name, [])
+        indices.sort()
+        return indices
+
+    def get_keys(self, exclude_types=(), bone_names=None):
+        filter_key = (exclude_types, bone_names)
+        keys = self.filtered.get(filter_key)
+        if keys is not None:
+            return keys
+        frames = []
+        values = []
+        for i in self.get_fcurve_indices(bone_names):
+            key_frames, key_values, key_types = self.fcurves[i]
+            if exclude_types:
+                mask = np.isin(key_types, exclude_types, invert=True)
+                key_frames = key_frames[mask]
+                key_values = key_values[mask]
+            frames.append(key_frames)
+            values.append(key_values)
+        if frames:
+            keys = Action_Keys(np.concatenate(frames), np.concatenate(values))
         else:
-            skip = False
-    except (AttributeError, IndexError) as e:
-        skip = True
-    return skip
+            keys = Action_Keys(np.empty(0, 'f'), np.empty(0, 'f'))
+        if len(self.filtered) >= KEYS_FILTER_LIMIT:
+            # Drop the oldest filter, e.g. of a bone selection long gone
+            self.filtered.pop(next(iter(self.filtered)))
+        self.filtered[filter_key] = keys
+        return keys
+
+
+def get_action_keys_index(action, full=True):
+    index = KEYS_INDEX.get(action.as_pointer())
+    if index is None:
+        index = KEYS_INDEX[action.as_pointer()] = Action_Keys_Index()
+    index.check_fingerprint(action, full)
+    return index
+
+
+def get_filter_bone_names(obj):
+    sc = bpy.context.scene.onion_skins_scene_props
+    bone_names = set()
+    if sc.filter_active_bone:
+        active_bone = obj.data.bones.active
+        if active_bone:
+            bone_names.add(active_bone.name)
+    if sc.filter_selected_bones:
+        bone_names.update(b.name for b in obj.data.bones if b.select)
+    elif not sc.filter_active_bone:
+        return None
+    return frozenset(bone_names)
+
+
+def get_action_keys(obj, action):
+    sc = bpy.context.scene.onion_skins_scene_props
+    exclude_types = ()
+    bone_names = None
+    if sc.filter_keyframes:
+        exclude_types = tuple(get_filter_key_types())
+        if obj.type == 'ARMATURE':
+            bone_names = get_filter_bone_names(obj)
+    index = get_action_keys_index(action)
+    return index.get_keys(exclude_types, bone_names)
+
+
+INFINITE = float('inf')
+# Key columns of the FCurve_Shape rows
+# co x, co y, handle_left x, y, handle_right x, y, interpolation, easing,
+# back, amplitude, period
+SEGMENT_COLUMNS = {
+    # interpolation of the left key: (left key columns, right key columns)
+    'CONSTANT': ([1, 6], []),
+    'LINEAR': ([0, 1, 6], [0, 1]),
+    'BEZIER': ([0, 1, 4, 5, 6], [0, 1, 2, 3]),
+}
+EASING_COLUMNS = ([0, 1, 6, 7, 8, 9, 10], [0, 1])
+
+
+def get_segment_columns():
+    items = bpy.types.Keyframe.bl_rna.properties['interpolation'].enum_items
+    return {
+        item.value: SEGMENT_COLUMNS.get(item.identifier, EASING_COLUMNS)
+        for item in items
+    }
+
+
+class FCurve_Shape(object):
+    # Snapshot of everything that defines the values of an fcurve
+
+    def __init__(self, fcurve, segment_columns):
+        keys = fcurve.keyframe_points
+        count = len(keys)
+        rows = np.zeros((count, 11))
+        for i, attr in enumerate(("co", "handle_left", "handle_right")):
+            co = np.empty(count * 2, 'f')
+            keys.foreach_get(attr, co)
+            rows[:, i * 2:i * 2 + 2] = co.reshape(count, 2)
+        rows[:, 6] = get_keys_enum_values(keys, "interpolation")
+        rows[:, 7] = get_keys_enum_values(keys, "easing")
+        for i, attr in enumerate(("back", "amplitude", "period")):
+            values = np.empty(count, 'f')
+            keys.foreach_get(attr, values)
+            rows[:, 8 + i] = values
+        self.rows = rows
+        self.frames = rows[:, 0].tolist()
+        self.segment_columns = segment_columns
+        self.settings = (
+            fcurve.extrapolation, fcurve.mute,
+            get_modifiers_fingerprint(fcurve.modifiers))
+        self.cycles = self.get_cycles(fcurve)
+        self.data = rows.tobytes()
+
+    def __eq__(self, other):
+        return self.data == other.data and self.settings == other.settings
+
+    def get_cycles(self, fcurve):
+        cycles = [m for m in fcurve.modifiers if m.type == 'CYCLES']
+        if not cycles:
+            return None
+        m = cycles[0]
+        if len(cycles) > 1 or m != fcurve.modifiers[0] or m.use_restricted_range or\
+                m.use_influence:
+            return 'COMPLEX'
+        return (m.mode_before, m.mode_after)
+
+    def signature(self, frame):
+        # The fcurve value at the frame is a function of the frame
+        # and this signature only
+        frames = self.frames
+        rows = self.rows
+        if self.settings[1] or not frames:
+            return None
+        i = bisect.bisect_right(frames, frame) - 1
+        last = len(frames) - 1
+        if i >= 0 and frames[i] == frame:
+            return ('KEY', rows[i, 1])
+        if i < 0:
+            if self.settings[0] == 'CONSTANT':
+                return ('START', rows[0, 1])
+            return ('START_LINEAR', rows[0].tobytes(), rows[min(1, last), :2].tobytes())
+        if i == last:
+            if self.settings[0] == 'CONSTANT':
+                return ('END', rows[i, 1])
+            return ('END_LINEAR', rows[i].tobytes(), rows[max(i - 1, 0)].tobytes())
+        left, right = self.segment_columns[int(rows[i, 6])]
+        return ('SEGMENT', rows[i, left].tobytes(), rows[i + 1, right].tobytes())
+
+
+def get_action_shapes(action):
+    if not action:
+        return {}
+    segment_columns = get_segment_columns()
+    return {
+        (fcurve.data_path, fcurve.array_index): FCurve_Shape(fcurve, segment_columns)
+        for fcurve in action.fcurves
+    }
+
+
+def get_shape_changes(old, new):
+    # Sweep the regions between the keys of both states, in each of them
+    # the segment that defines the value is the same for all frames
+    breaks = sorted(set(old.frames) | set(new.frames))
+    if not breaks:
+        return []
+    regions = [(-INFINITE, breaks[0], False, False, breaks[0] - 1)]
+    for j, frame in enumerate(breaks):
+        next_frame = breaks[j + 1] if j + 1 < len(breaks) else INFINITE
+        sample = (frame + next_frame) / 2 if next_frame != INFINITE else frame + 1
+        regions.append((frame, frame, True, True, frame))
+        regions.append((frame, next_frame, False, False, sample))
+    intervals = []
+    last_changed = None
+    for j, (start, end, start_closed, end_closed, sample) in enumerate(regions):
+        if old.signature(sample) == new.signature(sample):
+            continue
+        if last_changed == j - 1:
+            start, _, start_closed, _ = intervals[-1]
+            intervals[-1] = (start, end, start_closed, end_closed)
+        else:
+            intervals.append((start, end, start_closed, end_closed))
+        last_changed = j
+    return intervals
+
+
+def clip_interval(interval, start, end):
+    lo, hi, lo_closed, hi_closed = interval
+    if lo < start:
+        lo, lo_closed = start, True
+    if hi > end:
+        hi, hi_closed = end, True
+    if lo > hi:
+        return None
+    return (lo, hi, lo_closed, hi_closed)
+
+
+def get_cyclic_changes(old, new, bounds):
+    full_range = [(-INFINITE, INFINITE, False, False)]
+    if old.cycles != new.cycles or old.cycles == 'COMPLEX' or\
+            len(old.frames) < 2 or len(new.frames) < 2:
+        return full_range
+    start, end = old.frames[0], old.frames[-1]
+    if (start, end) != (new.frames[0], new.frames[-1]):
+        # The cycle period has changed
+        return full_range
+    if 'REPEAT_OFFSET' in old.cycles and\
+            (old.rows[0, 1], old.rows[-1, 1]) != (new.rows[0, 1], new.rows[-1, 1]):
+        return full_range
+    mode_before, mode_after = old.cycles
+    period = end - start
+    count_before = max(int(np.ceil((start - bounds[0]) / period)), 0) + 1
+    count_after = max(int(np.ceil((bounds[1] - end) / period)), 0) + 1
+    intervals = []
+    for interval in get_shape_changes(old, new):
+        if mode_before == 'NONE':
+            outside = clip_interval(interval, -INFINITE, start)
+            if outside:
+                intervals.append(outside)
+        if mode_after == 'NONE':
+            outside = clip_interval(interval, end, INFINITE)
+            if outside:
+                intervals.append(outside)
+        inside = clip_interval(interval, start, end)
+        if not inside:
+            continue
+        intervals.append(inside)
+        lo, hi, lo_closed, hi_closed = inside
+        for mode, count, sign in (
+                (mode_before, count_before, -1), (mode_after, count_after, 1)):
+            if mode == 'NONE':
+                continue
+            for k in range(1, count + 1):
+                shift = sign * k * period
+                if mode == 'MIRROR' and k % 2:
+                    intervals.append((
+                        start + end - hi + shift, start + end - lo + shift,
+                        hi_closed, lo_closed))
+                else:
+                    intervals.append((lo + shift, hi + shift, lo_closed, hi_closed))
+    return intervals
+
+
+def get_invalid_intervals(old_shapes, new_shapes, bounds):
+    # Frame intervals where the values of the action have changed
+    full_range = [(-INFINITE, INFINITE, False, False)]
+    intervals = []
+    for key in set(old_shapes) | set(new_shapes):
+        old = old_shapes.get(key)
+        new = new_shapes.get(key)
+        if old is None or new is None or old.settings != new.settings:
+            return full_range
+        if old == new:
+            continue
+        if old.cycles or new.cycles:
+            intervals += get_cyclic_changes(old, new, bounds)
+        else:
+            intervals += get_shape_changes(old, new)
+    return intervals
+
+
+def frame_in_intervals(frame, intervals):
+    for lo, hi, lo_closed, hi_closed in intervals:
+        if (lo < frame or lo_closed and lo == frame) and\
+                (frame < hi or hi_closed and hi == frame):
+            return True
+    return False
 
 
 def calculate_motion_path(mode, display_type):
@@ -1946,6 +4264,391 @@ class Progress_Status(object):
         Progress_Status.widget_visible = False
 
 
+class Bake_Scheduler(object):
+    # Bakes frames on the main thread from bpy.app.timers, as many per tick
+    # as fit in the time budget, and lets the UI process events in between
+
+    def __init__(self, frames, make_frame, budget, on_done, is_ready=None):
+        self.frames = frames
+        self.make_frame = make_frame
+        self.is_ready = is_ready
+        self.budget = budget
+        self.on_done = on_done
+        self.index = 0
+        self.done = False
+        self.error = None
+        self.tick_function = self.tick
+
+    def start(self, context):
+        context.window_manager.progress_begin(0, len(self.frames))
+        bpy.app.timers.register(self.tick_function, first_interval=0)
+
+    def tick(self):
+        if self.done:
+            return None
+        start = time.perf_counter()
+        waiting = False
+        try:
+            while self.index < len(self.frames):
+                if self.is_ready and not self.is_ready(self.frames[self.index]):
+                    waiting = True
+                    break
+                self.make_frame(self.frames[self.index])
+                self.index += 1
+                if time.perf_counter() - start >= self.budget:
+                    break
+        except Exception as error:
+            self.error = error
+        progress = 100 / len(self.frames) * self.index
+        bpy.context.window_manager.progress_update(self.index)
+        Progress_Status.set_progress(self, bpy.context, progress)
+        if self.error is None and self.index < len(self.frames):
+            return 0.02 if waiting else 0.0
+        self.finish()
+        self.on_done()
+        return None
+
+    def finish(self):
+        if bpy.app.timers.is_registered(self.tick_function):
+            bpy.app.timers.unregister(self.tick_function)
+        if not self.done:
+            bpy.context.window_manager.progress_end()
+        self.done = True
+
+
+class Draw_Plan(object):
+    # Bumped whenever the cached batches or the onion skin settings change
+    revision = 0
+
+    @staticmethod
+    def invalidate():
+        Draw_Plan.revision += 1
+
+
+SKIN_SHADER_VERTEX = """
+const int VIEW_RANGE = 1;
+const int KEYFRAME_RANGE = 2;
+const int SHOW_BEFORE = 4;
+const int SHOW_AFTER = 8;
+const int FADE = 16;
+
+void main()
+{
+    bool view_range = (flags & VIEW_RANGE) != 0;
+    bool keyframe_range = (flags & KEYFRAME_RANGE) != 0;
+    float diff = abs(curframe - frame);
+    bool draw = true;
+    int side_frames;
+    vec4 color;
+    if (frame < curframe) {
+        color = color_before;
+        if (!view_range || keyframe_range) {
+            diff = float(before_count) - rank.x;
+        }
+        if (keyframe_range) {
+            draw = (flags & SHOW_BEFORE) != 0 && frame == floor(frame) && diff <= float(view_before);
+        }
+        else if (view_range) {
+            draw = (flags & SHOW_BEFORE) != 0 && diff <= float(view_before);
+        }
+        side_frames = view_range ? view_before - 1 : before_count - 1;
+    }
+    else {
+        color = color_after;
+        if (!view_range || keyframe_range) {
+            diff = rank.y - float(after_start);
+        }
+        if (keyframe_range) {
+            draw = (flags & SHOW_AFTER) != 0 && frame == floor(frame) && diff <= float(view_after);
+        }
+        else if (view_range) {
+            draw = (flags & SHOW_AFTER) != 0 && diff <= float(view_after);
+        }
+        side_frames = view_range ? view_after - 1 : frames_count - after_start - 1;
+    }
+    if (frame == curframe || !draw) {
+        // Out of the clip space, the whole triangle is dropped
+        gl_Position = vec4(0.0, 0.0, 2.0, 1.0);
+        skin_color = vec4(0.0);
+        return;
+    }
+    float fade = 0.0;
+    if ((flags & FADE) != 0) {
+        fade = (color.a - fade_value) / float(max(side_frames, 1)) * (diff - 1.0);
+    }
+    skin_color = vec4(color.rgb, color.a - fade);
+    gl_Position = ModelViewProjectionMatrix * vec4(pos, 1.0);
+}
+"""
+
+SKIN_SHADER_FRAGMENT = """
+void main()
+{
+    FragColor = skin_color;
+}
+"""
+
+SKIN_SHADER_UNIFORMS = (
+    ('FLOAT', 'curframe'),
+    ('INT', 'before_count'),
+    ('INT', 'after_start'),
+    ('INT', 'frames_count'),
+    ('VEC4', 'color_before'),
+    ('VEC4', 'color_after'),
+    ('INT', 'view_before'),
+    ('INT', 'view_after'),
+    ('FLOAT', 'fade_value'),
+    ('INT', 'flags'),
+)
+
+
+def create_skin_shader():
+    if hasattr(gpu.shader, 'create_from_info'):
+        info = gpu.types.GPUShaderCreateInfo()
+        info.push_constant('MAT4', 'ModelViewProjectionMatrix')
+        for uniform_type, name in SKIN_SHADER_UNIFORMS:
+            info.push_constant(uniform_type, name)
+        info.vertex_in(0, 'VEC3', 'pos')
+        info.vertex_in(1, 'FLOAT', 'frame')
+        info.vertex_in(2, 'VEC2', 'rank')
+        interface = gpu.types.GPUStageInterfaceInfo('onion_skin_interface')
+        interface.flat('VEC4', 'skin_color')
+        info.vertex_out(interface)
+        info.fragment_out(0, 'VEC4', 'FragColor')
+        info.vertex_source(SKIN_SHADER_VERTEX)
+        info.fragment_source(SKIN_SHADER_FRAGMENT)
+        return gpu.shader.create_from_info(info)
+    glsl_types = {'FLOAT': 'float', 'INT': 'int', 'VEC4': 'vec4'}
+    uniforms = ''.join(
+        'uniform ' + glsl_types[uniform_type] + ' ' + name + ';\n'
+        for uniform_type, name in SKIN_SHADER_UNIFORMS)
+    vertex = 'uniform mat4 ModelViewProjectionMatrix;\n' + uniforms +\
+        'in vec3 pos;\nin float frame;\nin vec2 rank;\nflat out vec4 skin_color;\n' +\
+        SKIN_SHADER_VERTEX
+    fragment = 'flat in vec4 skin_color;\nout vec4 FragColor;\n' + SKIN_SHADER_FRAGMENT
+    return gpu.types.GPUShader(vertex, fragment)
+
+
+def get_skin_shader():
+    global SKIN_SHADER
+    if SKIN_SHADER is None:
+        try:
+            SKIN_SHADER = create_skin_shader()
+        except Exception as error:
+            print("Onion Skin: Merged draw is not available: " + str(error))
+            SKIN_SHADER = False
+    return SKIN_SHADER
+
+
+LAYER_SHADER_VERTEX = """
+void main()
+{
+    uv = pos * 0.5 + 0.5;
+    gl_Position = vec4(pos, 0.0, 1.0);
+}
+"""
+
+LAYER_SHADER_FRAGMENT = """
+void main()
+{
+    vec4 color = texture(color_layer, uv);
+    float depth = texture(depth_layer, uv).r;
+    if (depth == 1.0 && color == vec4(0.0)) {
+        discard;
+    }
+    gl_FragDepth = depth;
+    FragColor = color;
+}
+"""
+
+
+def create_layer_shader():
+    if hasattr(gpu.shader, 'create_from_info'):
+        info = gpu.types.GPUShaderCreateInfo()
+        info.sampler(0, 'FLOAT_2D', 'color_layer')
+        info.sampler(1, 'FLOAT_2D', 'depth_layer')
+        info.vertex_in(0, 'VEC2', 'pos')
+        interface = gpu.types.GPUStageInterfaceInfo('onion_layer_interface')
+        interface.smooth('VEC2', 'uv')
+        info.vertex_out(interface)
+        info.fragment_out(0, 'VEC4', 'FragColor')
+        if hasattr(info, 'depth_write'):
+            info.depth_write('ANY')
+        info.vertex_source(LAYER_SHADER_VERTEX)
+        info.fragment_source(LAYER_SHADER_FRAGMENT)
+        return gpu.shader.create_from_info(info)
+    vertex = 'in vec2 pos;\nout vec2 uv;\n' + LAYER_SHADER_VERTEX
+    fragment = 'uniform sampler2D color_layer;\nuniform sampler2D depth_layer;\n' +\
+        'in vec2 uv;\nout vec4 FragColor;\n' + LAYER_SHADER_FRAGMENT
+    return gpu.types.GPUShader(vertex, fragment)
+
+
+def get_layer_shader():
+    global LAYER_SHADER
+    if LAYER_SHADER is None:
+        try:
+            LAYER_SHADER = create_layer_shader()
+        except Exception as error:
+            print("Onion Skin: Layer cache is not available: " + str(error))
+            LAYER_SHADER = False
+    return LAYER_SHADER
+
+
+def use_layer_cache(context):
+    # The composited layer keeps one depth per pixel, so every skin has to
+    # write its depth unless all of them are drawn in front
+    prefs = bpy.context.preferences.addons[__name__].preferences
+    sc = context.scene.onion_skins_scene_props
+    if not prefs.gpu_layer_cache or bpy.app.version < (3, 0, 0):
+        return False
+    if not sc.gpu_colors_in_front and not (sc.gpu_mask_oskins and sc.gpu_mask_markers):
+        return False
+    return context.region_data is not None and bool(get_layer_shader())
+
+
+class Skin_Layer(object):
+    # Offscreen color and depth of the onion skins drawn in one viewport
+    __slots__ = ('key', 'candidate', 'size', 'color', 'depth', 'framebuffer', 'batch')
+
+    def __init__(self):
+        self.key = None
+        self.candidate = None
+        self.size = None
+        self.color = None
+        self.depth = None
+        self.framebuffer = None
+        self.batch = None
+
+    def resize(self, width, height):
+        if self.size == (width, height):
+            return None
+        self.size = (width, height)
+        self.color = gpu.types.GPUTexture((width, height), format='RGBA16F')
+        self.depth = gpu.types.GPUTexture((width, height), format='DEPTH_COMPONENT32F')
+        self.framebuffer = gpu.types.GPUFrameBuffer(
+            depth_slot=self.depth, color_slots=self.color)
+        self.key = None
+
+    def composite(self, in_front, blend):
+        shader = get_layer_shader()
+        if self.batch is None:
+            self.batch = batch_for_shader(
+                shader, 'TRI_FAN', {"pos": ((-1, -1), (1, -1), (1, 1), (-1, 1))})
+        gpu.state.depth_mask_set(not in_front)
+        gpu.state.depth_test_set('ALWAYS' if in_front else 'LESS_EQUAL')
+        gpu.state.face_culling_set('NONE')
+        # Blended skins are accumulated premultiplied by their alpha
+        gpu.state.blend_set('ALPHA_PREMULT' if blend else 'NONE')
+        shader.bind()
+        shader.uniform_sampler("color_layer", self.color)
+        shader.uniform_sampler("depth_layer", self.depth)
+        self.batch.draw(shader)
+        gpu.state.depth_mask_set(False)
+        gpu.state.blend_set('NONE')
+
+
+def use_merged_draw():
+    prefs = bpy.context.preferences.addons[__name__].preferences
+    return prefs.gpu_merged_draw and not bpy.app.background and bool(get_skin_shader())
+
+
+def get_merged_batch(objp):
+    # One batch with all the cached frames of the object, with the frame
+    # and its position among the cached frames as vertex attributes
+    record = GPU_FRAMES.get(objp)
+    uid = get_session_uid(objp)
+    if not record:
+        GPU_MERGED.pop(uid, None)
+        return None
+    merged = GPU_MERGED.get(uid)
+    if merged is not None and merged['revision'] == Draw_Plan.revision:
+        return merged
+    entries = record.entries()
+    if merged is not None and len(merged['entries']) == len(entries) and\
+            all(a is b for a, b in zip(merged['entries'], entries)):
+        merged['revision'] = Draw_Plan.revision
+        return merged
+    if any(entry.arrays is None for entry in entries):
+        # Baked before the merged draw was turned on
+        GPU_MERGED.pop(uid, None)
+        return None
+    frame_numbers = sorted(set(int(f) for f in record.index))
+    vertices = []
+    indices = []
+    attributes = []
+    offset = 0
+    for entry in entries:
+        f = float(entry.frame)
+        v, t = entry.arrays
+        vertices.append(v)
+        indices.append(np.asarray(t) + offset)
+        attributes.append(np.tile(np.array([
+            f,
+            bisect.bisect_left(frame_numbers, f),
+            bisect.bisect_right(frame_numbers, f)], 'f'), (len(v), 1)))
+        offset += len(v)
+    vertices = np.concatenate(vertices).astype('f', copy=False)
+    indices = np.concatenate(indices).astype('i', copy=False)
+    attributes = np.concatenate(attributes)
+    vbo_format = gpu.types.GPUVertFormat()
+    vbo_format.attr_add(id="pos", comp_type='F32', len=3, fetch_mode='FLOAT')
+    vbo_format.attr_add(id="frame", comp_type='F32', len=1, fetch_mode='FLOAT')
+    vbo_format.attr_add(id="rank", comp_type='F32', len=2, fetch_mode='FLOAT')
+    vbo = gpu.types.GPUVertBuf(len=len(vertices), format=vbo_format)
+    vbo.attr_fill(id="pos", data=vertices)
+    vbo.attr_fill(id="frame", data=np.ascontiguousarray(attributes[:, 0]))
+    vbo.attr_fill(id="rank", data=np.ascontiguousarray(attributes[:, 1:]))
+    ibo = gpu.types.GPUIndexBuf(type='TRIS', seq=indices)
+    bounds = [entry.bounds for entry in entries]
+    if bounds and all(b is not None for b in bounds):
+        bounds = (np.min([b[0] for b in bounds], axis=0), np.max([b[1] for b in bounds], axis=0))
+    else:
+        bounds = None
+    merged = {
+        'revision': Draw_Plan.revision,
+        'bounds': bounds,
+        'entries': entries,
+        'frames': frame_numbers,
+        'batch': gpu.types.GPUBatch(type='TRIS', buf=vbo, elem=ibo),
+    }
+    GPU_MERGED[uid] = merged
+    return merged
+
+
+def get_pinned_objects(context):
+    # Pinned objects of the scene that have baked GPU frames or markers
+    pinned = []
+    for record in list(GPU_FRAMES.values()) + list(GPU_MARKERS.values()):
+        if not record or any(get_session_uid(ob) == record.uid for ob in pinned):
+            continue
+        ob = bpy.data.objects.get(record.name)
+        if ob is None or get_session_uid(ob) != record.uid:
+            # Renamed since it was baked
+            ob = next((o for o in bpy.data.objects if get_session_uid(o) == record.uid), None)
+            if ob is None:
+                continue
+            record.name = ob.name
+        if ob.onionsk_pinned and context.scene.objects.get(ob.name) == ob:
+            pinned.append(ob)
+    return pinned
+
+
+def get_draw_objects(context):
+    # The active object first, then the pinned objects drawn with their budgets
+    objp = checkout_parent(context.active_object)
+    objects = [(objp, False)] if objp is not None else []
+    for ob in get_pinned_objects(context):
+        if objp is None or get_session_uid(ob) != get_session_uid(objp):
+            objects.append((ob, True))
+    return objects
+
+
+def has_other_pinned(context, objp):
+    # Keep the draw handler while other pinned objects still draw
+    uid = get_session_uid(objp)
+    return any(get_session_uid(ob) != uid for ob in get_pinned_objects(context))
+
+
 def remove_handlers(context):
     sc = bpy.context.scene.onion_skins_scene_props
     global Draw_Handler
@@ -1976,9 +4679,10 @@ class GPU_OT_Draw_Skins(Operator):
 
     def __init__(self):
         self.sc = bpy.context.scene.onion_skins_scene_props
-        self.frames_count = None
-        self.before = None
-        self.after = None
+        # Draw plans of the active and pinned objects: {uid: [key, plan, corners]}
+        self.plans = {}
+        # Cached skin layers of the viewports: {region pointer: Skin_Layer}
+        self.layers = {}
 
     def invoke(self, context, event):
         if self.sc.os_draw_mode != 'GPU':
@@ -1986,14 +4690,7 @@ class GPU_OT_Draw_Skins(Operator):
         create_handlers(self, context)
         context.window_manager.modal_handler_add(self)
         obj = checkout_parent(context.active_object)
-
-        if not GPU_FRAMES.get(obj.name):
-            return {'RUNNING_MODAL'}
-        self.frames_count = list(set(
-            [(int(float(f.split('|@|')[-1])), i) for i, f in enumerate(GPU_FRAMES[obj.name])]
-        ))
-        self.frames_count.sort()
-        self.frames_count = dict(self.frames_count)
+        DISK_CACHE.restore(obj)
         return {'RUNNING_MODAL'}
 
     def modal(self, context, event):
@@ -2004,157 +4701,456 @@ class GPU_OT_Draw_Skins(Operator):
 
         return {'PASS_THROUGH'}
 
-    def evaluate_fade(self, colorB, colorA, curframe, item_frame, frame_diff):
-        if not self.frames_count:
-            return None
+    def get_draw_state(self, skin_type, primitive='FACES'):
         sc = bpy.context.scene.onion_skins_scene_props
+        prefs = bpy.context.preferences.addons[__name__].preferences
+        if skin_type == 'MARKER':
+            mask = sc.gpu_mask_markers
+        else:
+            mask = sc.gpu_mask_oskins
+        point_size = sc.gpu_point_size if primitive == 'POINTS' else 0
+        return (mask, sc.gpu_colors_in_front, prefs.gl_cull_face and primitive == 'FACES',
+                not sc.gpu_flat_colors, point_size)
+
+    def get_primitive_entry(self, entry, primitive):
+        # Batch and levels of detail to draw the piece with the primitive of its side
+        if primitive == 'FACES' or entry.piece is None:
+            return (entry.batch, entry.lods)
+        return (get_primitive_batch(entry, primitive), None)
+
+    def build_draw_plan(self, context, obj, curframe, merged=False, pinned=False):
+        # Ordered (batch, color, depth state) list to replay on every redraw
+        sc = context.scene.onion_skins_scene_props
+        prefs = bpy.context.preferences.addons[__name__].preferences
+        plan = []
+        markers = GPU_MARKERS.get(obj)
+        if sc.hide_os_marker and markers:
+            colorM = sc.mat_color_m
+            color = (colorM[0], colorM[1], colorM[2], colorM[3])
+            state = self.get_draw_state('MARKER', sc.gpu_primitive_markers)
+            for entry in markers.entries():
+                batch, lods = self.get_primitive_entry(entry, sc.gpu_primitive_markers)
+                if batch is not None:
+                    plan.append((batch, color, state, entry.bounds, None, 0))
+        if GPU_CACHE.evicted.get(get_session_uid(obj)) and\
+                not context.screen.is_animation_playing:
+            GPU_CACHE.request_rebake(obj, GPU_CACHE.get_window_frames(obj, curframe))
+        record = GPU_FRAMES.get(obj)
+        if not record:
+            return plan
+        if merged:
+            # Onion skins are drawn with the merged batch of the object
+            for frame in record.index:
+                GPU_CACHE.touch(record.uid, frame)
+            return plan
+        items = [(float(entry.frame), entry) for entry in record.entries()]
+        for f, entry in items:
+            if entry.batch is None:
+                vertices, indices = entry.arrays
+                entry.batch, entry.piece = make_piece_batch(
+                    entry.uid, vertices, np.ascontiguousarray(indices))
+        frames = sorted(set(int(f) for f in record.index))
+        bf = frames[:bisect.bisect_left(frames, curframe)]
+        af = frames[bisect.bisect_right(frames, curframe):]
+        keyframe_range = sc.view_range and sc.onionsk_method == 'KEYFRAME' and\
+            sc.view_range_frame_type == 'KEYFRAME'
         if not sc.view_range:
-            if item_frame < curframe:
-                bf = [f for f in self.frames_count if f < curframe]
-                before_frames = len(bf) - 1
-                frame_diff = len([f for f in bf if f >= item_frame])
-            else:
-                af = [f for f in self.frames_count if f > curframe]
-                after_frames = len(af) - 1
-                frame_diff = len([f for f in af if f <= item_frame])
+            before_frames = len(bf) - 1
+            after_frames = len(af) - 1
         else:
             before_frames = sc.view_before - 1
             after_frames = sc.view_after - 1
-            if sc.onionsk_method == 'KEYFRAME' and sc.view_range_frame_type == 'KEYFRAME':
-                if item_frame < curframe:
-                    bf = [f for f in self.frames_count if f < curframe]
-                    bf.reverse()
-                    self.before = [f for i, f in enumerate(bf) if i <= before_frames]
-                    frame_diff = len([f for f in self.before if f >= item_frame])
+        if keyframe_range:
+            bf = bf[max(len(bf) - sc.view_before, 0):] if sc.view_before > 0 else []
+            af = af[:max(sc.view_after, 0)]
+        before = set(bf)
+        after = set(af)
+        before_steps = {
+            f: len(bf) - bisect.bisect_left(bf, f) for f in record.index if f < curframe}
+        after_steps = {
+            f: bisect.bisect_right(af, f) for f in record.index if f > curframe}
+        colorB = sc.mat_color_bf
+        colorA = sc.mat_color_af
+        state_before = self.get_draw_state('ONION', sc.gpu_primitive_before)
+        state_after = self.get_draw_state('ONION', sc.gpu_primitive_after)
+        onion = []
+        for item_frame, entry in items:
+            if curframe == item_frame:
+                continue
+            frame_diff = abs(curframe - item_frame)
+            if item_frame < curframe:
+                if not sc.view_range or keyframe_range:
+                    frame_diff = before_steps[item_frame]
+                if not sc.view_range:
+                    draw = True
+                elif keyframe_range:
+                    draw = sc.hide_os_before and item_frame in before
+                else:
+                    draw = frame_diff <= sc.view_before and sc.hide_os_before
+                color, side_frames = colorB, before_frames
+                state, primitive = state_before, sc.gpu_primitive_before
+            else:
+                if not sc.view_range or keyframe_range:
+                    frame_diff = after_steps[item_frame]
+                if not sc.view_range:
+                    draw = True
+                elif keyframe_range:
+                    draw = sc.hide_os_after and item_frame in after
                 else:
-                    af = [f for f in self.frames_count if f > curframe]
-                    self.after = [f for i, f in enumerate(af) if i <= after_frames]
-                    frame_diff = len([f for f in self.after if f <= item_frame])
-        if not sc.fade_to_alpha:
+                    draw = frame_diff <= sc.view_after and sc.hide_os_after
+                color, side_frames = colorA, after_frames
+                state, primitive = state_after, sc.gpu_primitive_after
+            if not draw:
+                continue
+            steps = before_steps if item_frame < curframe else after_steps
+            if pinned and prefs.pinned_frames and steps[item_frame] > prefs.pinned_frames:
+                continue
             fade = 0
-        elif item_frame < curframe:
-            if before_frames <= 0:
-                before_frames = 1
-            fade = ((colorB[3] - sc.fade_to_value) / before_frames) * (frame_diff - 1)
+            if sc.fade_to_alpha:
+                fade = ((color[3] - sc.fade_to_value) / max(side_frames, 1)) * (frame_diff - 1)
+            GPU_CACHE.touch(record.uid, item_frame)
+            batch, lods = self.get_primitive_entry(entry, primitive)
+            if batch is None:
+                continue
+            onion.append((frame_diff, (
+                batch, (color[0], color[1], color[2], color[3] - fade), state,
+                entry.bounds, lods), entry.triangles if primitive == 'FACES' else 0))
+        if pinned and prefs.pinned_triangles:
+            plan.extend(self.select_plan_lods(onion, 'BUDGET', prefs.pinned_triangles, True))
         else:
-            if after_frames <= 0:
-                after_frames = 1
-            fade = ((colorA[3] - sc.fade_to_value) / after_frames) * (frame_diff - 1)
-        return fade
+            plan.extend(self.select_plan_lods(onion, prefs.gpu_lod, prefs.gpu_lod_budget))
+        return plan
 
-    def batch_draw(self, batch, skin_type=''):
-        sc = bpy.context.scene.onion_skins_scene_props
+    def select_plan_lods(self, onion, mode, budget, drop=False):
+        # Level of detail of the onion skins that only depends on the frame,
+        # with drop the farthest ones are left out when the LODs are not enough
         prefs = bpy.context.preferences.addons[__name__].preferences
+        levels = [0] * len(onion)
+        keep = range(len(onion))
+        if mode == 'DISTANCE':
+            levels = [int(max(diff - 1, 0) // prefs.gpu_lod_distance) for diff, entry, tris in onion]
+        elif mode == 'BUDGET':
+            def triangles(i, level):
+                lods = onion[i][1][4]
+                if not lods:
+                    return onion[i][2]
+                return lods[1][level - 1][1] if level else lods[0]
+
+            total = sum(triangles(i, 0) for i in range(len(onion)))
+            order = sorted(range(len(onion)), key=lambda i: -onion[i][0])
+            for level in (1, 2):
+                for i in order:
+                    if total <= budget:
+                        break
+                    lods = onion[i][1][4]
+                    if lods and len(lods[1]) >= level:
+                        total -= triangles(i, levels[i]) - triangles(i, level)
+                        levels[i] = level
+            if drop:
+                keep = set(keep)
+                for i in order:
+                    if total <= budget:
+                        break
+                    total -= triangles(i, levels[i])
+                    keep.discard(i)
+        return [onion[i][1] + (levels[i],) for i in sorted(keep)]
+
+    def get_size_lod(self, size):
+        prefs = bpy.context.preferences.addons[__name__].preferences
+        if size >= prefs.gpu_lod_size:
+            return 0
+        if size >= prefs.gpu_lod_size / 4:
+            return 1
+        return 2
+
+    def batch_draw(self, batch, state, shader=None):
+        mask, in_front, cull_face, blend, point_size = state
+        shader = shader or SHADER
         if bpy.app.version < (3, 0, 0):
-            if not sc.gpu_mask_oskins and skin_type == 'ONION':
-                bgl.glDepthMask(False)
-            elif skin_type == 'ONION':
-                bgl.glDepthMask(True)
-            if not sc.gpu_mask_markers and skin_type == 'MARKER':
-                bgl.glDepthMask(False)
-            elif skin_type == 'MARKER':
-                bgl.glDepthMask(True)
+            if point_size:
+                bgl.glPointSize(point_size)
+            bgl.glDepthMask(mask)
             bgl.glEnable(bgl.GL_DEPTH_TEST)
-            if prefs.gl_cull_face:
+            if cull_face:
                 bgl.glEnable(bgl.GL_CULL_FACE)
-            if not sc.gpu_flat_colors:
+            if blend:
                 bgl.glEnable(bgl.GL_BLEND)
-            if sc.gpu_colors_in_front:
+            if in_front:
                 bgl.glDepthRange(1, 0)
 
-            batch.draw(SHADER)
+            batch.draw(shader)
             bgl.glDisable(bgl.GL_BLEND)
             bgl.glDisable(bgl.GL_CULL_FACE)
             bgl.glDisable(bgl.GL_DEPTH_TEST)
+            if point_size:
+                bgl.glPointSize(1)
         else:
-            if not sc.gpu_mask_oskins and skin_type == 'ONION':
-                gpu.state.depth_mask_set(False)
-            elif skin_type == 'ONION':
-                gpu.state.depth_mask_set(True)
-            if not sc.gpu_mask_markers and skin_type == 'MARKER':
-                gpu.state.depth_mask_set(False)
-            elif skin_type == 'MARKER':
-                gpu.state.depth_mask_set(True)
-            if sc.gpu_colors_in_front:
+            gpu.state.depth_mask_set(mask)
+            if in_front:
                 gpu.state.depth_test_set('ALWAYS')
             else:
                 gpu.state.depth_test_set('LESS_EQUAL')
-            if prefs.gl_cull_face:
+            if cull_face:
                 gpu.state.face_culling_set('BACK')
-            if not sc.gpu_flat_colors:
+            if blend:
                 gpu.state.blend_set('ALPHA')
+            if point_size:
+                gpu.state.point_size_set(point_size)
 
-            batch.draw(SHADER)
-            if sc.gpu_mask_oskins and skin_type == 'ONION':
-                gpu.state.depth_mask_set(False)
-            if sc.gpu_mask_markers and skin_type == 'MARKER':
+            batch.draw(shader)
+            if mask:
                 gpu.state.depth_mask_set(False)
+            if point_size:
+                gpu.state.point_size_set(1.0)
+
+    def draw_gpu_frames(self, context):
+        try:
+            if not hasattr(self, 'sc'): pass
+        except ReferenceError:
+            remove_handlers(context)
+            return None
+        if not context.space_data.overlay.show_overlays:
+            return None
+        objects = get_draw_objects(context)
+        if not use_layer_cache(context):
+            self.layers.clear()
+            self.draw_skins(context, objects)
+            return None
+        sc = context.scene.onion_skins_scene_props
+        region = context.region
+        layer_key = (
+            tuple(tuple(row) for row in context.region_data.perspective_matrix),
+            region.width, region.height, context.scene.frame_current, Draw_Plan.revision,
+            self.get_settings_key(context),
+            tuple((get_session_uid(obj), pinned, len(GPU_FRAMES.get(obj) or ()),
+                   len(GPU_MARKERS.get(obj) or ())) for obj, pinned in objects))
+        layer = self.layers.setdefault(region.as_pointer(), Skin_Layer())
+        if layer.key != layer_key:
+            if layer.candidate != layer_key:
+                # The view or the skins are changing, draw them directly
+                # until the same key shows up twice in a row
+                layer.candidate = layer_key
+                layer.key = None
+                self.draw_skins(context, objects)
+                return None
+            layer.resize(region.width, region.height)
+            with layer.framebuffer.bind():
+                layer.framebuffer.clear(color=(0.0, 0.0, 0.0, 0.0), depth=1.0)
+                self.draw_skins(context, objects)
+            layer.key = layer_key
+        layer.composite(sc.gpu_colors_in_front, not sc.gpu_flat_colors)
+
+    def get_settings_key(self, context):
+        # Settings that change how the cached skins are drawn
+        prefs = bpy.context.preferences.addons[__name__].preferences
+        sc = context.scene.onion_skins_scene_props
+        return (
+            prefs.gl_cull_face, prefs.gpu_merged_draw, prefs.gpu_lod, prefs.gpu_lod_distance,
+            prefs.gpu_lod_size, prefs.gpu_lod_budget, prefs.pinned_frames, prefs.pinned_triangles,
+            prefs.gpu_frustum_culling, prefs.gpu_cull_screen_size,
+            sc.gpu_primitive_before, sc.gpu_primitive_after, sc.gpu_primitive_markers,
+            sc.gpu_edge_angle, sc.gpu_point_stride, sc.gpu_point_size)
+
+    def draw_skins(self, context, objects):
+        prefs = bpy.context.preferences.addons[__name__].preferences
+        curframe = context.scene.frame_current
+        sc = context.scene.onion_skins_scene_props
+        faces = sc.gpu_primitive_before == 'FACES' and sc.gpu_primitive_after == 'FACES'
+        settings = self.get_settings_key(context)
+        for key in ('drawn', 'frustum', 'size', 'lod', 'triangles'):
+            CULL_STATS[key] = 0
+        plans = {}
+        global SHADER
+        for obj, pinned in objects:
+            if obj.name in DISK_CACHE.pending:
+                DISK_CACHE.restore(obj)
+            budget = pinned and (prefs.pinned_frames or prefs.pinned_triangles)
+            merged = None
+            if prefs.gpu_merged_draw and prefs.gpu_lod == 'NONE' and faces and not budget:
+                merged = get_merged_batch(obj)
+            uid = get_session_uid(obj)
+            plan_key = (
+                uid, curframe, Draw_Plan.revision, merged is None, pinned, settings,
+                len(GPU_FRAMES.get(obj) or ()), len(GPU_MARKERS.get(obj) or ()))
+            cached = self.plans.get(uid)
+            if cached is None or cached[0] != plan_key:
+                plan = self.build_draw_plan(context, obj, curframe, merged is not None, pinned)
+                cached = [plan_key, plan, None]
+            plan = cached[1]
+            if cached[2] is None:
+                entries = [i for i, entry in enumerate(plan) if entry[3] is not None]
+                corners = [get_bounds_corners(plan[i][3]) for i in entries]
+                if merged is not None and merged['bounds'] is not None:
+                    entries.append(-1)
+                    corners.append(get_bounds_corners(merged['bounds']))
+                cached[2] = (entries, np.array(corners, 'f').reshape(-1, 8, 4))
+            plans[uid] = cached
+            culled, sizes = self.cull_draw_plan(
+                context, cached[2], len(plan) + int(merged is not None))
+            SHADER.bind()
+            for i, (batch, color, state, bounds, lods, level) in enumerate(plan):
+                if i in culled:
+                    continue
+                if lods:
+                    if prefs.gpu_lod == 'SIZE' and i in sizes and not budget:
+                        level = self.get_size_lod(sizes[i])
+                    level = min(level, len(lods[1]))
+                    if level:
+                        batch = lods[1][level - 1][0]
+                        CULL_STATS['lod'] += 1
+                    CULL_STATS['triangles'] += lods[1][level - 1][1] if level else lods[0]
+                SHADER.uniform_float("color", color)
+                self.batch_draw(batch, state)
+            if merged is not None and -1 not in culled:
+                self.draw_merged(context, merged, curframe)
+        # Plans of objects that are no longer drawn are dropped
+        self.plans = plans
+
+    def cull_draw_plan(self, context, plan_corners, draws):
+        # Plan entries that are off-screen or smaller than the pixel threshold
+        prefs = bpy.context.preferences.addons[__name__].preferences
+        entries, corners = plan_corners
+        culled = set()
+        sizes = {}
+        frustum = size = 0
+        if len(corners) and context.region_data is not None:
+            off_screen, too_small = get_culled_mask(context, corners)
+            culled = set(i for i, c in zip(entries, off_screen | too_small) if c)
+            frustum = int(off_screen.sum())
+            size = int(too_small.sum())
+            if prefs.gpu_lod == 'SIZE':
+                sizes = dict(zip(entries, get_screen_sizes(context, corners)))
+        CULL_STATS['drawn'] += draws - len(culled)
+        CULL_STATS['frustum'] += frustum
+        CULL_STATS['size'] += size
+        CULL_STATS['skipped'] += len(culled)
+        return culled, sizes
+
+    def draw_merged(self, context, merged, curframe):
+        # Fade and view range are evaluated in the shader
+        sc = context.scene.onion_skins_scene_props
+        shader = get_skin_shader()
+        frames = merged['frames']
+        flags = 0
+        if sc.view_range:
+            flags |= 1
+            if sc.onionsk_method == 'KEYFRAME' and sc.view_range_frame_type == 'KEYFRAME':
+                flags |= 2
+        if sc.hide_os_before:
+            flags |= 4
+        if sc.hide_os_after:
+            flags |= 8
+        if sc.fade_to_alpha:
+            flags |= 16
+        shader.bind()
+        shader.uniform_float(
+            "ModelViewProjectionMatrix",
+            gpu.matrix.get_projection_matrix() @ gpu.matrix.get_model_view_matrix())
+        shader.uniform_float("curframe", curframe)
+        shader.uniform_int("before_count", bisect.bisect_left(frames, curframe))
+        shader.uniform_int("after_start", bisect.bisect_right(frames, curframe))
+        shader.uniform_int("frames_count", len(frames))
+        shader.uniform_float("color_before", tuple(sc.mat_color_bf))
+        shader.uniform_float("color_after", tuple(sc.mat_color_af))
+        shader.uniform_int("view_before", sc.view_before)
+        shader.uniform_int("view_after", sc.view_after)
+        shader.uniform_float("fade_value", sc.fade_to_value)
+        shader.uniform_int("flags", flags)
+        self.batch_draw(merged['batch'], self.get_draw_state('ONION'), shader)
+
+
+# Frame planners, plain functions without bpy: the tests load them from
+# this file to run outside of Blender
+
+def plan_stepped_frames(fs, fe, skip, reverse=False, exclude=0, around_frame=None):
+    # Frames from fs to fe with the given step, the last input frame is
+    # always included. around_frame is the current frame of the FRAME
+    # method: it is never planned, a start before frame 0 is clamped to 0 and
+    # then the frame equal to the step is skipped as well.
+    # Returns a sorted list without duplicates.
+    skipthat = False
+    if around_frame is not None and fs < 0:
+        if around_frame > 0:
+            skipthat = True
+        fs = 0
+    lp = int((fe - fs) / skip)
+    dolast = False
+    if (fs + (lp * skip)) != fe:
+        lp = lp + 1
+        dolast = True
+    if reverse and (fe - (lp * skip)) != fs:
+        lp = lp + 1
+    if reverse:
+        loop_range = range(lp, 0, -1)
+    else:
+        loop_range = range(1 + lp)
+    frames = []
+    for lr in loop_range:
+        if dolast and lr == lp:
+            frame = fe
+        elif reverse:
+            frame = fe - (lr * skip)
+            if fs + lr == 0 or frame < fs:
+                frame = fs
+        else:
+            frame = fs + (lr * skip)
+        if around_frame is not None and frame == around_frame:
+            continue
+        if skipthat and frame == skip:
+            continue
+        if exclude == 1 and frame == fs:
+            continue
+        if exclude == 2 and frame == fe:
+            continue
+        frames.append(frame)
+    # Already ascending except the end frame of the reverse loop that comes
+    # first, so the sort is close to linear
+    return sorted(set(frames))
+
+
+def merge_frame_plans(*plans):
+    # Merge sorted frame plans into one sorted plan without duplicates
+    frames = []
+    for frame in heapq.merge(*plans):
+        if frames and frames[-1] == frame:
+            continue
+        frames.append(frame)
+    return frames
+
+
+def plan_frame_method(curframe, before, after, step):
+    fs = curframe - before
+    if fs < 0:
+        fs = 0
+    frames_before = plan_stepped_frames(fs, curframe, step, True, 0, curframe)
+    frames_after = plan_stepped_frames(
+        curframe, curframe + after, step, False, 0, curframe)
+    return merge_frame_plans(frames_before, frames_after)
 
-    def draw_gpu_frames(self, context):
-        try:
-            if not hasattr(self, 'sc'): pass
-        except ReferenceError:
-            remove_handlers(context)
-            return None
-        if not context.active_object or not context.space_data.overlay.show_overlays:
-            return None
-        curframe = context.scene.frame_current
-        global SHADER
-        sc = bpy.context.scene.onion_skins_scene_props
-        prefs = bpy.context.preferences.addons[__name__].preferences
-        obj = checkout_parent(context.active_object)
-        colorB = sc.mat_color_bf
-        colorA = sc.mat_color_af
-        colorM = sc.mat_color_m
-        if sc.hide_os_marker and GPU_MARKERS.get(obj.name):
-            color = (colorM[0], colorM[1], colorM[2], colorM[3])
-            SHADER.bind()
-            SHADER.uniform_float("color", color)
-            for i, item in enumerate(GPU_MARKERS[obj.name]):
-                self.batch_draw(GPU_MARKERS[obj.name][item], 'MARKER')
-        if not GPU_FRAMES.get(obj.name):
-            return None
-        for item in GPU_FRAMES[obj.name]:
-            item_frame = float(item.split('|@|')[-1])
-            if curframe == item_frame:
-                continue
-            frame_diff = abs(curframe - item_frame)
-            if not sc.view_range:
-                draw = True
-            else:
-                draw = False
 
-            fade = self.evaluate_fade(colorB, colorA, curframe, item_frame, frame_diff)
+def plan_keyframe_range(kfbefore, kfafter, before, after, use_all=False):
+    # Keys around the current frame, kfbefore and kfafter are sorted
+    if use_all:
+        return list(kfbefore), list(kfafter)
+    return kfbefore[max(len(kfbefore) - before, 0):], kfafter[:after]
 
-            if item_frame < curframe:
-                color = (colorB[0], colorB[1], colorB[2], colorB[3] - fade)
-                if sc.view_range and sc.onionsk_method == 'KEYFRAME' and\
-                        sc.view_range_frame_type == 'KEYFRAME' and\
-                        sc.hide_os_before:
-                    if item_frame in self.before:
-                        draw = True
-                elif frame_diff <= sc.view_before and sc.hide_os_before:
-                    draw = True
-            else:
-                color = (colorA[0], colorA[1], colorA[2], colorA[3] - fade)
-                if sc.view_range and sc.onionsk_method == 'KEYFRAME' and\
-                        sc.view_range_frame_type == 'KEYFRAME' and\
-                        sc.hide_os_after:
-                    if item_frame in self.after:
-                        draw = True
-                elif frame_diff <= sc.view_after and sc.hide_os_after:
-                    draw = True
 
-            if curframe != item_frame and draw:
-                SHADER.bind()
-                SHADER.uniform_float("color", color)
-                self.batch_draw(GPU_FRAMES[obj.name][item], 'ONION')
+def plan_keyframe_frames(kfbefore, kfafter, current_key=None):
+    # All before keys precede the current frame and all after keys follow
+    # it, so the concatenation is already sorted
+    frames = list(kfbefore)
+    if current_key is not None:
+        frames.append(current_key)
+    frames.extend(kfafter)
+    return frames
 
 
 class Onion_Skins:
 
     keys_updated = {}
-    keys_changed = []
+    shapes_updated = {}
+    index_updated = {}
+    shapes_changed = None
 
     def __init__(self, obj=None, empty=None, cls=None):
         self.sc = bpy.context.scene.onion_skins_scene_props
@@ -2171,97 +5167,42 @@ class Onion_Skins:
         self.fe = 0
         self.Frames = None
         self.Skins_count = 0
+        self.pose_cache = {}
+        self.parallel = None
+        self.frames_skin = Frames_Skin(self.objp) if use_frames_skin() else None
 
     def evaluate_frames(self, fs, fe, skip, isReverse, exclude):
         global CREATING
         CREATING = True
-        skipthat = False
+        around_frame = None
         if self.sc.onionsk_method == 'FRAME':
-            if fs < 0:
-                if self.curframe > 0:
-                    skipthat = True
-                fs = 0
-        # start at frame
-        Frame = fs
-        lp = int((fe - fs) / skip)
-
-        dolast = False
-        if (fs + ((lp) * skip)) != fe:
-            lp = lp + 1
-            dolast = True
-        if isReverse and (fe - ((lp) * skip)) != fs:
-            lp = lp + 1
-
-        if isReverse:
-            loopRange = range((lp), 0, -1)
-        else:
-            loopRange = range(1 + lp)
-        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~LOOP~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-        Frames = []
-        for lr in loopRange:
-            if dolast and lr == lp:
-                Frame = fe
-            elif isReverse:
-                Frame = (fe - ((lr) * skip))
-                if fs + lr == 0 or Frame < fs:
-                    Frame = fs
-            else:
-                Frame = fs + ((lr) * skip)
-            if self.sc.onionsk_method == 'FRAME' and Frame == self.curframe:
-                continue
-            if skipthat and Frame == skip:
-                continue
-            if exclude == 1 and Frame == fs:
-                continue
-            if exclude == 2 and Frame == fe:
-                continue
-            Frames.append(Frame)
-        return Frames
+            around_frame = self.curframe
+        return plan_stepped_frames(
+            fs, fe, skip, isReverse, exclude, around_frame)
 
     def os_method_frame(self, dont_create=False):
-        fs = self.curframe - self.sc.onionsk_fr_before
-        fe = self.curframe
-        if fs < 0:
-            fs = 0
-        skip = self.sc.onionsk_frame_step
-        if not dont_create:
-            FramesBf = self.evaluate_frames(fs, fe, skip, 1, 0)
         fs = self.curframe
         fe = self.curframe + self.sc.onionsk_fr_after
-        if not dont_create:
-            FramesAf = self.evaluate_frames(fs, fe, skip, 0, 0)
-            self.fs = fs
-            self.fe = fe
-            return FramesBf + FramesAf
-        return fs, fe
+        if dont_create:
+            return fs, fe
+        global CREATING
+        CREATING = True
+        self.fs = fs
+        self.fe = fe
+        return plan_frame_method(
+            self.curframe,
+            self.sc.onionsk_fr_before,
+            self.sc.onionsk_fr_after,
+            self.sc.onionsk_frame_step)
 
     def get_keyframes(self, action, full_keys=False):
         if not action:
             action = self.obj.animation_data.action
-        all_keys = []
-        for fcurve in action.fcurves:
-            keys = fcurve.keyframe_points
-            if self.sc.filter_keyframes and self.sc.filter_active_bone and \
-                    self.obj.type == 'ARMATURE':
-                bone_fcurve_skip = run_filter_active_bone(self.obj, fcurve)
-                if bone_fcurve_skip:
-                    continue
-            for key in keys:
-                if self.sc.filter_keyframes:
-                    key_skip = run_filter_keyframes(key)
-                    if key_skip:
-                        continue
-                if full_keys:
-                    all_keys.append((key.co[0], key.co[1]))
-                else:
-                    all_keys.append(key.co[0])
+        keys = get_action_keys(self.obj, action)
         if full_keys:
-            return all_keys
-        all_keys = list(set(all_keys))
-        all_keys.sort()
-        kfbefore = [key for key in all_keys if key < self.curframe]
-        kfafter = [key for key in all_keys if key > self.curframe]
-        return kfbefore, kfafter, all_keys
+            return keys.full_keys
+        kfbefore, kfafter = keys.split(self.curframe)
+        return kfbefore, kfafter, list(keys.frames)
 
     def os_method_keyframe(self, dont_create=False):
         bf = self.sc.onionsk_kfr_before
@@ -2283,90 +5224,22 @@ class Onion_Skins:
                 self.cls.report({'WARNING'}, msg)
             return False
 
-        if not self.sc.use_all_keyframes:
-            if len(kfbefore) < bf:
-                bf = len(kfbefore)
-            else:
-                if len(kfbefore) - bf > 0:
-                    for i in range(len(kfbefore) - bf):
-                        kfbefore.pop(0)
-            if len(kfafter) < af:
-                af = len(kfafter)
-            else:
-                if len(kfafter) - af > 0:
-                    for i in range(len(kfafter) - af):
-                        kfafter.pop(-1)
-        else:
-            bf = len([k for k in all_keys if k < self.curframe])
-            af = len([k for k in all_keys if k > self.curframe])
+        kfbefore, kfafter = plan_keyframe_range(
+            kfbefore, kfafter, bf, af, self.sc.use_all_keyframes)
+        current_key = None
+        if self.sc.use_all_keyframes and float(self.curframe) in all_keys:
+            current_key = float(self.curframe)
+        Frames = plan_keyframe_frames(kfbefore, kfafter, current_key)
 
         if len(kfbefore) == 0:
             kfbefore.append(-101010.0)
-            bf = 0
         if len(kfafter) == 0:
             kfafter.append(101010.0)
-            af = 0
         if dont_create:
             return kfbefore, kfafter, all_keys
 
-        if (bf > af):
-            FramesB = []
-            if af > 0:
-                for i in range(af):
-                    FramesA = self.evaluate_frames(
-                        kfbefore[i],
-                        kfafter[i],
-                        kfafter[i] - kfbefore[i],
-                        0, 0
-                    )
-                    FramesB = FramesB + FramesA
-            for i in range(af, bf):
-                FramesA = self.evaluate_frames(
-                    kfbefore[i],
-                    kfafter[len(kfafter) - 1],
-                    kfafter[len(kfafter) - 1] - kfbefore[i],
-                    0, 2
-                )
-                FramesB = FramesB + FramesA
-            Frames = FramesB
-
-        if (bf < af):
-            FramesB = []
-            if bf > 0:
-                for i in range(bf):
-                    FramesA = self.evaluate_frames(
-                        kfbefore[i],
-                        kfafter[i],
-                        kfafter[i] - kfbefore[i],
-                        0, 0
-                    )
-                    FramesB = FramesB + FramesA
-            for i in range(bf, af):
-                FramesA = self.evaluate_frames(
-                    kfbefore[len(kfbefore) - 1],
-                    kfafter[i],
-                    kfafter[i] - kfbefore[len(kfbefore) - 1],
-                    0, 1
-                )
-                FramesB = FramesB + FramesA
-            Frames = FramesB
-        if (bf == af):
-            FramesB = []
-            for i in range(af):
-                FramesA = self.evaluate_frames(
-                    kfbefore[i],
-                    kfafter[i],
-                    kfafter[i] - kfbefore[i],
-                    0, 0
-                )
-                FramesB = FramesB + FramesA
-            Frames = FramesB
         self.kfbefore = kfbefore
         self.kfafter = kfafter
-        if self.sc.use_all_keyframes:
-            if float(self.curframe) in all_keys:
-                Frames.append(float(self.curframe))
-        Frames.sort()
         return Frames
 
     def os_method_range(self, context, dont_create=False):
@@ -2408,15 +5281,112 @@ class Onion_Skins:
             self.Frames = self.os_method_keyframe()
 
     def make_frame(self, Frame):
+        if self.parallel is not None:
+            arrays = self.parallel.load(Frame)
+            if arrays is not None:
+                self.Skins_count += self.assemble_frame(Frame, arrays)
+                return None
         bpy.context.scene.frame_set(int(Frame))
         print("Onion Skin: Frame " + str(Frame))
-        if self.sc.os_draw_mode == 'MESH':
-            count = make_onionSkin_frame(self, self.objp, self.empty, self.curframe, Frame)
+        if self.sc.os_draw_mode == 'MESH' and self.frames_skin is not None:
+            count = self.frames_skin.add(
+                Frame, *get_frame_piece_arrays(self.objp, self.pose_cache))
+        elif self.sc.os_draw_mode == 'MESH':
+            count = make_onionSkin_frame(
+                self, self.objp, self.empty, self.curframe, Frame,
+                pose_cache=self.pose_cache)
         if self.sc.os_draw_mode == 'GPU':
-            count = make_gpu_frame(self.objp, self.curframe, Frame)
+            count = make_gpu_frame(
+                self.objp, self.curframe, Frame, pose_cache=self.pose_cache)
         self.Skins_count += count
 
 
+    def assemble_frame(self, Frame, arrays):
+        count = 0
+        # Each item is (object, vertices, indices, smooth, uvs)
+        if self.sc.os_draw_mode == 'MESH' and self.frames_skin is not None:
+            for item in arrays:
+                dublicate_own_material(item[0].name)
+            return self.frames_skin.add(
+                Frame,
+                [get_triangle_mesh_arrays(*item[1:]) for item in arrays],
+                [item[0].name for item in arrays])
+        if self.sc.os_draw_mode == 'MESH' and self.sc.merge_pieces:
+            for item in arrays:
+                dublicate_own_material(item[0].name)
+            return make_merged_skin(
+                self.objp, self.empty, self.curframe, Frame, 'ONION',
+                [get_triangle_mesh_arrays(*item[1:]) for item in arrays],
+                [item[0].name for item in arrays])
+        for ob, vertices, indices, smooth, uvs in arrays:
+            if self.sc.os_draw_mode == 'MESH':
+                dublicate_own_material(ob.name)
+                make = make_skin_mesh_piece(
+                    ob, self.empty, self.curframe, Frame,
+                    new_mesh=make_mesh_from_arrays(vertices, indices, smooth, uvs))
+            else:
+                make = store_gpu_arrays(ob, Frame, vertices, indices)
+            if make:
+                count = count + 1
+        return count
+
+    def is_frame_ready(self, Frame):
+        if self.parallel is None:
+            return True
+        return self.parallel.is_ready(Frame)
+
+    def close_parallel(self):
+        if self.parallel is not None:
+            self.parallel.close()
+            self.parallel = None
+
+
+def count_scene_skins(context):
+    Skins = 0
+    for o in context.scene.objects:
+        if not hasattr(o, 'onionsk_Skins_count'):
+            continue
+        if o.onionsk_Skins_count > 0:
+            Skins = Skins + o.onionsk_Skins_count
+    return Skins
+
+
+def get_skin_mesh_arrays(skin):
+    # Triangles of a Mesh mode skin split back into (piece name, frame,
+    # vertices, indices), merged skins by material slot and frame attribute
+    mesh = skin.data
+    mesh.calc_loop_triangles()
+    vertices = np.empty((len(mesh.vertices), 3), 'f')
+    mesh.vertices.foreach_get("co", np.reshape(vertices, len(mesh.vertices) * 3))
+    matrix = np.array(skin.matrix_world, 'f')
+    vertices = vertices @ matrix[:3, :3].T + matrix[:3, 3]
+    tris = np.empty((len(mesh.loop_triangles), 3), 'i')
+    mesh.loop_triangles.foreach_get("vertices", np.reshape(tris, len(mesh.loop_triangles) * 3))
+    slots = np.zeros(len(tris), 'i')
+    names = get_merged_pieces(skin)
+    if names:
+        mesh.loop_triangles.foreach_get("material_index", slots)
+    else:
+        names = [list_to_str(skin.name.split('_')[1:-1], '_')]
+    if 'frame' in mesh.attributes:
+        point_frames = np.empty(len(mesh.vertices), 'i')
+        mesh.attributes['frame'].data.foreach_get("value", point_frames)
+        frames = point_frames[tris[:, 0]]
+    else:
+        frame = float(skin.name.split('_')[-1])
+        frames = np.full(len(tris), int(frame) if frame.is_integer() else frame)
+    pieces = []
+    for slot, frame in sorted(set(zip(slots.tolist(), frames.tolist()))):
+        if slot >= len(names):
+            continue
+        used, indices = np.unique(
+            tris[(slots == slot) & (frames == frame)], return_inverse=True)
+        pieces.append((
+            names[slot], frame, np.ascontiguousarray(vertices[used]),
+            np.ascontiguousarray(indices.reshape(-1, 3), 'i')))
+    return pieces
+
+
 class OS_OT_CreateUpdate_Skins(Operator):
     bl_label = 'Update Onion Skins'
     bl_idname = 'mos_op.make_skins'
@@ -2425,12 +5395,17 @@ class OS_OT_CreateUpdate_Skins(Operator):
 
     empty = None
     _timer = None
-    th = None
-    prog = 0
-    stop_early = False
-    loopIter = 0
-    processing = False
-    job_done = False
+    scheduler = None
+
+    force: BoolProperty(
+        name="Force Rebake",
+        description="Bake all frames again instead of reusing the unchanged ones",
+        default=False, options={'SKIP_SAVE'})
+
+    auto_update: BoolProperty(
+        name="Auto Update",
+        description="Started by the auto update of the skins, not by the user",
+        default=False, options={'HIDDEN', 'SKIP_SAVE'})
 
     def __init__(self):
         self.sc = bpy.context.scene.onion_skins_scene_props
@@ -2440,13 +5415,15 @@ class OS_OT_CreateUpdate_Skins(Operator):
         self.OSkins = None
         self.Frames = []
         self.Skins_count = 0
-        self.keys_changed = Onion_Skins.keys_changed
+        self.shapes_changed = Onion_Skins.shapes_changed
+        self.memo_fingerprints = None
+        self.memo_hits = 0
+        self.quiet = None
 
     def modal(self, context, event):
         if event.type in {'ESC'}:  # 'RIGHTMOUSE',
             self.cancel(context)
-            self.stop_early = True
-            self.th.join()
+            self.restore_evaluation()
             self.Skins_count = self.OSkins.Skins_count
             if self.params.auto_update_skins_toggle:
                 self.auto_update_count()
@@ -2455,27 +5432,25 @@ class OS_OT_CreateUpdate_Skins(Operator):
 
             return {'CANCELLED'}
 
-        if event.type == 'TIMER':
-            if self.processing:
-                self.OSkins.make_frame(self.Frames[self.loopIter])
-                print(str(int(self.prog)) + '%')
-                self.processing = False
-
-            if bpy.app.version < (2, 9, 3):
-                is_alive = self.th.isAlive()
-            else:
-                is_alive = self.th.is_alive()
-            if not is_alive:
-                self.th.join()
-                self.Skins_count = self.OSkins.Skins_count
-                if self.params.auto_update_skins_toggle:
-                    self.auto_update_count()
-                self.finishing(context)
-                # print('DONE')
-                return {'FINISHED'}
+        if event.type == 'TIMER' and self.scheduler.done:
+            self.cancel(context)
+            self.restore_evaluation()
+            if self.scheduler.error is not None:
+                self.report({'ERROR'}, "Mesh Onion Skins: " + str(self.scheduler.error))
+            self.Skins_count = self.OSkins.Skins_count
+            if self.params.auto_update_skins_toggle:
+                self.auto_update_count()
+            self.finishing(context)
+            return {'FINISHED'}
 
         return {'PASS_THROUGH'}
 
+    def bake_done(self):
+        # Wake up the modal handler to finish in the operator context
+        if self._timer is None:
+            self._timer = bpy.context.window_manager.event_timer_add(
+                0.01, window=self.window)
+
     def get_update_frames(self):
         sc = bpy.context.scene.onion_skins_scene_props
         update_Frames = []
@@ -2509,6 +5484,17 @@ class OS_OT_CreateUpdate_Skins(Operator):
         sc = bpy.context.scene.onion_skins_scene_props
         if sc.auto_update_complete:
             return None
+        created_frames = set(created_frames)
+        Onion_Skins.shapes_changed = None
+        if self.shapes_changed is not None and created_frames:
+            # Rebake only the created frames whose pose was changed by the edit
+            intervals = get_invalid_intervals(
+                *self.shapes_changed, bounds=(min(created_frames), max(created_frames)))
+            self.Frames = [
+                frame for frame in self.OSkins.Frames
+                if frame not in created_frames or frame_in_intervals(frame, intervals)
+            ]
+            return None
         update_Frames = self.get_update_frames()
         if update_Frames:
             self.Frames = [
@@ -2517,22 +5503,17 @@ class OS_OT_CreateUpdate_Skins(Operator):
             ]
         else:
             self.Frames = []
-        self.Frames += [fr for fr in self.keys_changed if fr not in self.Frames]
-        Onion_Skins.keys_changed.clear()
 
     def gpu_auto_update_frames(self):
-        objp = self.objp
-        global GPU_FRAMES
-        created_frames = [float(item.split('|@|')[-1]) for item in GPU_FRAMES[objp.name]]
+        record = GPU_FRAMES.setdefault(self.objp)
+        created_frames = list(record.index)
         self.set_auto_update_frames(created_frames)
-        remove_items = []
-        for item in GPU_FRAMES[objp.name]:
-            item_frame = float(item.split('|@|')[-1])
-            if item_frame not in self.OSkins.Frames or\
-                    item_frame in self.Frames:
-                remove_items.append(item)
-        for i in remove_items:
-            GPU_FRAMES[objp.name].pop(i)
+        planned_frames = set(self.OSkins.Frames)
+        update_frames = set(self.Frames)
+        for item_frame in created_frames:
+            if item_frame not in planned_frames or\
+                    item_frame in update_frames:
+                record.pop_frame(item_frame)
 
     def mesh_auto_update_frames(self):
         tree = get_empty_objs_tree()
@@ -2540,6 +5521,8 @@ class OS_OT_CreateUpdate_Skins(Operator):
             return None
         created_frames = [float(s.name.split('_')[-1]) for s in tree.children]
         self.set_auto_update_frames(created_frames)
+        planned_frames = set(self.OSkins.Frames)
+        update_frames = set(self.Frames)
         remove_items = []
         for s in tree.children:
             item_frame = float(s.name.split('_')[-1])
@@ -2547,14 +5530,59 @@ class OS_OT_CreateUpdate_Skins(Operator):
                 s.name = '_'.join(['before'] + s.name.split('_')[1:])
             else:
                 s.name = '_'.join(['after'] + s.name.split('_')[1:])
-            if item_frame not in self.OSkins.Frames or\
-                    item_frame in self.Frames:
+            if item_frame not in planned_frames or\
+                    item_frame in update_frames:
                 remove_items.append(s)
-        for x in remove_items:
-            mesh = x.data
-            bpy.data.objects.remove(x, do_unlink=True)
-            if bpy.data.meshes[mesh.name].users == 0:
-                bpy.data.meshes.remove(mesh)
+        if remove_items:
+            remove_skin_ids(remove_items)
+
+    def gpu_memo_frames(self):
+        # Reuse baked frames whose pieces are unchanged since the last bake
+        objp = self.objp
+        record = GPU_FRAMES.setdefault(objp)
+        fingerprints = {
+            get_session_uid(ob): get_bake_fingerprint(objp, ob)
+            for ob in get_skin_pieces(objp)
+        }
+        keep_frames = set()
+        bake_frames = []
+        for frame in self.Frames:
+            entries = [(record.get(uid, frame), fp) for uid, fp in fingerprints.items()]
+            if not self.force and\
+                    all(entry is not None and entry.fingerprint == fp for entry, fp in entries):
+                keep_frames.add(float(frame))
+            else:
+                bake_frames.append(frame)
+        keep_items = 0
+        for frame in list(record.index):
+            if frame not in keep_frames:
+                record.pop_frame(frame)
+                continue
+            for entry in record.frames[frame].values():
+                if entry.uid in fingerprints:
+                    keep_items += 1
+                else:
+                    record.pop(entry)
+        hits = len(self.Frames) - len(bake_frames)
+        misses = len(bake_frames)
+        BAKE_STATS['hits'] += hits
+        BAKE_STATS['misses'] += misses
+        if not self.auto_update:
+            msg = "Mesh Onion Skins: Reused " + str(hits) + " baked frames, baking " + str(misses)
+            print(msg)
+            self.report({'INFO'}, msg)
+        self.memo_fingerprints = fingerprints
+        self.memo_hits = hits
+        self.OSkins.Skins_count = keep_items
+        self.Frames = bake_frames
+
+    def gpu_memo_store(self):
+        fingerprints = self.memo_fingerprints
+        record = GPU_FRAMES.get(self.objp)
+        if not record:
+            return None
+        for entry in record.entries():
+            entry.fingerprint = fingerprints.get(entry.uid)
 
     def execute(self, context):
 
@@ -2592,8 +5620,8 @@ class OS_OT_CreateUpdate_Skins(Operator):
         remove_handlers(context)
         if not params.auto_update_skins_toggle:
             remove_skins(obj)
-            if GPU_FRAMES.get(objp.name):
-                GPU_FRAMES[objp.name].clear()
+            if GPU_FRAMES.get(objp) and sc.os_draw_mode != 'GPU':
+                GPU_FRAMES.get(objp).clear()
 
         #!!!!!!!!!!!!!!SET TO CONTEXT OBJECT MODE !!!!!!!!!!!!!!!!!
         #Store current mode to return to it after complete operations
@@ -2614,53 +5642,55 @@ class OS_OT_CreateUpdate_Skins(Operator):
 
         obj.select_set(False)
 
-        import threading
-
-        def long_task(self, context):
-            i = 0
-            while not self.job_done:
-                if self.stop_early:
-                    return
-                if not self.Frames:
-                    Progress_Status.hide(self)
-                    return
-                if not self.processing:
-                    time.sleep(.005)
-                    self.loopIter = range(len(self.Frames))[i]
-                    self.prog = 100 / (len(self.Frames)) * (self.loopIter + 1)
-                    Progress_Status.set_progress(self, context, self.prog)
-                    i += 1
-                    self.processing = True
-                if self.prog >= 100:
-                    self.job_done = True
-
         self.OSkins.set_frames(context)
         self.Frames = self.OSkins.Frames
         if not self.Frames:
             return self.finishing(context)
 
-        self.th = threading.Thread(target=long_task, args=(self, context))
-
         if sc.os_draw_mode == 'GPU':
-            if not GPU_FRAMES.get(objp.name):
-                GPU_FRAMES[objp.name] = {}
+            DISK_CACHE.restore(objp)
+            record = GPU_FRAMES.setdefault(objp)
             params.display_progress = False
             if params.auto_update_skins_toggle and obj.is_onionsk:
                 self.gpu_auto_update_frames()
+                for entry in record.entries():
+                    entry.fingerprint = None
+            else:
+                self.gpu_memo_frames()
         if sc.os_draw_mode == 'MESH':
             if params.auto_update_skins_toggle and obj.is_onionsk:
                 self.mesh_auto_update_frames()
 
-        if params.display_progress:
-            Progress_Status.show(self, context)
-            self.th.start()
-            wm = context.window_manager
-            self._timer = wm.event_timer_add(0.1, window=context.window)
-            wm.modal_handler_add(self)
+        workers = prefs.parallel_workers or max((os.cpu_count() or 1) - 1, 1)
+        if prefs.parallel_bake and len(self.Frames) > 1 and workers > 1:
+            self.OSkins.parallel = Parallel_Bake(self.Frames, get_skin_pieces(objp), workers)
+            self.OSkins.parallel.start()
+        elif prefs.quiet_evaluation and self.Frames:
+            self.quiet = Quiet_Evaluation([objp] + get_skin_pieces(objp))
+            self.quiet.suspend(context)
+
+        if params.display_progress and self.Frames:
+            try:
+                Progress_Status.show(self, context)
+                self.window = context.window
+                self.scheduler = Bake_Scheduler(
+                    self.Frames, self.OSkins.make_frame,
+                    prefs.bake_tick_budget / 1000, self.bake_done,
+                    self.OSkins.is_frame_ready)
+                self.scheduler.start(context)
+            except Exception:
+                self.restore_evaluation()
+                self.OSkins.close_parallel()
+                raise
+            context.window_manager.modal_handler_add(self)
             return {'RUNNING_MODAL'}
         else:
-            for Frame in self.Frames:
-                self.OSkins.make_frame(Frame)
+            try:
+                for Frame in self.Frames:
+                    self.OSkins.make_frame(Frame)
+            finally:
+                self.restore_evaluation()
+                self.OSkins.close_parallel()
             self.Skins_count = self.OSkins.Skins_count
             if params.auto_update_skins_toggle:
                 self.auto_update_count()
@@ -2675,10 +5705,17 @@ class OS_OT_CreateUpdate_Skins(Operator):
             frame_skins = self.OSkins.Skins_count / len(self.Frames)
             self.Skins_count = frame_skins * len(self.OSkins.Frames)
         if not self.obj.is_onionsk or\
-                not Onion_Skins.keys_updated.get(self.obj.name):
+                Onion_Skins.keys_updated.get(self.obj.name) is None:
             action = self.obj.animation_data.action
             keys = self.OSkins.get_keyframes(action, full_keys=True)
             Onion_Skins.keys_updated[self.obj.name] = keys
+            Onion_Skins.shapes_updated[self.obj.name] = get_action_shapes(action)
+            Onion_Skins.index_updated[self.obj.name] = get_action_keys_index(action).fingerprint
+
+    def restore_evaluation(self):
+        if self.quiet:
+            self.quiet.restore()
+            self.quiet = None
 
     def finishing(self, context):
         sc = bpy.context.scene.onion_skins_scene_props
@@ -2686,13 +5723,22 @@ class OS_OT_CreateUpdate_Skins(Operator):
         obj = self.obj
         objp = self.objp
         mode = self.mode
+        self.restore_evaluation()
+        if self.OSkins:
+            self.OSkins.close_parallel()
         #////////////////////////////////////////////
         context.scene.frame_set(self.curframe)
         # update active Skins count
         objp.onionsk_Skins_count = int(self.Skins_count)
         obj.select_set(True)
         context.view_layer.objects.active = obj
-        if self.Frames and self.OSkins:
+        if self.memo_fingerprints is not None:
+            self.gpu_memo_store()
+        if self.OSkins and self.OSkins.frames_skin is not None:
+            self.OSkins.frames_skin.build()
+        if sc.os_draw_mode == 'GPU':
+            DISK_CACHE.commit(objp)
+        if (self.Frames or self.memo_hits) and self.OSkins:
             # Object custom property of using Onion Skins
             obj.is_onionsk = True
             objp.is_onionsk = True
@@ -2725,13 +5771,7 @@ class OS_OT_CreateUpdate_Skins(Operator):
         bpy.data.scenes.update()
 
         # Count all Onion Skins in scene exept Markers
-        Skins = 0
-        for o in context.scene.objects:
-            if not hasattr(o, 'onionsk_Skins_count'):
-                continue
-            if o.onionsk_Skins_count > 0:
-                Skins = Skins + o.onionsk_Skins_count
-        sc.onionsk_Skins_count = Skins
+        sc.onionsk_Skins_count = count_scene_skins(context)
         #!!!!!!!!!!!!Return to Stored Conext Mode ('POSE' for example)!!!!!!!!
         bpy.ops.object.mode_set(mode=mode)
 
@@ -2745,6 +5785,9 @@ class OS_OT_CreateUpdate_Skins(Operator):
 
         if sc.os_draw_mode == 'GPU' and not sc.draw_gpu_toggle:
             sc.draw_gpu_toggle = True
+        if sc.os_draw_mode == 'GPU':
+            GPU_CACHE.enforce(
+                objp, self.curframe, GPU_CACHE.get_window_frames(objp, self.curframe))
         global CREATING
         CREATING = False
         if sc.view_range:
@@ -2757,9 +5800,13 @@ class OS_OT_CreateUpdate_Skins(Operator):
         return {'FINISHED'}
 
     def cancel(self, context):
-        wm = context.window_manager
-        wm.event_timer_remove(self._timer)
-        Progress_Status.hide(self)
+        if self.scheduler is not None:
+            self.scheduler.finish()
+        if self._timer is not None:
+            context.window_manager.event_timer_remove(self._timer)
+            self._timer = None
+        if Progress_Status.widget_visible:
+            Progress_Status.hide(self)
 
 
 class OS_OT_Remove_Skins(Operator):
@@ -2782,11 +5829,15 @@ class OS_OT_Remove_Skins(Operator):
         # REMOVE Skins ////////
         remove_skins(obj)
         objp = checkout_parent(obj)
-        if not objp.is_os_marker and not GPU_MARKERS.get(objp.name):
+        if not objp.is_os_marker and not GPU_MARKERS.get(objp) and\
+                not has_other_pinned(context, objp):
             sc.draw_gpu_toggle = False
-        global GPU_FRAMES
-        if GPU_FRAMES.get(objp.name):
-            GPU_FRAMES[objp.name].clear()
+        if GPU_FRAMES.get(objp):
+            GPU_FRAMES.get(objp).clear()
+        for ob in get_skin_pieces(objp):
+            GPU_TOPOLOGY.pop(get_session_uid(ob), None)
+        GPU_CACHE.clear(objp)
+        DISK_CACHE.remove(objp.name)
 
         bpy.data.objects.update()
         bpy.context.scene.objects.update()
@@ -2826,10 +5877,9 @@ class OS_OT_Add_Marker(Operator):
             tmarkers.new("osm", frame=curframe)
 
         if sc.os_draw_mode == 'GPU':
-            global GPU_MARKERS
-            if not GPU_MARKERS.get(objp.name):
-                GPU_MARKERS[objp.name] = {}
+            GPU_MARKERS.setdefault(objp)
             count = make_gpu_frame(objp, curframe, curframe, skin_type='MARKER')
+            DISK_CACHE.commit(objp)
             sc.onionsk_Markers_count += count
             obj.is_os_marker = 1
             objp.is_os_marker = 1
@@ -2914,14 +5964,15 @@ class OS_OT_Remove_Marker(Operator):
         # Remove Markers ///////
         remove_skins(obj, skin_type='MARKER')
         sc = bpy.context.scene.onion_skins_scene_props
-        if sc.draw_gpu_toggle and not obj.is_onionsk:
-            sc.draw_gpu_toggle = False
         objp = checkout_parent(obj)
-        global GPU_MARKERS
-        if GPU_MARKERS.get(objp.name):
-            for m in GPU_MARKERS[objp.name]:
-                sc.onionsk_Markers_count -= 1
-            GPU_MARKERS[objp.name].clear()
+        if sc.draw_gpu_toggle and not obj.is_onionsk and\
+                not has_other_pinned(context, objp):
+            sc.draw_gpu_toggle = False
+        record = GPU_MARKERS.get(objp)
+        if record:
+            sc.onionsk_Markers_count -= len(record)
+            record.clear()
+            DISK_CACHE.commit(objp)
         if sc.onionsk_Markers_count < 0:
             sc.onionsk_Markers_count = 0
 
@@ -2938,6 +5989,217 @@ class OS_OT_Remove_Marker(Operator):
         return {'FINISHED'}
 
 
+class OS_OT_Promote_To_Mesh(Operator):
+    bl_label = 'Promote to Mesh'
+    bl_idname = 'mos_op.promote_to_mesh'
+    bl_description = "Build Mesh onion skins from the baked GPU frames of the selected object without evaluating the frames again"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def get_frame_arrays(self, objp, record, evicted, pieces, frame):
+        # Arrays of every piece of the frame, kept in memory or read from
+        # the disk cache. None if a piece has neither.
+        arrays = []
+        if record and frame in record.frames:
+            items = [(pieces.get(entry.uid), entry) for entry in record.frames[frame].values()]
+        else:
+            # Evicted from the GPU cache
+            items = [(ob, None) for ob in pieces.values()]
+        for ob, entry in items:
+            if ob is None:
+                continue
+            if entry is not None:
+                entry_arrays = get_entry_arrays(objp, entry)
+            else:
+                entry_arrays = DISK_CACHE.read(objp.name, ob.name + '|@|' + str(evicted[frame]))
+            if entry_arrays is None:
+                return None
+            # The GPU arrays have no smooth flags nor UVs
+            arrays.append((ob,) + tuple(entry_arrays) + (None, None))
+        return arrays
+
+    def execute(self, context):
+
+        sc = bpy.context.scene.onion_skins_scene_props
+        obj = context.active_object
+        objp = checkout_parent(obj)
+        DISK_CACHE.restore(objp)
+        record = GPU_FRAMES.get(objp)
+        markers = GPU_MARKERS.get(objp)
+        evicted = dict(GPU_CACHE.evicted.get(get_session_uid(objp), {}))
+        if not record and not markers and not evicted:
+            self.report({'ERROR'}, "Mesh Onion Skins: There are no baked GPU frames to promote")
+            return {'CANCELLED'}
+        pieces = {get_session_uid(ob): ob for ob in get_skin_pieces(objp)}
+        curframe = context.scene.frame_current
+
+        sc.draw_gpu_toggle = False
+        sc.os_draw_mode = 'MESH'
+        remove_skins(obj)
+        if markers:
+            remove_skins(obj, skin_type='MARKER')
+        init_os_collection()
+        empty = create_skins_empty(objp, 'ONION')
+        if not empty:
+            msg = "Mesh Onion Skins collection or parent Empty is hidden, make sure it is visible in View Layer"
+            self.report({'ERROR'}, msg)
+            return {'CANCELLED'}
+        create_skins_materials()
+
+        # Onion Skins ////////
+        global CREATING
+        CREATING = True
+        OSkins = Onion_Skins(obj, empty)
+        evaluated = 0
+        try:
+            for frame in sorted(set(record.index if record else []) | set(evicted)):
+                arrays = self.get_frame_arrays(objp, record, evicted, pieces, frame)
+                if arrays is not None:
+                    OSkins.Skins_count += OSkins.assemble_frame(frame, arrays)
+                    continue
+                # Neither kept in memory nor in the disk cache
+                OSkins.make_frame(evicted.get(frame, frame))
+                evaluated += 1
+            if OSkins.frames_skin is not None:
+                OSkins.frames_skin.build()
+            count = OSkins.Skins_count
+            objp.onionsk_Skins_count = count
+            if count:
+                obj.is_onionsk = True
+                objp.is_onionsk = True
+
+            # Markers ////////
+            marker_count = 0
+            if markers:
+                empty_m = create_skins_empty(objp, 'MARKER')
+                for entry in markers.entries():
+                    if entry.uid not in pieces or not empty_m:
+                        continue
+                    dublicate_own_material(entry.name)
+                    entry_arrays = get_entry_arrays(objp, entry)
+                    new_mesh = None
+                    if entry_arrays is not None:
+                        new_mesh = make_mesh_from_arrays(*entry_arrays)
+                    else:
+                        context.scene.frame_set(int(entry.frame))
+                        evaluated += 1
+                    if make_skin_mesh_piece(
+                            pieces[entry.uid], empty_m, curframe, entry.frame, 'MARKER',
+                            new_mesh=new_mesh):
+                        marker_count += 1
+        finally:
+            if evaluated:
+                context.scene.frame_set(curframe)
+            CREATING = False
+        if marker_count:
+            sc.onionsk_Markers_count = sc.onionsk_Markers_count + marker_count
+            obj.is_os_marker = True
+            objp.is_os_marker = True
+
+        set_onion_colors('BEFORE')
+        set_onion_colors('AFTER')
+        set_onion_colors('MARKER')
+        sc.onionsk_Skins_count = count_scene_skins(context)
+        if sc.view_range:
+            view_range_frames(context.scene)
+
+        msg = "Mesh Onion Skins: Promoted " + str(count + marker_count) + " GPU skins to Mesh"
+        if evaluated:
+            msg += ", " + str(evaluated) + " frames had no cached arrays and were evaluated again." +\
+                " Turn on the Disk Cache to keep them"
+            self.report({'WARNING'}, msg)
+        else:
+            self.report({'INFO'}, msg)
+
+        return {'FINISHED'}
+
+
+class OS_OT_Demote_To_GPU(Operator):
+    bl_label = 'Demote to GPU'
+    bl_idname = 'mos_op.demote_to_gpu'
+    bl_description = "Move the Mesh onion skins of the selected object to the GPU cache without evaluating the frames again"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+
+        sc = bpy.context.scene.onion_skins_scene_props
+        obj = context.active_object
+        objp = checkout_parent(obj)
+        skins = []
+        tree = get_empty_objs_tree(obj)
+        if tree:
+            skins += [(s, '') for s in tree.children]
+        frames_skin = get_frames_skin(objp)
+        if frames_skin:
+            skins.append((frames_skin, ''))
+        treeM = get_empty_objs_tree(obj, 'MARKER')
+        if treeM:
+            skins += [(s, 'MARKER') for s in treeM.children]
+        if not skins:
+            self.report({'ERROR'}, "Mesh Onion Skins: There are no Mesh skins to demote")
+            return {'CANCELLED'}
+
+        for record in (GPU_FRAMES.get(objp), GPU_MARKERS.get(objp)):
+            if record:
+                record.clear()
+        GPU_CACHE.clear(objp)
+        count = 0
+        marker_count = 0
+        for skin, skin_type in skins:
+            for name, frame, vertices, indices in get_skin_mesh_arrays(skin):
+                ob = bpy.data.objects.get(name)
+                if ob is None or not len(indices):
+                    continue
+                store_gpu_arrays(ob, frame, vertices, indices, skin_type)
+                if skin_type == 'MARKER':
+                    marker_count += 1
+                else:
+                    count += 1
+
+        remove_skins(obj)
+        if treeM:
+            remove_skins(obj, skin_type='MARKER')
+        sc.os_draw_mode = 'GPU'
+        objp.onionsk_Skins_count = count
+        if count:
+            obj.is_onionsk = True
+            objp.is_onionsk = True
+        if marker_count:
+            sc.onionsk_Markers_count = sc.onionsk_Markers_count + marker_count
+            obj.is_os_marker = True
+            objp.is_os_marker = True
+        sc.onionsk_Skins_count = count_scene_skins(context)
+        DISK_CACHE.commit(objp)
+        Draw_Plan.invalidate()
+        GPU_CACHE.enforce(objp, context.scene.frame_current,
+                          GPU_CACHE.get_window_frames(objp, context.scene.frame_current))
+        if count or marker_count:
+            sc.draw_gpu_toggle = True
+
+        msg = "Mesh Onion Skins: Demoted " + str(count + marker_count) + " Mesh skins to GPU"
+        self.report({'INFO'}, msg)
+
+        return {'FINISHED'}
+
+
+class OS_OT_Pin_Skins(Operator):
+    bl_label = 'Pin Skins'
+    bl_idname = 'mos_op.pin_skins'
+    bl_description = "Keep drawing the GPU onion skins of the object when another object is active"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+
+        objp = checkout_parent(context.active_object)
+        objp.onionsk_pinned = not objp.onionsk_pinned
+        Draw_Plan.invalidate()
+
+        for area in context.window.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
+
+        return {'FINISHED'}
+
+
 class OS_OT_Update_Motion_Path(Operator):
     bl_label = 'Update Motion Path'
     bl_idname = 'mos_op.update_motion_path'
@@ -3363,6 +6625,12 @@ class OnionSkins_Scene_Props(bpy.types.PropertyGroup):
         description='Is object using Mesh Onion Marker',
         default=False)
 
+    ob.onionsk_pinned = bpy.props.BoolProperty(
+        attr="onionsk_pinned",
+        name='onionsk_pinned',
+        description='Keep drawing the GPU onion skins of the object when it is not active',
+        default=False)
+
     ob.onionsk_Skins_count = bpy.props.IntProperty(
         attr="onionsk_Skins_count",
         name="onionsk_Skins_count",
@@ -3454,6 +6722,16 @@ class OnionSkins_Scene_Props(bpy.types.PropertyGroup):
         default=False,
         update=update_os_prop_toggle_selectable)
 
+    merge_pieces: BoolProperty(
+        name='Merge Pieces',
+        description='Join all pieces of a frame into one onion skin object with a material slot for each piece',
+        default=False)
+
+    single_skin_object: BoolProperty(
+        name='Single Object',
+        description='Keep all frames in one mesh with a frame attribute, a Geometry Nodes modifier shows the frames of the view range. Needs Blender 3.2',
+        default=False)
+
     onionsk_colors: BoolProperty(
         attr="onionsk_colors",
         name='onionsk_colors',
@@ -3463,12 +6741,12 @@ class OnionSkins_Scene_Props(bpy.types.PropertyGroup):
     gpu_flat_colors: BoolProperty(
         name='Flat Colors',
         description='Draw color filled silhouette only',
-        default=False)
+        default=False, update=update_draw_plan)
 
     gpu_colors_in_front: BoolProperty(
         name='In Front',
         description='Put skins in front of all objects',
-        default=False)
+        default=False, update=update_draw_plan)
 
     onionsk_fr_start: IntProperty(
         attr="onionsk_fr_start",
@@ -3589,7 +6867,8 @@ class OnionSkins_Scene_Props(bpy.types.PropertyGroup):
               current frame position"),
             ('SCENE', 'In Range', 'Set start and end farmes\
               as a timeline interval')],
-        description='Set where to draw method', default='SCENE')
+        description='Set where to draw method', default='SCENE',
+        update=update_draw_plan)
 
     view_range: BoolProperty(
         attr="view_range",
@@ -3670,6 +6949,11 @@ class OnionSkins_Scene_Props(bpy.types.PropertyGroup):
         description="Filter by keyframes of active bone only",
         default=False)
 
+    filter_selected_bones: BoolProperty(
+        name="Selected Bones",
+        description="Filter by keyframes of selected bones only",
+        default=False)
+
     key_type_keyframe: BoolProperty(
         name="Keyframe",
         description="Include or exclude keyframe types",
@@ -3694,11 +6978,38 @@ class OnionSkins_Scene_Props(bpy.types.PropertyGroup):
     gpu_mask_oskins: BoolProperty(
         name="Mask Skins",
         description="Use depth mask of shader color for onion skin frames",
-        default=False)
+        default=False, update=update_draw_plan)
     gpu_mask_markers: BoolProperty(
         name="Mask Markers",
         description="Use depth mask of shader color for marker frames",
-        default=False)
+        default=False, update=update_draw_plan)
+    gpu_primitive_before: EnumProperty(
+        name="Before", items=GPU_PRIMITIVE_ITEMS,
+        description="How the onion skins before the current frame are drawn",
+        default='FACES')
+    gpu_primitive_after: EnumProperty(
+        name="After", items=GPU_PRIMITIVE_ITEMS,
+        description="How the onion skins after the current frame are drawn",
+        default='FACES')
+    gpu_primitive_markers: EnumProperty(
+        name="Markers", items=GPU_PRIMITIVE_ITEMS,
+        description="How the marker frames are drawn",
+        default='FACES')
+    gpu_edge_angle: FloatProperty(
+        name="Edge Angle",
+        description="Edges are drawn where their faces meet at a larger angle, open borders are always drawn",
+        subtype='ANGLE', min=0.0, max=3.141593,
+        default=0.523599)
+    gpu_point_stride: IntProperty(
+        name="Point Stride",
+        description="Draw every n-th vertex of the onion skins drawn as points",
+        min=1, max=1000,
+        default=4)
+    gpu_point_size: IntProperty(
+        name="Point Size",
+        description="Size of the points in pixels",
+        min=1, max=20,
+        default=3)
 
     def update_draw_gpu_toggle(self, context):
         if self.draw_gpu_toggle:
@@ -3714,9 +7025,10 @@ def get_os_marker_frame_nums(self, context):
     sc = bpy.context.scene.onion_skins_scene_props
     objp = checkout_parent(context.active_object)
     if sc.os_draw_mode == 'GPU':
-        if not GPU_MARKERS.get(objp.name):
+        record = GPU_MARKERS.get(objp)
+        if not record:
             return []
-        frame_nums = [float(s.split('|@|')[-1]) for s in GPU_MARKERS[objp.name]]
+        frame_nums = list(record.index)
     else:
         treeM = get_empty_objs_tree(False, 'MARKER')
         if not treeM:
@@ -3744,38 +7056,33 @@ def delete_mos_marker(self, context):
     frame_number = wm.mos_markers.split(' ')[-1]
     obj = context.active_object
     objp = checkout_parent(obj)
-    global GPU_MARKERS
     if sc.os_draw_mode == 'MESH':
         treeM = get_empty_objs_tree(False, 'MARKER')
         markers = treeM.children
         if not treeM:
             return None
+        remove_items = []
         for s in markers:
             if int(float(s.name.split('_')[-1])) != int(float(frame_number)):
                 continue
-            mesh = s.data
-            bpy.data.objects.remove(s, do_unlink=True)
-            if bpy.data.meshes[mesh.name].users == 0:
-                bpy.data.meshes.remove(mesh)
+            remove_items.append(s)
             sc.onionsk_Markers_count = sc.onionsk_Markers_count - 1
             tm = bpy.context.scene.timeline_markers
             for m in tm:
                 if m.frame == int(frame_number) and m.name == 'osm':
                     tm.remove(m)
-    elif GPU_MARKERS.get(objp.name):
-        markers = []
-        for gm in GPU_MARKERS[objp.name]:
-            if int(float(gm.split('|@|')[-1])) != int(float(frame_number)):
+        if remove_items:
+            remove_skin_ids(remove_items)
+    elif GPU_MARKERS.get(objp):
+        markers = GPU_MARKERS.get(objp)
+        for frame in list(markers.index):
+            if int(frame) != int(float(frame_number)):
                 continue
-            markers.append(gm)
+            sc.onionsk_Markers_count -= len(markers.pop_frame(frame))
             tm = bpy.context.scene.timeline_markers
             for m in tm:
                 if m.frame == int(frame_number) and m.name == 'osm':
                     tm.remove(m)
-        for m in markers:
-            GPU_MARKERS[objp.name].pop(m)
-            sc.onionsk_Markers_count -= 1
-        markers = GPU_MARKERS[objp.name]
     SKIP_DELETE = True
     if markers:
         wm['mos_markers'] = 0
@@ -3783,11 +7090,12 @@ def delete_mos_marker(self, context):
 
     if not markers:
         if sc.os_draw_mode == 'MESH':
-            bpy.data.objects.remove(treeM, do_unlink=True)
+            remove_skin_ids([], treeM, get_empty_objs_tree(objp))
         obj.is_os_marker = 0
         objp.is_os_marker = 0
         sc = bpy.context.scene.onion_skins_scene_props
-        if sc.draw_gpu_toggle and not obj.is_onionsk:
+        if sc.draw_gpu_toggle and not obj.is_onionsk and\
+                not has_other_pinned(context, objp):
             sc.draw_gpu_toggle = False
 
 
@@ -3839,7 +7147,7 @@ class OnionSkinsParams(bpy.types.PropertyGroup):
     )
     display_progress: BoolProperty(
         name="Display Progress",
-        description="Show progress in the window UI while creating onion skins ( creating is slower if turned on )",
+        description="Show progress in the window UI while creating onion skins and keep the interface responsive, ESC to stop",
         default=False)
 
     settings_preset_new_name: StringProperty(
@@ -3928,9 +7236,92 @@ class Onion_Skins_Preferences(AddonPreferences):
 
     display_progress: BoolProperty(
         name="Display Progress",
-        description="Draw Technic: Mesh: Show progress in the window UI while creating onion skins ( creating is slower while turned on )",
+        description="Draw Technic: Mesh: Show progress in the window UI while creating onion skins and keep the interface responsive, ESC to stop",
+        default=False)
+
+    gpu_merged_draw: BoolProperty(
+        name='Merged GPU Draw',
+        description="Draw all the cached frames of an object with one batch and compute fading and the view range on the GPU. Applies to frames baked after it is turned on",
+        default=False)
+
+    gpu_layer_cache: BoolProperty(
+        name='Layer Cache',
+        description="Keep the drawn GPU onion skins in an offscreen texture and reuse it on redraws while the view, frame and settings stay the same. Needs Blender 3.0 and depth masks or in front skins",
+        default=False)
+
+    gpu_frustum_culling: BoolProperty(
+        name='Frustum Culling',
+        description="Skip drawing GPU onion skins that are outside of the view",
+        default=True)
+
+    gpu_cull_screen_size: IntProperty(
+        name='Cull Size',
+        description="Skip drawing GPU onion skins smaller than this size on the screen, in pixels. 0 disables it",
+        min=0, max=100,
+        default=2)
+
+    gpu_lod: EnumProperty(
+        name="LOD", items=[
+            ('NONE', 'Off', "Always draw the full detail of the onion skins"),
+            ('DISTANCE', 'Frame Distance',
+             "Draw simplified onion skins far from the current frame"),
+            ('SIZE', 'Screen Size', "Draw simplified onion skins that are small on the screen"),
+            ('BUDGET', 'Triangle Budget',
+             "Simplify the farthest onion skins until the triangle budget is met")],
+        description="Draw simplified versions of the GPU onion skins. Disables the merged GPU draw. Applies to frames baked after it is turned on",
+        default='NONE')
+
+    gpu_lod_resolution: IntProperty(
+        name='LOD Resolution',
+        description="Grid cells along the longest side of a piece for the first level of detail, the second one uses a quarter of it",
+        min=4, max=512,
+        default=32)
+
+    gpu_lod_distance: IntProperty(
+        name='LOD Distance',
+        description="Number of onion skins drawn at each level of detail before switching to the next one",
+        min=1, max=100,
+        default=3)
+
+    gpu_lod_size: IntProperty(
+        name='LOD Size',
+        description="Onion skins smaller than this size on the screen, in pixels, are simplified",
+        min=1, max=4096,
+        default=150)
+
+    gpu_lod_budget: IntProperty(
+        name='Triangle Budget',
+        description="Maximum number of triangles for the onion skins of the active object",
+        min=1000, soft_max=10000000,
+        default=1000000)
+
+    pinned_frames: IntProperty(
+        name='Pinned Frames',
+        description="Onion skins drawn on each side of the current frame for pinned objects that are not active. 0 - all",
+        min=0, soft_max=100,
+        default=3)
+
+    pinned_triangles: IntProperty(
+        name='Pinned Triangles',
+        description="Maximum number of triangles for the onion skins of each pinned object that is not active. 0 - no limit",
+        min=0, soft_max=10000000,
+        default=200000)
+
+    parallel_bake: BoolProperty(
+        name='Parallel Bake',
+        description="Evaluate the frames in background Blender processes working on a temporary copy of the file",
         default=False)
 
+    parallel_workers: IntProperty(
+        name='Workers',
+        description='Number of background Blender processes for the parallel bake. 0 - one less than the number of CPU cores',
+        min=0, max=256, default=0)
+
+    bake_tick_budget: IntProperty(
+        name='Bake Time Slice (ms)',
+        description='With display progress on, bake as many frames as fit in this time before letting the interface update',
+        min=1, max=1000, default=30)
+
     onionsk_tmarker: BoolProperty(
         name='Time Markers',
         description='Create time markers at frames',
@@ -3946,6 +7337,30 @@ class Onion_Skins_Preferences(AddonPreferences):
         description='Hide the back side of faces in GPU mode',
         default=False)
 
+    quiet_evaluation: BoolProperty(
+        name='Quiet Evaluation',
+        description="Evaluate only the onion skin objects and their dependencies while creating skins.\nUnrelated collections are excluded from the view layer and frame change handlers are suspended until it's done",
+        default=False)
+
+    gpu_cache_budget: IntProperty(
+        name='GPU Cache Budget (MB)',
+        description='Memory budget of the baked GPU frames of all objects. The frames out of the view range are evicted when it is exceeded and baked again on demand. 0 - unlimited',
+        min=0, default=2048)
+
+    disk_cache: BoolProperty(
+        name='Disk Cache',
+        description="Save the baked GPU frames to a cache folder next to the .blend file, so they show up after reopening the file without baking them again",
+        default=False)
+
+    gpu_cache_eviction: EnumProperty(
+        name="Eviction", items=[
+            ('DISTANCE', 'Distance',
+             "Evict frames of other objects first, then the farthest frames from the current frame"),
+            ('LRU', 'Least Recently Used',
+             "Evict frames that were drawn the longest time ago")],
+        description='Which frames are evicted first when the GPU cache budget is exceeded',
+        default='DISTANCE')
+
     onionsk_method: EnumProperty(
         name="Draw Frame Methods", items=[
             ('FRAME', 'Around Frame',
@@ -4143,6 +7558,45 @@ class Onion_Skins_Preferences(AddonPreferences):
         row = layout.row()
         row.prop(self, 'gl_cull_face')
         row.prop(self, 'display_progress')
+        row = layout.row()
+        row.prop(self, 'quiet_evaluation')
+        row.prop(self, 'bake_tick_budget')
+        row = layout.row()
+        row.prop(self, 'parallel_bake')
+        row.prop(self, 'parallel_workers')
+        row = layout.row()
+        row.prop(self, 'gpu_merged_draw')
+        row.prop(self, 'gpu_layer_cache')
+        row = layout.row()
+        row.prop(self, 'gpu_frustum_culling')
+        row.prop(self, 'gpu_cull_screen_size')
+        row = layout.row()
+        row.label(text='Last Redraw: ' + str(CULL_STATS['drawn']) + ' drawn, ' +
+                  str(CULL_STATS['frustum']) + ' off-screen, ' +
+                  str(CULL_STATS['size']) + ' too small (' +
+                  str(CULL_STATS['skipped']) + ' skipped in total)')
+        row = layout.row()
+        row.prop(self, 'gpu_lod')
+        row.prop(self, 'gpu_lod_resolution')
+        row = layout.row()
+        if self.gpu_lod == 'DISTANCE':
+            row.prop(self, 'gpu_lod_distance')
+        elif self.gpu_lod == 'SIZE':
+            row.prop(self, 'gpu_lod_size')
+        elif self.gpu_lod == 'BUDGET':
+            row.prop(self, 'gpu_lod_budget')
+        if self.gpu_lod != 'NONE':
+            row.label(text='LOD: ' + str(CULL_STATS['lod']) + ' reduced, ' +
+                      str(CULL_STATS['triangles']) + ' triangles')
+        row = layout.row()
+        row.prop(self, 'pinned_frames')
+        row.prop(self, 'pinned_triangles')
+        row = layout.row()
+        row.prop(self, 'gpu_cache_budget')
+        row.prop(self, 'gpu_cache_eviction', text='')
+        row = layout.row()
+        row.prop(self, 'disk_cache')
+        row.label(text='GPU Cache: ' + str(round(GPU_CACHE.total / 1048576, 1)) + ' MB')
 
         row = layout.row(align=True)
         row.operator("mos_op.save_pref_settings", icon='EXPORT')
@@ -4475,6 +7929,11 @@ def m_os_pre_save(dummy):
     save_os_list_settings()
 
 
+def m_os_post_save(dummy):
+    if DISK_CACHE.manifest:
+        DISK_CACHE.check_directory()
+
+
 def set_view_colors(s, s_type):
     sc = bpy.context.scene.onion_skins_scene_props
     if sc.onionsk_colors:
@@ -4482,10 +7941,11 @@ def set_view_colors(s, s_type):
         if not m:
             create_skins_materials()
             m = get_base_material(s_type)
+        set_skin_materials(s, [m] * max(len(get_merged_pieces(s)), 1))
     else:
-        m = bpy.data.materials[
-            MAT_PREFIX + list_to_str(s.name.split('_')[1:-1], '_') + '_' + SUFFIX_own]
-    s.data.materials[0] = m
+        mats = get_skin_own_materials(s)
+        set_skin_materials(s, mats)
+        m = mats[0]
     s.color = m.diffuse_color
 
 
@@ -4555,12 +8015,80 @@ def hide_skin_object(s):
         s.hide_render = True
 
 
+def get_frames_skin_fade(skin_prefix, distance):
+    # Part of the alpha faded away per frame of distance from the current frame
+    sc = bpy.context.scene.onion_skins_scene_props
+    if not sc.fade_to_alpha:
+        return 0.0
+    if sc.onionsk_colors:
+        alpha = get_prefix_material_color(skin_prefix)[3]
+    else:
+        alpha = sc.color_alpha_value
+    if alpha <= 0:
+        return 0.0
+    return max(1.0 - sc.fade_to_value / alpha, 0.0) / max(distance - 1, 1)
+
+
+def update_frames_skin(scene, objp=None):
+    # Pass the view range of the current frame to the frames skin modifier,
+    # inputs are only written when they change
+    sc = scene.onion_skins_scene_props
+    if objp is None:
+        objp = checkout_parent(bpy.context.active_object)
+    skin = get_frames_skin(objp)
+    if skin is None:
+        return None
+    modifier = skin.modifiers.get('mos_frames')
+    if modifier is None or modifier.node_group is None:
+        return None
+    curframe = scene.frame_current
+    frames = list(skin.get('mos_frames', []))
+    bf = [f for f in frames if f < curframe]
+    af = [f for f in frames if f > curframe]
+    if not sc.view_range:
+        before = curframe - bf[0] if bf else 0
+        after = af[-1] - curframe if af else 0
+    elif sc.onionsk_method == 'KEYFRAME' and sc.view_range_frame_type == 'KEYFRAME':
+        bf = bf[max(len(bf) - sc.view_before, 0):] if sc.view_before > 0 else []
+        af = af[:max(sc.view_after, 0)]
+        before = curframe - bf[0] if bf else -1
+        after = af[-1] - curframe if af else -1
+    else:
+        before = sc.view_before
+        after = sc.view_after
+    if not sc.hide_os_before:
+        before = -1
+    if not sc.hide_os_after:
+        after = -1
+    values = {
+        'Before': float(before),
+        'After': float(after),
+        'Fade Before': get_frames_skin_fade('before', before),
+        'Fade After': get_frames_skin_fade('after', after),
+        'Use Colors': sc.onionsk_colors,
+    }
+    changed = False
+    ids = get_group_input_ids(modifier.node_group)
+    for name, value in values.items():
+        if modifier.get(ids[name]) != value:
+            modifier[ids[name]] = value
+            changed = True
+    for name, suffix in (('before', SUFFIX_before), ('after', SUFFIX_after)):
+        node = modifier.node_group.nodes.get(name)
+        mat = bpy.data.materials.get(MAT_PREFIX + suffix)
+        if node is not None and node.inputs['Material'].default_value != mat:
+            node.inputs['Material'].default_value = mat
+    if changed:
+        skin.update_tag()
+
+
 def view_range_frames(scene):
     global CREATING
     global PRE_VIEW_FRAME
     if CREATING:
         return None
     sc = bpy.context.scene.onion_skins_scene_props
+    update_frames_skin(scene)
     if not sc.view_range:
         return None
     if sc.os_draw_mode == 'GPU':
@@ -4713,27 +8241,32 @@ def auto_update_skins(scene):
     if not obj.is_onionsk:
         return None
     action = obj.animation_data.action
+    keys_upd = Onion_Skins.keys_updated.get(obj.name)
+    # Hash the keys only when an action was edited, otherwise the index
+    # compares the key counts and the frame range
+    edited = bpy.context.evaluated_depsgraph_get().id_type_updated('ACTION')
+    index_fingerprint = get_action_keys_index(action, edited).fingerprint if action else None
+    # Reading the shapes takes several foreach_get per fcurve, skip them
+    # unless the keys moved or an action was edited
+    if keys_upd is not None and\
+            index_fingerprint == Onion_Skins.index_updated.get(obj.name) and not edited:
+        return None
+    Onion_Skins.index_updated[obj.name] = index_fingerprint
     OSkins = Onion_Skins()
     keys = OSkins.get_keyframes(action, full_keys=True)
-    keys_upd = OSkins.keys_updated
-    keys_changed = []
-    if keys != keys_upd.get(obj.name):
-        if keys_upd.get(obj.name):
-            for i, key in enumerate(keys):
-                try:
-                    if not keys_upd.get(obj.name)[i][0]:
-                        pass
-                except IndexError:
-                    continue
-                if key[0] != keys_upd.get(obj.name)[i][0]:
-                    continue
-                if key[1] != keys_upd.get(obj.name)[i][1]:
-                    keys_changed.append(key[0])
-            keys_changed = list(set(keys_changed))
-        Onion_Skins.keys_updated[obj.name] = keys
-        Onion_Skins.keys_changed = keys_changed
-        set_object_data_collection_items()
-        bpy.ops.mos_op.make_skins()
+    shapes = get_action_shapes(action)
+    shapes_upd = OSkins.shapes_updated.get(obj.name)
+    if keys_upd is not None and np.array_equal(keys, keys_upd) and\
+            (shapes_upd is None or shapes == shapes_upd):
+        Onion_Skins.shapes_updated[obj.name] = shapes
+        return None
+    Onion_Skins.keys_updated[obj.name] = keys
+    Onion_Skins.shapes_updated[obj.name] = shapes
+    Onion_Skins.shapes_changed = None
+    if shapes_upd is not None:
+        Onion_Skins.shapes_changed = (shapes_upd, shapes)
+    set_object_data_collection_items()
+    bpy.ops.mos_op.make_skins(auto_update=True)
 
 
 def check_draw_gpu_toggle(scene):
@@ -4748,6 +8281,10 @@ def check_draw_gpu_toggle(scene):
         if sc.onionsk_tmarker:
             sc.onionsk_tmarker = False
             sc.onionsk_tmarker = True
+        if Draw_Handler is not None and DRAW_TOGGLE and sc.os_draw_mode == 'GPU':
+            # One persistent handler draws the active and pinned objects,
+            # the plans are rebuilt after the depsgraph update
+            return None
         remove_handlers(bpy.context)
         if DRAW_TOGGLE and sc.os_draw_mode == 'GPU':
             sc.draw_gpu_toggle = True
@@ -4762,17 +8299,34 @@ def m_os_post_dpgraph_update(scene):
         check_draw_gpu_toggle(scene)
 
 
+def m_os_post_undo(scene):
+    GPU_CACHE.collect_garbage()
+
+
+def collect_cache_garbage():
+    # Low frequency timer, deleted objects free their baked frames without
+    # scanning bpy.data on every depsgraph update
+    if GPU_FRAMES.values() or GPU_MARKERS.values() or GPU_TOPOLOGY:
+        GPU_CACHE.collect_garbage()
+    return GC_INTERVAL
+
+
 @persistent
 def m_os_on_file_load(scene):
     remove_handlers(bpy.context)
     global OS_Selected_Object_Sets
-    global GPU_FRAMES
-    global GPU_MARKERS
     global Active_Object
     global DRAW_TOGGLE
     OS_Selected_Object_Sets = {}
-    GPU_FRAMES = {}
-    GPU_MARKERS = {}
+    GPU_FRAMES.clear()
+    GPU_MARKERS.clear()
+    KEYS_INDEX.clear()
+    GPU_TOPOLOGY.clear()
+    GPU_MERGED.clear()
+    GPU_FEATURES.clear()
+    GPU_POINTS.clear()
+    GPU_CACHE.clear()
+    DISK_CACHE.load()
     Active_Object = None
     DRAW_TOGGLE = False
 
@@ -4790,6 +8344,9 @@ classes = [
     OS_OT_Remove_Skins,
     OS_OT_Add_Marker,
     OS_OT_Remove_Marker,
+    OS_OT_Pin_Skins,
+    OS_OT_Promote_To_Mesh,
+    OS_OT_Demote_To_GPU,
     OS_OT_Update_Motion_Path,
     OS_OT_Clear_Motion_Path,
     GPU_OT_Draw_Skins,
@@ -4843,7 +8400,11 @@ def register():
 
     bpy.app.handlers.load_post.append(m_os_on_file_load)
     bpy.app.handlers.depsgraph_update_post.append(m_os_post_dpgraph_update)
+    bpy.app.handlers.undo_post.append(m_os_post_undo)
+    bpy.app.handlers.redo_post.append(m_os_post_undo)
+    bpy.app.timers.register(collect_cache_garbage, first_interval=GC_INTERVAL, persistent=True)
     bpy.app.handlers.save_pre.append(m_os_pre_save)
+    bpy.app.handlers.save_post.append(m_os_post_save)
     bpy.app.handlers.frame_change_post.append(m_os_post_frames_handler)
     bpy.app.handlers.render_pre.append(m_os_pre_render_handler)
     bpy.app.handlers.render_post.append(m_os_post_render_handler)
@@ -4874,10 +8435,22 @@ def unregister():
         bpy.app.handlers.depsgraph_update_post.remove(m_os_post_dpgraph_update)
     except ValueError:
         pass
+    for handlers in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        try:
+            handlers.remove(m_os_post_undo)
+        except ValueError:
+            pass
+    if bpy.app.timers.is_registered(collect_cache_garbage):
+        bpy.app.timers.unregister(collect_cache_garbage)
     try:
         bpy.app.handlers.save_pre.remove(m_os_pre_save)
     except ValueError:
         pass
+    try:
+        bpy.app.handlers.save_post.remove(m_os_post_save)
+    except ValueError:
+        pass
+    DISK_CACHE.flush()
     try:
         bpy.app.handlers.frame_change_post.remove(m_os_post_frames_handler)
     except ValueError:
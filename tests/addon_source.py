@@ -0,0 +1,24 @@
+# Load plain functions from the add-on file without importing bpy
+import ast
+import heapq
+import os
+
+ADDON = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                     'Mesh_Onion_Skins.py')
+PLANNERS = (
+    'plan_stepped_frames', 'merge_frame_plans', 'plan_frame_method',
+    'plan_keyframe_range', 'plan_keyframe_frames')
+
+
+def load_functions(names, namespace):
+    # Run the definitions of the named functions in namespace, it holds
+    # the modules they use
+    with open(ADDON, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), ADDON)
+    nodes = [n for n in tree.body if isinstance(n, ast.FunctionDef) and n.name in names]
+    exec(compile(ast.Module(body=nodes, type_ignores=[]), ADDON, 'exec'), namespace)
+    return [namespace[name] for name in names]
+
+
+def load_planners():
+    return load_functions(PLANNERS, {'heapq': heapq})
@@ -0,0 +1,33 @@
+# Time the frame planners without Blender:
+#     python tests/benchmark_onion_skins_planner.py
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from addon_source import load_planners  # noqa: E402
+
+(plan_stepped_frames, merge_frame_plans, plan_frame_method,
+ plan_keyframe_range, plan_keyframe_frames) = load_planners()
+
+
+def bench(name, stmt, number):
+    best = min(timeit.repeat(stmt, number=number, repeat=5))
+    print("%-40s %10.2f us" % (name, best / number * 1e6))
+
+
+def main():
+    keys = [float(k) for k in range(0, 20000, 3)]
+    kfbefore = [k for k in keys if k < 10000]
+    kfafter = [k for k in keys if k > 10000]
+    bench("stepped 10000 frames", lambda: plan_stepped_frames(0, 10000, 1), 50)
+    bench("stepped 10000 frames reverse", lambda: plan_stepped_frames(0, 10000, 1, True), 50)
+    bench("frame method 50/50 step 1", lambda: plan_frame_method(500, 50, 50, 1), 5000)
+    bench("frame method 5000/5000 step 1", lambda: plan_frame_method(5000, 5000, 5000, 1), 50)
+    bench("keyframe method 6667 keys", lambda: plan_keyframe_frames(
+        *plan_keyframe_range(kfbefore, kfafter, 3000, 3000)), 500)
+
+
+if __name__ == '__main__':
+    main()
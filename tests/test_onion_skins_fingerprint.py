@@ -0,0 +1,118 @@
+import hashlib
+import os
+import sys
+import types
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from addon_source import load_functions  # noqa: E402
+
+
+class Object(object):
+    def __init__(self, name, **props):
+        self.name = name
+        self.animation_data = None
+        self.matrix_basis = [[1.0, 0.0, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0],
+                             [0.0, 0.0, 1.0, 0.0], [0.0, 0.0, 0.0, 1.0]]
+        self.parent = None
+        self.constraints = []
+        self.modifiers = []
+        self.pose = None
+        self.data = None
+        self.__dict__.update(props)
+
+
+class Collection(object):
+    pass
+
+
+class Prop(object):
+    def __init__(self, identifier, type):
+        self.identifier = identifier
+        self.type = type
+
+
+class Constraint(object):
+    bl_rna = types.SimpleNamespace(properties=[
+        Prop('name', 'STRING'), Prop('type', 'ENUM'),
+        Prop('target', 'POINTER'), Prop('subtarget', 'STRING')])
+
+    def __init__(self, type, target, subtarget=''):
+        self.name = type.title()
+        self.type = type
+        self.target = target
+        self.subtarget = subtarget
+
+
+class Keys(list):
+    # Keyframes as (frame, value), the handles are one frame apart
+    def foreach_get(self, attr, values):
+        co = np.array(self, 'f')
+        if attr == 'handle_left':
+            co[:, 0] -= 1.0
+        elif attr == 'handle_right':
+            co[:, 0] += 1.0
+        elif attr != 'co':
+            co = np.zeros(len(self))
+        values[:] = np.ravel(co)
+
+
+class Vertices(object):
+    def __len__(self):
+        return 4
+
+    def foreach_get(self, attr, values):
+        values[:] = np.arange(len(values))
+
+
+def animated(keys):
+    fcurve = types.SimpleNamespace(
+        keyframe_points=Keys(keys), mute=False, modifiers=[], data_path='location')
+    action = types.SimpleNamespace(fcurves=[fcurve])
+    return types.SimpleNamespace(action=action, drivers=[])
+
+
+bpy = types.SimpleNamespace(types=types.SimpleNamespace(Object=Object, Collection=Collection))
+get_bake_fingerprint = load_functions(
+    ('get_bake_fingerprint', 'get_action_fingerprint', 'get_anim_fingerprint',
+     'get_modifiers_fingerprint', 'get_drivers_fingerprint', 'get_constraints_fingerprint',
+     'get_pose_constraints_fingerprint', 'get_mesh_fingerprint', 'get_target_fingerprint',
+     'get_constraints_objects', 'get_struct_objects', 'get_id_objects',
+     'get_keys_enum_values'),
+    {'bpy': bpy, 'np': np, 'hashlib': hashlib})[0]
+
+
+def make_rig(target):
+    # Armature with a Copy Transforms bone constraint and a mesh child
+    bone = types.SimpleNamespace(
+        name='hand', constraints=[Constraint('COPY_TRANSFORMS', target, 'prop')])
+    rig = Object('rig', pose=types.SimpleNamespace(bones=[bone]))
+    mesh = types.SimpleNamespace(name='body', vertices=Vertices(), shape_keys=None)
+    body = Object('body', parent=rig, data=mesh)
+    return rig, body
+
+
+def test_bone_constraint_target_transform():
+    target = Object('prop')
+    rig, body = make_rig(target)
+    before = get_bake_fingerprint(rig, body)
+    assert get_bake_fingerprint(rig, body) == before
+    target.matrix_basis[0][3] = 2.0
+    assert get_bake_fingerprint(rig, body) != before
+
+
+def test_bone_constraint_target_animation():
+    target = Object('prop', animation_data=animated([(1.0, 0.0), (10.0, 1.0)]))
+    rig, body = make_rig(target)
+    before = get_bake_fingerprint(rig, body)
+    target.animation_data = animated([(1.0, 0.0), (10.0, 3.0)])
+    assert get_bake_fingerprint(rig, body) != before
+
+
+def test_bone_constraint_target_replaced():
+    rig, body = make_rig(Object('prop'))
+    before = get_bake_fingerprint(rig, body)
+    rig.pose.bones[0].constraints[0].target = Object('other')
+    assert get_bake_fingerprint(rig, body) != before
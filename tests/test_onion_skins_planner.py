@@ -0,0 +1,203 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from addon_source import load_planners  # noqa: E402
+
+(plan_stepped_frames, merge_frame_plans, plan_frame_method,
+ plan_keyframe_range, plan_keyframe_frames) = load_planners()
+
+
+SEED = 1234
+RUNS = 2000
+
+
+def old_evaluate_frames(fs, fe, skip, isReverse, exclude, curframe=None):
+    # Onion_Skins.evaluate_frames before the planner, curframe is set for
+    # the FRAME method
+    skipthat = False
+    if curframe is not None:
+        if fs < 0:
+            if curframe > 0:
+                skipthat = True
+            fs = 0
+    Frame = fs
+    lp = int((fe - fs) / skip)
+    dolast = False
+    if (fs + ((lp) * skip)) != fe:
+        lp = lp + 1
+        dolast = True
+    if isReverse and (fe - ((lp) * skip)) != fs:
+        lp = lp + 1
+    if isReverse:
+        loopRange = range((lp), 0, -1)
+    else:
+        loopRange = range(1 + lp)
+    Frames = []
+    for lr in loopRange:
+        if dolast and lr == lp:
+            Frame = fe
+        elif isReverse:
+            Frame = (fe - ((lr) * skip))
+            if fs + lr == 0 or Frame < fs:
+                Frame = fs
+        else:
+            Frame = fs + ((lr) * skip)
+        if curframe is not None and Frame == curframe:
+            continue
+        if skipthat and Frame == skip:
+            continue
+        if exclude == 1 and Frame == fs:
+            continue
+        if exclude == 2 and Frame == fe:
+            continue
+        Frames.append(Frame)
+    return Frames
+
+
+def old_frame_method(curframe, before, after, step):
+    fs = curframe - before
+    if fs < 0:
+        fs = 0
+    frames = old_evaluate_frames(fs, curframe, step, 1, 0, curframe)
+    return frames + old_evaluate_frames(
+        curframe, curframe + after, step, 0, 0, curframe)
+
+
+def old_keyframe_method(kfbefore, kfafter, bf, af):
+    # Onion_Skins.os_method_keyframe before the planner
+    kfbefore = list(kfbefore)
+    kfafter = list(kfafter)
+    if len(kfbefore) < bf:
+        bf = len(kfbefore)
+    else:
+        for i in range(len(kfbefore) - bf):
+            kfbefore.pop(0)
+    if len(kfafter) < af:
+        af = len(kfafter)
+    else:
+        for i in range(len(kfafter) - af):
+            kfafter.pop(-1)
+    if len(kfbefore) == 0:
+        kfbefore.append(-101010.0)
+        bf = 0
+    if len(kfafter) == 0:
+        kfafter.append(101010.0)
+        af = 0
+    Frames = []
+    for i in range(min(bf, af)):
+        Frames += old_evaluate_frames(
+            kfbefore[i], kfafter[i], kfafter[i] - kfbefore[i], 0, 0)
+    for i in range(af, bf):
+        Frames += old_evaluate_frames(
+            kfbefore[i], kfafter[-1], kfafter[-1] - kfbefore[i], 0, 2)
+    for i in range(bf, af):
+        Frames += old_evaluate_frames(
+            kfbefore[-1], kfafter[i], kfafter[i] - kfbefore[-1], 0, 1)
+    Frames.sort()
+    return Frames
+
+
+def random_keys(rng, curframe):
+    keys = sorted(set(rng.randint(-50, 150) for i in range(rng.randint(0, 30))))
+    kfbefore = [float(k) for k in keys if k < curframe]
+    kfafter = [float(k) for k in keys if k > curframe]
+    return kfbefore, kfafter
+
+
+def test_stepped_frames_match_previous_planner():
+    rng = random.Random(SEED)
+    for i in range(RUNS):
+        fs = rng.randint(-30, 100)
+        fe = fs + rng.randint(0, 80)
+        skip = rng.randint(1, 12)
+        reverse = rng.random() < 0.5
+        exclude = rng.choice((0, 1, 2))
+        curframe = rng.choice((None, rng.randint(-30, 180)))
+        expected = old_evaluate_frames(fs, fe, skip, reverse, exclude, curframe)
+        assert plan_stepped_frames(fs, fe, skip, reverse, exclude, curframe) ==\
+            sorted(set(expected))
+
+
+def test_stepped_frames_bounds_and_step():
+    rng = random.Random(SEED + 1)
+    for i in range(RUNS):
+        fs = rng.randint(0, 100)
+        fe = fs + rng.randint(0, 80)
+        skip = rng.randint(1, 12)
+        frames = plan_stepped_frames(fs, fe, skip)
+        assert frames == sorted(set(frames))
+        assert frames[0] == fs and frames[-1] == fe
+        assert all(b - a <= skip for a, b in zip(frames, frames[1:]))
+        # Backwards from the end frame, the start frame is always reached
+        reverse = plan_stepped_frames(fs, fe, skip, reverse=True)
+        assert reverse == sorted(set(reverse))
+        if fe > fs:
+            assert reverse[0] == fs and reverse[-1] <= fe
+        assert all(b - a <= skip for a, b in zip(reverse, reverse[1:]))
+
+
+def test_frame_method_match_previous_planner():
+    rng = random.Random(SEED + 2)
+    for i in range(RUNS):
+        curframe = rng.randint(-20, 120)
+        before = rng.randint(0, 40)
+        after = rng.randint(0, 40)
+        step = rng.randint(1, 10)
+        frames = plan_frame_method(curframe, before, after, step)
+        assert frames == sorted(set(old_frame_method(curframe, before, after, step)))
+        assert curframe not in frames
+
+
+def test_frame_method_window():
+    rng = random.Random(SEED + 3)
+    for i in range(RUNS):
+        curframe = rng.randint(0, 120)
+        before = rng.randint(0, 40)
+        after = rng.randint(0, 40)
+        step = rng.randint(1, 10)
+        frames = plan_frame_method(curframe, before, after, step)
+        assert all(max(curframe - before, 0) <= f <= curframe + after for f in frames)
+        if after:
+            assert frames[-1] == curframe + after
+        if before and curframe - before > 0:
+            assert frames[0] == curframe - before
+
+
+def test_merge_frame_plans():
+    rng = random.Random(SEED + 4)
+    for i in range(RUNS):
+        plans = [
+            sorted(set(rng.randint(-20, 60) for j in range(rng.randint(0, 15))))
+            for k in range(rng.randint(0, 4))]
+        expected = sorted(set(f for plan in plans for f in plan))
+        assert merge_frame_plans(*plans) == expected
+
+
+def test_keyframe_method_match_previous_planner():
+    rng = random.Random(SEED + 5)
+    for i in range(RUNS):
+        curframe = rng.randint(-20, 120)
+        kfbefore, kfafter = random_keys(rng, curframe)
+        if not kfbefore and not kfafter:
+            continue
+        bf = rng.randint(0, 10)
+        af = rng.randint(0, 10)
+        before, after = plan_keyframe_range(kfbefore, kfafter, bf, af)
+        expected = [
+            f for f in old_keyframe_method(kfbefore, kfafter, bf, af)
+            if f not in (-101010.0, 101010.0)]
+        assert plan_keyframe_frames(before, after) == expected
+
+
+def test_keyframe_use_all():
+    rng = random.Random(SEED + 6)
+    for i in range(RUNS):
+        curframe = rng.randint(-20, 120)
+        kfbefore, kfafter = random_keys(rng, curframe)
+        before, after = plan_keyframe_range(kfbefore, kfafter, 1, 1, use_all=True)
+        assert before == kfbefore and after == kfafter
+        frames = plan_keyframe_frames(before, after, float(curframe))
+        assert frames == sorted(kfbefore + [float(curframe)] + kfafter)